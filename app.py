@@ -5,13 +5,14 @@ A modern web app to upload PDFs, extract information using AI, and create academ
 """
 
 import os
+import sys
+import mimetypes
 import tempfile
 import shutil
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, send_from_directory, make_response
 from werkzeug.utils import secure_filename
-import PyPDF2  # PDF text extraction
-import openai
-import anthropic
+from werkzeug.security import safe_join
+import httpx
 from pptx import Presentation
 from pptx.util import Pt, Inches
 from pptx.dml.color import RGBColor
@@ -19,14 +20,41 @@ from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
 import re
 import json
 from datetime import datetime
+from urllib.parse import quote
 import random
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 import template_configs
+import shared_state
+import llm_hedging
+import llm_resilience
+import llm_rate_limiter
+import poster_json
+import render_cache
+import pptx_slimmer
+import template_manifest
+import template_working_copy
+from template_preview import PreviewWorker
+import figure_store
+import static_assets
+from job_workspace import JobWorkspace, sweep_stale as sweep_stale_workspaces
+from upload_janitor import UploadJanitor
+from startup_warmup import StartupWarmup, process_memory
+from manuscript_segmenter import build_manuscript_excerpt, format_budget_report, estimate_tokens, segment_manuscript, is_segmented
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+try:
+    from PIL import Image, ImageOps  # Optional: used to downscale oversized figures
+    import slide_preview  # ...and to draw poster previews
+except ImportError:
+    Image = None
+    slide_preview = None
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -38,11 +66,51 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 
+# Optional API base URLs - point these at mock_llm_server.py for offline load testing
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # e.g. http://localhost:8001/v1
+ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL')  # e.g. http://localhost:8001
+
+# 🧩 Extraction Settings
+# 'single' sends one prompt for all fields; 'sectioned' sends one smaller prompt per field group in parallel
+EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'single')
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', 16))
+PROVIDER_MAX_CONCURRENCY = {
+    'openai': int(os.getenv('OPENAI_MAX_CONCURRENCY', 5)),
+    'anthropic': int(os.getenv('ANTHROPIC_MAX_CONCURRENCY', 5))
+}
+SECTIONED_MAX_TOKENS = 1500  # Output token cap for each sectioned request
+
+# Ask providers for schema-constrained output (OpenAI json_schema, Anthropic tool use) instead of free text
+STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', 'true').lower() == 'true'
+
+# 🏁 Hedged Requests - if the chosen provider is slower than its rolling p90, race the other provider
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', 'false').lower() == 'true'
+HEDGE_PERCENTILE = 90
+HEDGE_DEFAULT_DELAY = float(os.getenv('HEDGE_DEFAULT_DELAY', 45))  # Seconds, used until enough latencies are recorded
+HEDGE_MIN_DELAY = 2.0  # Never hedge sooner than this
+HEDGE_CLIENT_POOL_SIZE = int(os.getenv('HEDGE_CLIENT_POOL_SIZE', 4))  # Idle cancellable clients kept per provider
+
+# 🔁 Retries and Circuit Breakers - transient API errors are retried with backoff (see llm_resilience.py)
+AI_FAILOVER = os.getenv('AI_FAILOVER', 'true').lower() == 'true'  # Use the other provider while one's circuit is open
+PARSE_RETRIES = 1  # Extra attempts when the AI's answer is not valid JSON, cut off or lacks the title/body
+
+# 🚦 Outbound Rate Limits - shared by all workers; set a value to 0 to turn a provider's limiter off
+AI_RATE_LIMITS = {
+    'openai': {
+        'requests': int(os.getenv('OPENAI_RPM', 500)),
+        'tokens': int(os.getenv('OPENAI_TPM', 30000))
+    },
+    'anthropic': {
+        'requests': int(os.getenv('ANTHROPIC_RPM', 50)),
+        'tokens': int(os.getenv('ANTHROPIC_TPM', 40000))
+    }
+}
+AI_MAX_QUEUE_WAIT = float(os.getenv('AI_MAX_QUEUE_WAIT', 120))  # Seconds a job may queue for its turn before being turned away
+
 # Default API provider (can be changed via frontend)
 DEFAULT_API_PROVIDER = 'openai'  # 'openai' or 'anthropic'
 
-# Global variable to track current API provider
-current_api_provider = DEFAULT_API_PROVIDER
+# The current API provider is kept in shared_state (see get_current_api_provider)
 
 # Validate API keys (at least one must be set)
 if not OPENAI_API_KEY and not ANTHROPIC_API_KEY:
@@ -57,26 +125,79 @@ if ANTHROPIC_API_KEY and not ANTHROPIC_API_KEY.startswith('sk-ant-'):
 
 # 📁 File Settings
 UPLOAD_FOLDER = 'uploads'
+# Each upload works in its own uploads/jobs/<job_id>/ folder; only finished posters land in UPLOAD_FOLDER
+JOB_WORKSPACE_FOLDER = os.path.join(UPLOAD_FOLDER, 'jobs')
 TEMPLATE_LIBRARY_FOLDER = 'template_library'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'pptx'}
 MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB max file size
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+# ⚡ Pipeline Settings - template loading and figure preparation run while the AI call is in flight
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 8))
+MAX_FIGURE_PIXELS = 3000  # Longest side (px) kept for figures; larger images are downscaled
+FIGURE_JPEG_QUALITY = 90
+# Names the prepared variant in the figure store; changes whenever the settings above do
+FIGURE_VARIANT_TAG = f"max{MAX_FIGURE_PIXELS}q{FIGURE_JPEG_QUALITY}"
+
+# 🪶 Output Slimming - drop unused layouts/masters, the thumbnail and orphaned media from each poster
+SLIM_OUTPUT = os.getenv('SLIM_OUTPUT', 'true').lower() == 'true'
+OUTPUT_COMPRESSLEVEL = int(os.getenv('OUTPUT_COMPRESSLEVEL', pptx_slimmer.DEFAULT_COMPRESSLEVEL))
+
+# 📐 Template Working Copies - library templates render from a slimmed copy (unused layouts, the
+# thumbnail and surplus image resolution removed); the uploaded original is kept as-is
+TEMPLATE_WORKING_COPIES = os.getenv('TEMPLATE_WORKING_COPIES', 'true').lower() == 'true'
+TEMPLATE_MEDIA_DPI = int(os.getenv('TEMPLATE_MEDIA_DPI', template_working_copy.DEFAULT_MEDIA_DPI))  # At printed size
+
+# 🖼️ Template Previews - drawn from the template in a background thread, cached by template hash
+TEMPLATE_PREVIEW_WIDTH = int(os.getenv('TEMPLATE_PREVIEW_WIDTH', 1200))  # Pixels across the slide
+PREVIEW_CACHE_FOLDER = os.getenv('PREVIEW_CACHE_FOLDER', 'preview_cache')
+
+# 🔍 Poster Previews - a small image of each generated poster, so users can check the layout without downloading
+POSTER_PREVIEW_ENABLED = os.getenv('POSTER_PREVIEW_ENABLED', 'true').lower() == 'true'
+POSTER_PREVIEW_WIDTH = int(os.getenv('POSTER_PREVIEW_WIDTH', 600))  # Pixels across the poster
+POSTER_PREVIEW_FORMAT = os.getenv('POSTER_PREVIEW_FORMAT', 'webp').lower()  # 'webp' or 'png'
+POSTER_PREVIEW_MIMETYPES = {'webp': 'image/webp', 'png': 'image/png'}
+
+# 🗃️ Render Cache - identical inputs (data, template, figures, descriptions) reuse the stored poster
+RENDER_CACHE_ENABLED = os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true'
+
+# 🔥 Startup Warm-up - once a worker is serving, a background thread imports the current provider's SDK and
+# builds library template working copies and manifests, so importing the app stays fast
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'true').lower() == 'true'
+STARTUP_WARMUP_DELAY = float(os.getenv('STARTUP_WARMUP_DELAY', 1))  # Seconds after the first request
+
+# 📦 Static Assets - `python static_assets.py` (run automatically by gunicorn.conf.py) moves the pages' inline
+# CSS/JS into fingerprinted, precompressed files under static/dist/; pages are then served from memory
+STATIC_ASSET_BUILD = os.getenv('STATIC_ASSET_BUILD', 'true').lower() == 'true'  # Serve the prebuilt pages when current
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
 
 # 🧹 Cleanup Settings - Set to True to automatically delete uploaded files after processing
 AUTO_CLEANUP_UPLOADS = True
 KEEP_FINAL_OUTPUT = True  # Keep the final PowerPoint file for download
+# A background janitor expires finished posters after UPLOAD_TTL_HOURS and keeps uploads/ under the quota
+UPLOAD_TTL_HOURS = float(os.getenv('UPLOAD_TTL_HOURS', 24))
+UPLOAD_QUOTA_MB = int(os.getenv('UPLOAD_QUOTA_MB', 2048))
+JANITOR_INTERVAL_MINUTES = float(os.getenv('JANITOR_INTERVAL_MINUTES', 10))
+# Deleting a poster on its first download breaks resumed downloads; the janitor expires posters instead
+DELETE_AFTER_DOWNLOAD = os.getenv('DELETE_AFTER_DOWNLOAD', 'false').lower() == 'true'
+
+# 📤 Download Offload - let a reverse proxy stream posters instead of a Python worker
+# '' (serve from Flask), 'x-sendfile' (Apache mod_xsendfile, lighttpd) or 'x-accel' (nginx)
+DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '').lower()
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected-uploads/')  # nginx internal location for uploads/
 
 # 🎨 Web App Settings
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', os.urandom(24))
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 app.config['MAX_CONTENT_PATH'] = None
+app.config['USE_X_SENDFILE'] = DOWNLOAD_OFFLOAD == 'x-sendfile'
 
 # 🧪 Testing Settings - Set to True to use dummy data instead of API calls
 USE_DUMMY_DATA = False
 DUMMY_DATA_FILE = 'dummy_api_response.json'
 
-# Global variable to track current mode (can be changed via API)
-current_dummy_mode = USE_DUMMY_DATA
+# The current mode is kept in shared_state (see get_current_dummy_mode)
 
 # ============================================================================
 # END CONFIGURATION - DON'T EDIT BELOW THIS LINE
@@ -84,56 +205,152 @@ current_dummy_mode = USE_DUMMY_DATA
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(JOB_WORKSPACE_FOLDER, exist_ok=True)
 os.makedirs(TEMPLATE_LIBRARY_FOLDER, exist_ok=True)
 
-def cleanup_uploaded_files(files_to_cleanup, keep_final_output=True):
-    """
-    Clean up uploaded files after processing.
-    
-    Args:
-        files_to_cleanup (list): List of file paths to delete
-        keep_final_output (bool): Whether to keep the final PowerPoint output file
-    """
-    if not AUTO_CLEANUP_UPLOADS:
-        return
-    
-    for file_path in files_to_cleanup:
-        try:
-            # Skip the final output file if keep_final_output is True
-            if keep_final_output and file_path.endswith('.pptx') and '_academic_' in file_path:
-                print(f"🔄 Keeping final output: {os.path.basename(file_path)}")
-                continue
-                
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up: {os.path.basename(file_path)}")
-        except Exception as e:
-            print(f"⚠️ Warning: Could not delete {file_path}: {e}")
+# Draws missing template previews off the request path
+TEMPLATE_PREVIEWS = PreviewWorker(PREVIEW_CACHE_FOLDER, TEMPLATE_PREVIEW_WIDTH)
+
+# Builds missing template working copies off the request path
+WORKING_COPIES = template_working_copy.WorkingCopyBuilder(TEMPLATE_MEDIA_DPI)
+
+# Rendered pages (prebuilt, or rendered once through Jinja) with their gzip/brotli variants
+PAGE_CACHE = static_assets.PageCache(app.template_folder, static_assets.DIST_FOLDER if STATIC_ASSET_BUILD else None)
+
+# Shared thread pool for the concurrent parts of the /upload pipeline
+PIPELINE_EXECUTOR = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='pipeline')
+
+def get_current_api_provider():
+    """Get the current API provider (shared across all workers)."""
+    return shared_state.get_setting('api_provider', DEFAULT_API_PROVIDER)
+
+def set_current_api_provider(provider):
+    """Set the current API provider for all workers."""
+    shared_state.set_setting('api_provider', provider)
+
+def get_current_dummy_mode():
+    """Get whether dummy data mode is enabled (shared across all workers)."""
+    return bool(shared_state.get_setting('dummy_mode', USE_DUMMY_DATA))
+
+def set_current_dummy_mode(use_dummy_data):
+    """Enable or disable dummy data mode for all workers."""
+    shared_state.set_setting('dummy_mode', bool(use_dummy_data))
+
+def sweep_figure_store():
+    """Janitor task: expire unreferenced figures and report the store's size."""
+    expired, _ = figure_store.sweep()
+    return {**figure_store.stats(), 'expired': expired}
+
+UPLOAD_JANITOR = UploadJanitor(
+    UPLOAD_FOLDER,
+    ttl_seconds=UPLOAD_TTL_HOURS * 3600,
+    max_bytes=UPLOAD_QUOTA_MB * 1024 * 1024,
+    interval_seconds=JANITOR_INTERVAL_MINUTES * 60,
+    tasks=[
+        # Workspaces of jobs that died with their worker, and figures no job links to any more
+        ('stale_workspaces', lambda: sweep_stale_workspaces(JOB_WORKSPACE_FOLDER)),
+        ('figure_store', sweep_figure_store),
+    ],
+)
 
 def cleanup_old_files(days_old=1):
     """
-    Clean up files older than specified days in uploads folder.
-    Only runs if AUTO_CLEANUP_UPLOADS is True.
+    Clean up files older than specified days in uploads folder (and trim it to the quota).
+    Only runs if AUTO_CLEANUP_UPLOADS is True. Returns the janitor's sweep report, or None.
     """
     if not AUTO_CLEANUP_UPLOADS:
-        return
-        
+        return None
     try:
-        current_time = datetime.now()
-        cutoff_time = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        for filename in os.listdir(UPLOAD_FOLDER):
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.isfile(file_path):
-                file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                if file_time < cutoff_time:
-                    try:
-                        os.remove(file_path)
-                        print(f"🗑️ Cleaned up old file: {filename}")
-                    except Exception as e:
-                        print(f"⚠️ Could not delete old file {filename}: {e}")
+        return UPLOAD_JANITOR.sweep(ttl_seconds=float(days_old) * 86400)
     except Exception as e:
         print(f"⚠️ Error during cleanup: {e}")
+        return None
+
+@app.before_request
+def start_upload_janitor():
+    """Run the janitor thread in every worker process (cheap check after the first request)."""
+    if AUTO_CLEANUP_UPLOADS:
+        UPLOAD_JANITOR.ensure_running()
+
+def warm_ai_client():
+    """Warm-up task: import the current provider's SDK and create its client."""
+    provider = get_current_api_provider()
+    if get_current_dummy_mode() or not provider_configured(provider):
+        return 'skipped'
+    get_ai_client(provider)
+    return provider
+
+def warm_pdf_reader():
+    """Warm-up task: import the PDF library."""
+    import PyPDF2
+    return PyPDF2.__version__
+
+def warm_library_templates():
+    """Warm-up task: build every library template's working copy and load its manifest."""
+    warmed = 0
+    for template in load_template_library():  # Also queues any missing previews
+        if get_template_manifest(library_render_path(template['path'], wait=True)) is not None:
+            warmed += 1
+    return warmed
+
+def library_template_paths():
+    """Paths of every .pptx in the template library folders."""
+    paths = []
+    for folder in ['available', 'coming_soon', 'premium']:
+        folder_path = os.path.join(TEMPLATE_LIBRARY_FOLDER, folder)
+        if os.path.exists(folder_path):
+            paths.extend(os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path)) if name.endswith('.pptx'))
+    return paths
+
+def preload_provider_sdks():
+    """Preload task: import the SDK of every configured provider (no clients: their sockets must not be forked)."""
+    providers = [provider for provider in ('openai', 'anthropic') if provider_configured(provider)]
+    for provider in providers:
+        provider_sdk(provider)
+    return providers
+
+def preload_library_templates():
+    """
+    Preload task: working copy, content hash, manifest (compiled shape index) and parsed presentation
+    of every library template, and the template pictures poster previews draw from, decoded into
+    slide_preview's cache.
+    """
+    loaded = 0
+    for template_path in library_template_paths():
+        render_path = library_render_path(template_path, wait=True)
+        render_cache.file_hash(render_path)
+        manifest = get_template_manifest(render_path)
+        if manifest is None:
+            continue
+        presentation = template_manifest.load_presentation(render_path)
+        if POSTER_PREVIEW_ENABLED and slide_preview is not None:
+            slide_preview.render_presentation(presentation, POSTER_PREVIEW_WIDTH)
+        loaded += 1
+    return loaded
+
+# Run in the gunicorn master before workers are forked (gunicorn.conf.py): synchronously, starting no threads
+PRELOAD_TASKS = StartupWarmup([
+    ('provider_sdks', preload_provider_sdks),
+    ('pdf_reader', warm_pdf_reader),
+    ('library_templates', preload_library_templates),
+])
+
+def preload_for_fork():
+    """Load what every worker needs once, in the preloading master, so forked workers share it copy-on-write."""
+    print("🔥 Preloading templates and libraries before forking workers...")
+    return PRELOAD_TASKS.run()
+
+STARTUP_WARMUP_TASKS = StartupWarmup([
+    ('ai_client', warm_ai_client),
+    ('pdf_reader', warm_pdf_reader),
+    ('library_templates', warm_library_templates),
+], delay_seconds=STARTUP_WARMUP_DELAY)
+
+@app.before_request
+def start_warmup():
+    """Warm the worker up in the background once it is serving (cheap check after the first request)."""
+    if STARTUP_WARMUP:
+        STARTUP_WARMUP_TASKS.ensure_running()
 
 def save_dummy_data(extracted_data):
     """Save API response as dummy data for future testing."""
@@ -194,7 +411,7 @@ def load_template_library():
                                 manual_preview = candidate
                                 break
                         
-                        # Otherwise, generate or use auto preview
+                        # Otherwise, use the auto preview (a missing one is queued and listed once drawn)
                         if manual_preview:
                             preview_filename = manual_preview
                         else:
@@ -202,7 +419,6 @@ def load_template_library():
                             preview_path = os.path.join(folder_path, preview_filename)
                             if not os.path.exists(preview_path):
                                 generate_template_preview(template_path, preview_path)
-                            if not os.path.exists(preview_path):
                                 preview_filename = None
                         
                         # Get template name and determine status based on folder
@@ -232,8 +448,14 @@ def load_template_library():
         print(f"❌ Error loading template library: {e}")
         return []
 
+TEMPLATE_UNREADABLE_ERROR = "Template could not be read as a PowerPoint file"
+
 def save_template_to_library(template_file, filename, folder='available'):
-    """Save uploaded template to the library in the specified folder."""
+    """
+    Save an uploaded template to the library in the specified folder, slim it and compile
+    the manifest of the file renders will load. Returns (manifest, error); a file that
+    cannot be read as a PowerPoint template is removed again.
+    """
     try:
         # Create the target folder if it doesn't exist
         target_folder = os.path.join(TEMPLATE_LIBRARY_FOLDER, folder)
@@ -241,27 +463,44 @@ def save_template_to_library(template_file, filename, folder='available'):
         
         template_path = os.path.join(target_folder, filename)
         template_file.save(template_path)
+        # Slim it now, so the first poster made with it does not pay for that
+        manifest = get_template_manifest(library_render_path(template_path, wait=True))
+        if manifest is None:
+            discard_library_template(template_path)
+            return None, TEMPLATE_UNREADABLE_ERROR
         print(f"✅ Template saved to library ({folder}): {filename}")
-        return True, None
+        generate_template_preview(template_path, os.path.join(target_folder, os.path.splitext(filename)[0] + '_preview.png'))
+        return manifest, None
     except Exception as e:
-        return False, f"Error saving template: {e}"
+        return None, f"Error saving template: {e}"
+
+def discard_library_template(template_path):
+    """Remove a library template and everything derived from it (working copy, manifests)."""
+    template_working_copy.forget(template_path)
+    template_manifest.forget(template_path)
+    if os.path.exists(template_path):
+        os.remove(template_path)
+
+def library_render_path(template_path, wait=False):
+    """
+    The file renders should load for a library template: its slim working copy, if enabled and built.
+    A missing or stale copy is queued for the background builder and the original is used meanwhile;
+    with `wait` it is built now instead (at ingest, and in warm-up and preload tasks).
+    """
+    if not TEMPLATE_WORKING_COPIES:
+        return template_path
+    if wait:
+        working_path, _ = template_working_copy.get_working_copy(template_path, TEMPLATE_MEDIA_DPI)
+        return working_path
+    working_path = template_working_copy.current_working_copy(template_path, TEMPLATE_MEDIA_DPI)
+    if working_path is None:
+        WORKING_COPIES.enqueue(template_path)
+        return template_path
+    return working_path
 
 def generate_template_preview(template_path, preview_path):
-    """Generate a preview image from PowerPoint template."""
-    try:
-        from pptx import Presentation
-        
-        # Load the presentation
-        prs = Presentation(template_path)
-        if len(prs.slides) == 0:
-            return False, "No slides found in template"
-        
-        # For now, just return success without generating preview
-        # This avoids the Pillow dependency
-        return True, None
-        
-    except Exception as e:
-        return False, f"Error generating preview: {e}"
+    """Queue a preview of the template's first slide; it is drawn in the background. Returns (queued, error)."""
+    return TEMPLATE_PREVIEWS.enqueue(template_path, preview_path)
 
 def allowed_file(filename, extensions):
     """Check if file extension is allowed."""
@@ -269,6 +508,7 @@ def allowed_file(filename, extensions):
 
 def extract_text_from_pdf(file_path):
     """Extract text from PDF file using PyPDF2."""
+    import PyPDF2  # Imported on first use, like the provider SDKs (see provider_sdk)
     try:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
@@ -281,18 +521,37 @@ def extract_text_from_pdf(file_path):
     except Exception as e:
         return f"Error extracting text from PDF: {e}"
 
-def call_ai_api(manuscript_text, provider='openai'):
-    """Call the specified AI API to extract poster content."""
-    global current_api_provider
-    
-    # Use the specified provider or fall back to current global setting
-    if not provider:
-        provider = current_api_provider
-    
-    print(f"🤖 Using {provider.upper()} API for content extraction...")
-    
-    # Common prompt for all APIs
-    prompt = f"""
+# Map poster dictionary keys to shape names in template
+POSTER_SHAPE_MAP = {
+    "headline": "HeadlineBox",
+    "title": "TitleBox",
+    "authors": "AuthorBox",
+    "affiliations": "AffiliationBox",
+    "subtitle": "SubtitleBox",
+    "Introduction": "IntroductionBox",
+    "Objective": "ObjectiveBox",
+    "Methods": "MethodsBox",
+    "Results": "ResultsBox",
+    "Discussion": "DiscussionBox",
+    "Conclusions": "ConclusionBox",
+    "References": "ReferencesBox"
+}
+
+def figure_placeholder_names(number):
+    """Shape names accepted for a figure's picture placeholder, in the order they are tried."""
+    return [f'Fig{number}Placeholder', f'Figure{number}Placeholder', f'Fig{number}PlaceholderLarge', f'Fig{number}PlaceholderSmall']
+
+def figure_description_names(number):
+    """Shape names accepted for a figure's description box, in the order they are tried."""
+    return [f'FigureDesc{number}', f'FigDesc{number}', f'Figure{number}Desc', f'Fig{number}Desc']
+
+# Every shape the renderer looks up (text boxes, then the figure shapes for figures 1-4)
+RENDER_SHAPE_NAMES = list(POSTER_SHAPE_MAP.values()) + [
+    name for number in range(1, 5) for name in figure_placeholder_names(number) + figure_description_names(number)
+]
+
+# Instructions shared by every extraction prompt
+POSTER_PROMPT_HEADER = """
 You are an expert in academic writing and research poster design.
 
 Given the following research manuscript text, extract content for an academic A0-size research poster. 
@@ -308,259 +567,516 @@ Given the following research manuscript text, extract content for an academic A0
 - **CRITICAL: Count words carefully and stick to the exact word count ranges specified for each field.**
 - **Word count includes all words, including articles (a, an, the) and prepositions.**
 - **If a field is too short, expand it with more detail. If too long, condense it while keeping key information.**
+"""
 
+# Requirements for each JSON key the AI returns (in poster order, same keys as POSTER_SHAPE_MAP)
+POSTER_FIELD_REQUIREMENTS = {
+    "headline": 'A short, punchy phrase (3-8 words) summarizing the main finding. Surround 2-5 important words with asterisks (e.g., *BOOSTS* or *DIGITAL HEALTH*).',
+    "title": 'The full title of the research.',
+    "authors": '**COMPLETE list of all authors** - include every author name found in the manuscript. Do not use "et al" or truncate the list.',
+    "affiliations": '**COMPLETE list of all affiliations** - include every institution, department, and affiliation mentioned. Do not use "(see manuscript for full list)" or truncate.',
+    "subtitle": '(optional) A brief subtitle if available.',
+    "Introduction": 'EXACTLY 65-75 words. Provide a comprehensive background, context, and rationale for the study. Include key concepts, current state of knowledge, and gaps that justify the research. PRESERVE THE EXACT CITATION STYLE from the original manuscript (e.g., if the PDF uses "(Smith et al., 2020)" or "[1]" or "¹", keep that exact format).',
+    "Objective": '15-25 words. Clear, specific research objective or question.',
+    "Methods": 'EXACTLY 80-90 words. Include study design, participants, procedures, data collection, and analysis methods. Be specific about sample size, timeframes, and key variables. PRESERVE THE EXACT CITATION STYLE from the original manuscript.',
+    "Results": 'EXACTLY 80-90 words. Present key findings with specific numbers, percentages, or statistics when available. Include sample sizes, effect sizes, and significance levels.',
+    "Discussion": '60-80 words. Interpret the main findings, discuss implications, limitations, and future directions. PRESERVE THE EXACT CITATION STYLE from the original manuscript.',
+    "Conclusions": 'EXACTLY 65-75 words. Summarize key findings and their significance. Include clinical or practical implications and recommendations.',
+    "References": 'Only references actually cited in the Introduction, Methods, or Discussion, PRESERVING THE EXACT REFERENCE FORMAT from the original manuscript (e.g., if the PDF uses APA style, keep APA style; if it uses Vancouver style, keep Vancouver style). Include complete reference details - do not use "et al" in references.',
+}
+
+# Example output shown to the AI
+POSTER_PROMPT_EXAMPLE = {
+    "headline": "DIGITAL HEALTH *BOOSTS* OUTCOMES in chronic pain",
+    "title": "Digital health interventions for chronic pain: A systematic review",
+    "authors": "Smith J, Doe A, Johnson B, Williams C, Brown D, Davis E, Wilson F, Anderson G, Taylor H, Martinez I",
+    "affiliations": "Department of Pain Medicine, University of Example; School of Health Sciences, Medical College; Institute of Digital Health, Technology University; Department of Psychology, State University; Center for Chronic Pain Research, National Institute",
+    "subtitle": "",
+    "Introduction": "Chronic pain affects millions of people worldwide (Cohen et al., 2021) and remains a significant public health challenge with substantial economic and social costs. Current treatment approaches often provide limited relief, creating an urgent need for innovative solutions. Digital health interventions, including mobile applications, wearable devices, and telehealth platforms, have emerged as promising alternatives that can deliver personalized care remotely (Fishman, 2021). This systematic review examines the effectiveness of these digital interventions in managing chronic pain conditions.",
+    "Objective": "To evaluate the effectiveness of digital health interventions for chronic pain management.",
+    "Methods": "We conducted a systematic review of randomized controlled trials published between 2010 and 2023. Electronic databases including PubMed, Embase, Cochrane Library, and PsycINFO were searched using relevant keywords. Studies were included if they evaluated digital interventions for chronic pain in adults. Primary outcomes were pain intensity and quality of life measures. Two independent reviewers screened articles and extracted data.",
+    "Results": "Twenty-three studies met inclusion criteria with a total of 2,847 participants. Digital interventions led to significant reductions in pain intensity compared to usual care (mean difference -1.2 points on 0-10 scale, 95% CI -1.8 to -0.6). Quality of life improvements were also observed across multiple domains. Mobile applications showed the strongest effects, with 65% of studies reporting clinically meaningful improvements.",
+    "Discussion": "Digital health interventions demonstrate promising results for chronic pain management, particularly mobile applications and telehealth platforms (Smith et al., 2022). However, heterogeneity in intervention types and outcome measures limits generalizability. Long-term effectiveness and cost-effectiveness require further investigation.",
+    "Conclusions": "Digital health interventions can significantly improve outcomes for chronic pain patients, with mobile applications showing particular promise. These findings support the integration of digital solutions into pain management protocols. Future research should focus on long-term efficacy, cost-effectiveness, and implementation strategies.",
+    "References": "Cohen SP, Vase L, Hooten WM. Chronic pain: an update on burden, best practices, and new advances. Lancet. 2021;397(10289):2082-2097. Fishman SM. Addressing the opioid crisis through education. Pain Med. 2021;22(4):741-742. Smith J, Doe A, Johnson B. Digital health interventions for chronic pain. Pain. 2022;163(5):1001-1010."
+}
+
+# Field groups for sectioned extraction, with the manuscript sections each group reads
+EXTRACTION_FIELD_GROUPS = {
+    'metadata': {
+        'fields': ["headline", "title", "authors", "affiliations", "subtitle"],
+        'sections': ['front', 'abstract', 'conclusions'],
+    },
+    'introduction': {
+        'fields': ["Introduction", "Objective"],
+        'sections': ['abstract', 'introduction'],
+    },
+    'methods_results': {
+        'fields': ["Methods", "Results"],
+        'sections': ['abstract', 'methods', 'results'],
+    },
+    'discussion': {
+        'fields': ["Discussion", "Conclusions"],
+        'sections': ['abstract', 'results', 'discussion', 'conclusions'],
+    },
+    'references': {
+        'fields': ["References"],
+        'sections': ['introduction', 'methods', 'discussion', 'references'],
+    },
+}
+
+AI_SYSTEM_PROMPT = "You are an expert in academic writing and research poster design."
+
+# Name of the tool Anthropic is asked to call with the poster fields in structured-output mode
+POSTER_TOOL_NAME = "record_poster_content"
+AI_MODELS = {
+    'openai': "gpt-4o",
+    'anthropic': "claude-3-5-sonnet-20241022",
+}
+
+# Proxy variables removed before creating API clients (they break the SDK's HTTP client)
+PROXY_ENV_VARS = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy']
+
+# Clients are created once per process and reused (they are thread-safe and keep connections alive)
+_ai_clients = {}
+_ai_clients_lock = threading.Lock()
+
+# Thread pool and per-provider concurrency caps for sectioned extraction
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix='llm')
+_provider_semaphores = {
+    provider: threading.BoundedSemaphore(limit)
+    for provider, limit in PROVIDER_MAX_CONCURRENCY.items()
+}
+
+# Hedged attempts get their own pool so they never wait behind the requests that spawned them
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_WORKERS * 2, thread_name_prefix='hedge')
+LLM_LATENCY = llm_hedging.LatencyTracker()
+HEDGE_STATS = llm_hedging.HedgeStats()
+# Hedged attempts need cancellable connections; these clients are reused across attempts
+HEDGE_CLIENTS = llm_hedging.HedgeClientPool(
+    lambda provider, http_client: create_ai_client(provider, http_client=http_client),
+    size=HEDGE_CLIENT_POOL_SIZE,
+    timeout=httpx.Timeout(600.0, connect=10.0)
+)
+
+RATE_LIMITER = llm_rate_limiter.RateLimiter(AI_RATE_LIMITS, max_queue_wait=AI_MAX_QUEUE_WAIT)
+
+# One circuit breaker per provider (per worker process)
+CIRCUIT_BREAKERS = {
+    provider: llm_resilience.CircuitBreaker(provider)
+    for provider in ('openai', 'anthropic')
+}
+
+def build_poster_prompt(manuscript_excerpt, fields=None):
+    """Build the extraction prompt for all poster fields, or only the given subset."""
+    fields = fields or list(POSTER_SHAPE_MAP)
+    requirements = "\n".join(f'- "{key}": {POSTER_FIELD_REQUIREMENTS[key]}' for key in fields)
+    example = json.dumps({key: POSTER_PROMPT_EXAMPLE[key] for key in fields}, indent=2, ensure_ascii=False)
+    return f"""{POSTER_PROMPT_HEADER}
 **JSON keys and requirements:**
-- "headline": A short, punchy phrase (3-8 words) summarizing the main finding. Surround 2-5 important words with asterisks (e.g., *BOOSTS* or *DIGITAL HEALTH*).
-- "title": The full title of the research.
-- "authors": **COMPLETE list of all authors** - include every author name found in the manuscript. Do not use "et al" or truncate the list.
-- "affiliations": **COMPLETE list of all affiliations** - include every institution, department, and affiliation mentioned. Do not use "(see manuscript for full list)" or truncate.
-- "subtitle": (optional) A brief subtitle if available.
-- "Introduction": EXACTLY 65-75 words. Provide a comprehensive background, context, and rationale for the study. Include key concepts, current state of knowledge, and gaps that justify the research. PRESERVE THE EXACT CITATION STYLE from the original manuscript (e.g., if the PDF uses "(Smith et al., 2020)" or "[1]" or "¹", keep that exact format).
-- "Objective": 15-25 words. Clear, specific research objective or question.
-- "Methods": EXACTLY 80-90 words. Include study design, participants, procedures, data collection, and analysis methods. Be specific about sample size, timeframes, and key variables. PRESERVE THE EXACT CITATION STYLE from the original manuscript.
-- "Results": EXACTLY 80-90 words. Present key findings with specific numbers, percentages, or statistics when available. Include sample sizes, effect sizes, and significance levels.
-- "Discussion": 60-80 words. Interpret the main findings, discuss implications, limitations, and future directions. PRESERVE THE EXACT CITATION STYLE from the original manuscript.
-- "Conclusions": EXACTLY 65-75 words. Summarize key findings and their significance. Include clinical or practical implications and recommendations.
-- "References": Only references actually cited in the Introduction, Methods, or Discussion, PRESERVING THE EXACT REFERENCE FORMAT from the original manuscript (e.g., if the PDF uses APA style, keep APA style; if it uses Vancouver style, keep Vancouver style). Include complete reference details - do not use "et al" in references.
+{requirements}
 
 **Example output:**
-{{
-  "headline": "DIGITAL HEALTH *BOOSTS* OUTCOMES in chronic pain",
-  "title": "Digital health interventions for chronic pain: A systematic review",
-  "authors": "Smith J, Doe A, Johnson B, Williams C, Brown D, Davis E, Wilson F, Anderson G, Taylor H, Martinez I",
-  "affiliations": "Department of Pain Medicine, University of Example; School of Health Sciences, Medical College; Institute of Digital Health, Technology University; Department of Psychology, State University; Center for Chronic Pain Research, National Institute",
-  "subtitle": "",
-  "Introduction": "Chronic pain affects millions of people worldwide (Cohen et al., 2021) and remains a significant public health challenge with substantial economic and social costs. Current treatment approaches often provide limited relief, creating an urgent need for innovative solutions. Digital health interventions, including mobile applications, wearable devices, and telehealth platforms, have emerged as promising alternatives that can deliver personalized care remotely (Fishman, 2021). This systematic review examines the effectiveness of these digital interventions in managing chronic pain conditions.",
-  "Objective": "To evaluate the effectiveness of digital health interventions for chronic pain management.",
-  "Methods": "We conducted a systematic review of randomized controlled trials published between 2010 and 2023. Electronic databases including PubMed, Embase, Cochrane Library, and PsycINFO were searched using relevant keywords. Studies were included if they evaluated digital interventions for chronic pain in adults. Primary outcomes were pain intensity and quality of life measures. Two independent reviewers screened articles and extracted data.",
-  "Results": "Twenty-three studies met inclusion criteria with a total of 2,847 participants. Digital interventions led to significant reductions in pain intensity compared to usual care (mean difference -1.2 points on 0-10 scale, 95% CI -1.8 to -0.6). Quality of life improvements were also observed across multiple domains. Mobile applications showed the strongest effects, with 65% of studies reporting clinically meaningful improvements.",
-  "Discussion": "Digital health interventions demonstrate promising results for chronic pain management, particularly mobile applications and telehealth platforms (Smith et al., 2022). However, heterogeneity in intervention types and outcome measures limits generalizability. Long-term effectiveness and cost-effectiveness require further investigation.",
-  "Conclusions": "Digital health interventions can significantly improve outcomes for chronic pain patients, with mobile applications showing particular promise. These findings support the integration of digital solutions into pain management protocols. Future research should focus on long-term efficacy, cost-effectiveness, and implementation strategies.",
-  "References": "Cohen SP, Vase L, Hooten WM. Chronic pain: an update on burden, best practices, and new advances. Lancet. 2021;397(10289):2082-2097. Fishman SM. Addressing the opioid crisis through education. Pain Med. 2021;22(4):741-742. Smith J, Doe A, Johnson B. Digital health interventions for chronic pain. Pain. 2022;163(5):1001-1010."
-}}
+{example}
 
 **TEXT:**
-{manuscript_text[:30000]}
+{manuscript_excerpt}
 """
 
+def build_poster_schema(fields=None):
+    """JSON schema for the poster fields (POSTER_SHAPE_MAP keys), all required strings."""
+    fields = fields or list(POSTER_SHAPE_MAP)
+    return {
+        "type": "object",
+        "properties": {
+            key: {"type": "string", "description": POSTER_FIELD_REQUIREMENTS[key]}
+            for key in fields
+        },
+        "required": list(fields),
+        "additionalProperties": False
+    }
+
+def _remove_proxy_env_vars():
+    """Remove proxy environment variables so the SDK clients connect directly."""
+    for var in PROXY_ENV_VARS:
+        if var in os.environ:
+            del os.environ[var]
+
+def provider_sdk(provider):
+    """
+    A provider's SDK module, imported on first use. The openai package alone takes about
+    0.6s to import, and a worker usually only ever talks to one provider.
+    """
+    if provider == 'openai':
+        import openai
+        return openai
+    if provider == 'anthropic':
+        import anthropic
+        return anthropic
+    raise ValueError(f"Unsupported API provider: {provider}")
+
+def create_ai_client(provider, http_client=None, max_retries=0):
+    """
+    Create an API client for a provider, optionally on a caller-owned HTTP client.
+    SDK retries are off by default; request_ai_completion retries with its own policy.
+    """
+    _remove_proxy_env_vars()
+    sdk = provider_sdk(provider)
+    if provider == 'openai':
+        try:
+            # Create client with only the API key (and base URL override if set)
+            return sdk.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_client=http_client, max_retries=max_retries)
+        except Exception as e:
+            print(f"❌ Error creating OpenAI client: {e}")
+            # Try with explicit parameters
+            client = sdk.OpenAI(
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL or "https://api.openai.com/v1",
+                http_client=http_client,
+                max_retries=max_retries
+            )
+            print(f"✅ OpenAI client created with explicit base_url")
+            return client
+    elif provider == 'anthropic':
+        return sdk.Anthropic(api_key=ANTHROPIC_API_KEY, base_url=ANTHROPIC_BASE_URL, http_client=http_client, max_retries=max_retries)
+    raise ValueError(f"Unsupported API provider: {provider}")
+
+def get_ai_client(provider):
+    """Return the (cached) API client for a provider."""
+    client = _ai_clients.get(provider)
+    if client is not None:
+        return client
+
+    with _ai_clients_lock:
+        if provider in _ai_clients:
+            return _ai_clients[provider]
+
+        version = provider_sdk(provider).__version__
+        print(f"🔍 Creating {provider.title()} client (version {version})...")
+        client = create_ai_client(provider)
+        print(f"✅ {provider.title()} client created successfully")
+        _ai_clients[provider] = client
+        return client
+
+def provider_configured(provider):
+    """Whether an API key is set for the provider."""
+    return bool(OPENAI_API_KEY if provider == 'openai' else ANTHROPIC_API_KEY if provider == 'anthropic' else None)
+
+def request_ai_completion(provider, prompt, max_tokens=4000, handle=None, schema=None):
+    """
+    Send a prompt to the provider and return (raw_content, error).
+    With a `schema` the provider is asked for output matching it and raw_content is that JSON.
+    With a hedging `handle` the request runs on a cancellable client from HEDGE_CLIENTS so the race can abort it.
+    """
+    if provider == 'openai':
+        if not OPENAI_API_KEY:
+            return None, "OpenAI API key not configured"
+    elif provider == 'anthropic':
+        if not ANTHROPIC_API_KEY:
+            return None, "Anthropic API key not configured"
+    else:
+        return None, f"Unsupported API provider: {provider}"
+
+    pooled = None
     try:
-        if provider == 'openai':
-            if not OPENAI_API_KEY:
-                return None, "OpenAI API key not configured"
-            
-            # Completely clear all proxy-related environment variables
-            import os
-            proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy']
-            for var in proxy_vars:
-                if var in os.environ:
-                    del os.environ[var]
-            
-            # Print environment for debugging
-            print(f"🔍 Environment after proxy cleanup:")
-            for var in proxy_vars:
-                print(f"  {var}: {os.environ.get(var, 'NOT SET')}")
-            
-            # Create client with explicit parameters to avoid any proxy issues
-            import openai
-            print(f"🔍 Creating OpenAI client...")
-            print(f"🔍 OpenAI version: {openai.__version__}")
-            
-            # Try to create client with minimal parameters
+        if handle is None:
+            client = get_ai_client(provider)
+        else:
+            pooled = HEDGE_CLIENTS.checkout(provider, handle)
+            client = pooled.client
+
+        # Reserve the prompt plus the most the answer may use against the provider's limits
+        estimated_tokens = estimate_tokens(AI_SYSTEM_PROMPT) + estimate_tokens(prompt) + max_tokens
+        should_stop = (lambda: handle.cancelled) if handle is not None else None
+
+        def send():
+            RATE_LIMITER.acquire(provider, estimated_tokens, should_stop)
+            if should_stop and should_stop():
+                raise RuntimeError(f"{provider} request cancelled while queued")
             try:
-                # Create client in a completely isolated way
-                import openai
-                import os
-                
-                # Save current environment
-                original_env = dict(os.environ)
-                
-                # Clear all proxy-related environment variables
-                proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy']
-                for var in proxy_vars:
-                    if var in os.environ:
-                        del os.environ[var]
-                
-                # Create client with only the API key
-                client = openai.OpenAI(api_key=OPENAI_API_KEY)
-                print(f"✅ OpenAI client created successfully")
-                
-                # Restore original environment
-                os.environ.clear()
-                os.environ.update(original_env)
-                
+                raw_content = send_to_provider()
             except Exception as e:
-                print(f"❌ Error creating OpenAI client: {e}")
-                print(f"❌ Error type: {type(e)}")
-                print(f"❌ Error args: {e.args}")
-                
-                # Try with explicit parameters
-                try:
-                    client = openai.OpenAI(
-                        api_key=OPENAI_API_KEY,
-                        base_url="https://api.openai.com/v1"
-                    )
-                    print(f"✅ OpenAI client created with explicit base_url")
-                except Exception as e2:
-                    print(f"❌ Failed with explicit base_url: {e2}")
-                    raise e2
-            response = client.chat.completions.create(
-                model="gpt-4o",
+                if getattr(e, 'status_code', None) == 429:
+                    RATE_LIMITER.record_rate_limited(provider)
+                raise
+            RATE_LIMITER.record_success(provider)
+            return raw_content
+
+        def send_to_provider():
+            if provider == 'openai':
+                options = {}
+                if schema is not None:
+                    options['response_format'] = {
+                        "type": "json_schema",
+                        "json_schema": {"name": "poster_content", "strict": True, "schema": schema}
+                    }
+                response = client.chat.completions.create(
+                    model=AI_MODELS['openai'],
+                    messages=[
+                        {"role": "system", "content": AI_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.4,
+                    **options
+                )
+                return response.choices[0].message.content
+
+            if schema is not None:
+                return send_anthropic_tool_request()
+
+            response = client.messages.create(
+                model=AI_MODELS['anthropic'],
+                max_tokens=max_tokens,
+                temperature=0.4,
+                system=AI_SYSTEM_PROMPT,
                 messages=[
-                    {"role": "system", "content": "You are an expert in academic writing and research poster design."},
                     {"role": "user", "content": prompt}
-                ],
-                temperature=0.4
+                ]
             )
-            raw_content = response.choices[0].message.content
-            
-        elif provider == 'anthropic':
-            if not ANTHROPIC_API_KEY:
-                return None, "Anthropic API key not configured"
-            
-            # Completely clear all proxy-related environment variables
-            import os
-            proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy']
-            for var in proxy_vars:
-                if var in os.environ:
-                    del os.environ[var]
-            
-            # Print environment for debugging
-            print(f"🔍 Environment after proxy cleanup:")
-            for var in proxy_vars:
-                print(f"  {var}: {os.environ.get(var, 'NOT SET')}")
-            
-            # Create client with explicit parameters to avoid any proxy issues
-            import anthropic
-            print(f"🔍 Creating Anthropic client...")
-            print(f"🔍 Anthropic version: {anthropic.__version__}")
-            
-            # Try to create client with minimal parameters
-            try:
-                client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-                print(f"✅ Anthropic client created successfully")
-            except Exception as e:
-                print(f"❌ Error creating Anthropic client: {e}")
-                # Try alternative approach
-                import os
-                # Temporarily unset all proxy variables
-                original_env = {}
-                proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy', 'ALL_PROXY', 'all_proxy', 'NO_PROXY', 'no_proxy']
-                for var in proxy_vars:
-                    if var in os.environ:
-                        original_env[var] = os.environ[var]
-                        del os.environ[var]
-                
-                try:
-                    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-                    print(f"✅ Anthropic client created successfully after proxy cleanup")
-                except Exception as e2:
-                    print(f"❌ Still failed after proxy cleanup: {e2}")
-                    raise e2
-                finally:
-                    # Restore original environment
-                    for var, value in original_env.items():
-                        os.environ[var] = value
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
+            return response.content[0].text
+
+        def send_anthropic_tool_request():
+            # This SDK version has no `tools` argument, so the tool definition goes in the request body
+            # and the raw JSON is read back (its response models predate tool_use blocks)
+            raw_response = client.messages.with_raw_response.create(
+                model=AI_MODELS['anthropic'],
+                max_tokens=max_tokens,
                 temperature=0.4,
-                system="You are an expert in academic writing and research poster design.",
+                system=AI_SYSTEM_PROMPT,
                 messages=[
                     {"role": "user", "content": prompt}
-                ]
+                ],
+                extra_body={
+                    "tools": [{
+                        "name": POSTER_TOOL_NAME,
+                        "description": "Record the extracted poster content.",
+                        "input_schema": schema
+                    }],
+                    "tool_choice": {"type": "tool", "name": POSTER_TOOL_NAME}
+                }
             )
-            raw_content = response.content[0].text
-            
-        else:
-            return None, f"Unsupported API provider: {provider}"
-        
-        # Clean the response
-        cleaned_content = (
-            raw_content.strip()
-            .removeprefix("```python")
-            .removesuffix("```")
-            .removeprefix("```json")
-            .removesuffix("```")
-            .strip()
+            for block in raw_response.http_response.json().get('content', []):
+                if block.get('type') == 'tool_use' and block.get('name') == POSTER_TOOL_NAME:
+                    return json.dumps(block.get('input', {}), ensure_ascii=False)
+                if block.get('type') == 'text' and '{' in block.get('text', ''):
+                    return block['text']
+            raise ValueError("Anthropic response had no poster tool call")
+
+        # Hedged attempts are not retried: a failure hands over to the other provider straight away
+        raw_content, error_class, error = llm_resilience.call_with_retries(
+            send,
+            CIRCUIT_BREAKERS[provider],
+            should_stop=should_stop,
+            max_retries=0 if handle is not None else llm_resilience.MAX_RETRIES
         )
-        
-        print(f"🔍 Raw content length: {len(raw_content)}")
-        print(f"🔍 Cleaned content length: {len(cleaned_content)}")
-        print(f"🔍 First 200 chars: {cleaned_content[:200]}")
-        
-        # Try to extract JSON from text if it's wrapped
-        if (cleaned_content.startswith("Here's the structured content") or 
-            cleaned_content.startswith("Here's the formatted content") or
-            cleaned_content.startswith("Here's the extracted content")):
-            # Extract the JSON part after the colon
-            json_start = cleaned_content.find('{')
-            if json_start != -1:
-                cleaned_content = cleaned_content[json_start:]
-                print(f"🔍 Extracted JSON from text wrapper")
-        
-        # Clean up invalid control characters and line breaks in JSON strings
-        import re
-        # Replace newlines and carriage returns within quoted strings with spaces
-        cleaned_content = re.sub(r'"([^"]*?)(?:\n|\r)([^"]*?)"', r'"\1 \2"', cleaned_content)
-        # Also handle multi-line strings more comprehensively
-        cleaned_content = re.sub(r'([^"])\n([^"])', r'\1 \2', cleaned_content)
-        
-        print(f"🔍 Final cleaned content length: {len(cleaned_content)}")
-        print(f"🔍 Last 200 chars: {cleaned_content[-200:]}")
-        
-        # Parse the response
-        try:
-            # First try to parse as JSON
-            try:
-                import json
-                poster = json.loads(cleaned_content)
-                print(f"✅ Successfully parsed as JSON")
-            except json.JSONDecodeError as json_error:
-                print(f"⚠️ JSON parsing failed: {json_error}")
-                print(f"🔧 Failed content (first 500 chars): {cleaned_content[:500]}")
-                print(f"🔧 Failed content (last 500 chars): {cleaned_content[-500:]}")
-                
-                # If JSON fails, try Python eval (handles single quotes)
-                try:
-                    poster = eval(cleaned_content)
-                    print(f"✅ Successfully parsed with eval")
-                except Exception as eval_error:
-                    print(f"❌ Eval parsing failed: {eval_error}")
-                    print(f"🔧 Content that failed eval: {cleaned_content[:1000]}")
-                    raise eval_error
-            
-            # Clean up references
-            if 'References' in poster:
-                ref = poster['References'].strip()
-                print(f"🔍 [DEBUG] Raw references from API: '{ref}'")
-                print(f"🔍 [DEBUG] References length: {len(ref)} characters")
-                cleaned = ref.replace('[Reference details not found]', '').replace(' ,', ',').replace(', ,', ',').strip(',; .\n')
-                print(f"🔍 [DEBUG] Cleaned references: '{cleaned}'")
-                if cleaned and cleaned.strip():
-                    poster['References'] = cleaned.strip()
-                    print(f"✅ [DEBUG] Final references set: '{poster['References']}'")
-                else:
-                    poster['References'] = '[Reference details not found]'
-                    print(f"⚠️ [DEBUG] References were empty, set to placeholder")
-            else:
-                print(f"⚠️ [DEBUG] No 'References' key found in API response")
-                print(f"🔍 [DEBUG] Available keys: {list(poster.keys())}")
-            
-            return poster, None
-            
-        except Exception as parse_error:
-            print(f"❌ Final parsing error: {parse_error}")
-            return None, f"{provider.upper()} API response was not valid Python/JSON. Response was: {cleaned_content}"
-            
     except Exception as e:
         return None, f"Error calling {provider.upper()} API: {e}"
+    finally:
+        if pooled is not None:
+            HEDGE_CLIENTS.checkin(provider, pooled)
+
+    if error_class is None:
+        return raw_content, None
+    if handle is not None and handle.cancelled:
+        return None, f"{provider.upper()} request cancelled"
+    if isinstance(error, llm_rate_limiter.AdmissionRejected):
+        return None, f"{provider.upper()} API is busy right now (estimated wait {error.wait:.0f}s). Please try again shortly."
+    if error_class == llm_resilience.ErrorClass.CIRCUIT_OPEN:
+        wait_seconds = CIRCUIT_BREAKERS[provider].retry_after()
+        return None, f"{provider.upper()} API is temporarily unavailable after repeated errors (retry in {wait_seconds:.0f}s)"
+    return None, f"Error calling {provider.upper()} API: {error}"
+
+def provider_available(provider):
+    """Whether the provider is configured and its circuit breaker lets requests through."""
+    return provider_configured(provider) and CIRCUIT_BREAKERS[provider].would_allow()
+
+def ai_unavailable_retry_after(provider=None):
+    """
+    Seconds until an AI request is worth trying again if every configured provider's
+    circuit is open, or `provider`'s queue is past the admission limit; otherwise None.
+    """
+    if provider in AI_RATE_LIMITS:
+        queue_wait = RATE_LIMITER.estimated_wait(provider)
+        if queue_wait > AI_MAX_QUEUE_WAIT:
+            return queue_wait - AI_MAX_QUEUE_WAIT
+    configured = [p for p in CIRCUIT_BREAKERS if provider_configured(p)]
+    if not configured or any(CIRCUIT_BREAKERS[p].would_allow() for p in configured):
+        return None
+    return min(CIRCUIT_BREAKERS[p].retry_after() for p in configured)
+
+def other_provider(provider):
+    """The provider a request can be hedged to."""
+    return 'anthropic' if provider == 'openai' else 'openai'
+
+def hedge_delay_for(provider, kind):
+    """Seconds to wait for `provider` before hedging: its rolling p90 for this kind of request."""
+    p90 = LLM_LATENCY.percentile(provider, kind, HEDGE_PERCENTILE)
+    if p90 is None:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, p90)
+
+def acquire_provider_slot(provider, handle=None):
+    """Wait for one of the provider's concurrent request slots. False if the (hedged) attempt was cancelled meanwhile."""
+    semaphore = _provider_semaphores[provider]
+    while not semaphore.acquire(timeout=0.5):
+        if handle is not None and handle.cancelled:
+            return False
+    return True
+
+def extract_with_provider(provider, prompt, fields=None, max_tokens=4000, kind='poster', handle=None, limit_concurrency=False):
+    """
+    Request a completion and parse it, recording the latency of valid answers. Returns (poster, error).
+    With `limit_concurrency` each request holds one of the provider's PROVIDER_MAX_CONCURRENCY slots.
+    """
+    for attempt in range(PARSE_RETRIES + 1):
+        if limit_concurrency and not acquire_provider_slot(provider, handle):
+            return None, f"{provider.upper()} request cancelled"
+        started = time.time()
+        try:
+            raw_content, error = request_ai_completion(
+                provider, prompt, max_tokens=max_tokens, handle=handle,
+                schema=build_poster_schema(fields) if STRUCTURED_OUTPUT else None
+            )
+        finally:
+            if limit_concurrency:
+                _provider_semaphores[provider].release()
+        if error:
+            return None, error
+        poster, error = parse_ai_response(raw_content, provider, fields)
+        if error is None:
+            LLM_LATENCY.record(provider, kind, time.time() - started)
+            return poster, None
+        if attempt < PARSE_RETRIES:
+            print(f"🔁 {provider.upper()} answer was not valid JSON; asking again")
+    return None, error
+
+def extract_poster_fields(provider, prompt, fields=None, max_tokens=4000, kind='poster', limit_concurrency=False):
+    """
+    Get parsed poster fields from the AI, hedging to the other provider when enabled
+    and configured. Concurrency limits apply to whichever provider each request goes to.
+    Returns (poster, error).
+    """
+    secondary = other_provider(provider)
+    if AI_FAILOVER and not CIRCUIT_BREAKERS[provider].would_allow() and provider_available(secondary):
+        print(f"🔀 {provider.upper()} circuit is open; failing over to {secondary.upper()}")
+        provider, secondary = secondary, provider
+
+    if not HEDGE_REQUESTS or not provider_configured(provider) or not provider_configured(secondary):
+        poster, error = extract_with_provider(provider, prompt, fields, max_tokens, kind,
+                                              limit_concurrency=limit_concurrency)
+        # The breaker may have opened during this request's retries
+        if error and AI_FAILOVER and not CIRCUIT_BREAKERS[provider].would_allow() and provider_available(secondary):
+            print(f"🔀 {provider.upper()} circuit opened; failing over to {secondary.upper()}")
+            return extract_with_provider(secondary, prompt, fields, max_tokens, kind, limit_concurrency=limit_concurrency)
+        return poster, error
+
+    def attempt(attempt_provider, handle):
+        return extract_with_provider(attempt_provider, prompt, fields, max_tokens, kind, handle, limit_concurrency)
+
+    poster, error, winner = llm_hedging.race_with_hedge(
+        attempt, provider, secondary, hedge_delay_for(provider, kind), HEDGE_EXECUTOR, HEDGE_STATS
+    )
+    if winner != provider and error is None:
+        print(f"🏁 Hedged request answered by {winner.upper()}")
+    return poster, error
+
+def parse_ai_response(raw_content, provider, fields=None):
+    """Parse the AI's raw text into a poster dictionary. Returns (poster, error)."""
+    expected_keys = fields or list(POSTER_SHAPE_MAP)
+    print(f"🔍 Raw content length: {len(raw_content)}")
+    
+    poster, parse_error = poster_json.parse_poster_json(raw_content, expected_keys)
+    if parse_error:
+        print(f"❌ Final parsing error: {parse_error}")
+        return None, f"{provider.upper()} API response was not valid JSON ({parse_error}). Response was: {raw_content}"
+    
+    # Clean up references
+    if 'References' in poster:
+        ref = poster['References'].strip()
+        print(f"🔍 [DEBUG] Raw references from API: '{ref}'")
+        print(f"🔍 [DEBUG] References length: {len(ref)} characters")
+        cleaned = ref.replace('[Reference details not found]', '').replace(' ,', ',').replace(', ,', ',').strip(',; .\n')
+        print(f"🔍 [DEBUG] Cleaned references: '{cleaned}'")
+        if cleaned and cleaned.strip():
+            poster['References'] = cleaned.strip()
+            print(f"✅ [DEBUG] Final references set: '{poster['References']}'")
+        else:
+            poster['References'] = '[Reference details not found]'
+            print(f"⚠️ [DEBUG] References were empty, set to placeholder")
+    
+    return poster, None
+
+def call_ai_api(manuscript_text, provider='openai', failed_groups=None):
+    """
+    Call the specified AI API to extract poster content. In sectioned mode the field groups
+    that could not be extracted are appended to `failed_groups` (their fields are left blank).
+    """
+    # Use the specified provider or fall back to current shared setting
+    if not provider:
+        provider = get_current_api_provider()
+    
+    if EXTRACTION_MODE == 'sectioned':
+        # Field groups are fed their own sections; without headings every group would get the same text
+        if is_segmented(segment_manuscript(manuscript_text)):
+            return call_ai_api_sectioned(manuscript_text, provider, failed_groups)
+        print("✂️ No section headings found in the manuscript; using a single request")
+    
+    print(f"🤖 Using {provider.upper()} API for content extraction...")
+    
+    # Build the manuscript text from a per-section token budget instead of a blind cut-off
+    manuscript_excerpt, budget_report = build_manuscript_excerpt(manuscript_text)
+    print(f"✂️ Manuscript budget: {format_budget_report(budget_report)}")
+    
+    prompt = build_poster_prompt(manuscript_excerpt)
+    return extract_poster_fields(provider, prompt)
+
+def call_ai_api_sectioned(manuscript_text, provider, failed_groups=None):
+    """
+    Extract poster content with one smaller request per field group, run in parallel.
+    Output generation is split across requests, and one malformed group only blanks its own fields;
+    those groups are appended to `failed_groups` as {'group', 'fields', 'error'}.
+    """
+    print(f"🤖 Using {provider.upper()} API for sectioned content extraction ({len(EXTRACTION_FIELD_GROUPS)} requests)...")
+    if provider not in _provider_semaphores:
+        return None, f"Unsupported API provider: {provider}"
+
+    def extract_group(group_name, group):
+        manuscript_excerpt, budget_report = build_manuscript_excerpt(manuscript_text, include=group['sections'])
+        print(f"✂️ [{group_name}] Manuscript budget: {format_budget_report(budget_report)}")
+        prompt = build_poster_prompt(manuscript_excerpt, group['fields'])
+        return extract_poster_fields(provider, prompt, group['fields'], SECTIONED_MAX_TOKENS, kind=group_name,
+                                     limit_concurrency=True)
+
+    futures = {
+        group_name: LLM_EXECUTOR.submit(extract_group, group_name, group)
+        for group_name, group in EXTRACTION_FIELD_GROUPS.items()
+    }
+
+    poster = {}
+    errors = []
+    for group_name, future in futures.items():
+        fields = EXTRACTION_FIELD_GROUPS[group_name]['fields']
+        part, error = future.result()
+        if error:
+            print(f"⚠️ [{group_name}] extraction failed: {error}")
+            errors.append(f"{group_name}: {error}")
+            if failed_groups is not None:
+                failed_groups.append({'group': group_name, 'fields': fields, 'error': error})
+            part = {}
+        for key in fields:
+            poster[key] = part.get(key, "")
+
+    if len(errors) == len(futures):
+        return None, "; ".join(errors)
+    if 'References' in poster and not poster['References']:
+        poster['References'] = '[Reference details not found]'
+    return poster, None
 
 def extract_information_from_pdf(manuscript_text):
     """Generate poster content using AI API or dummy data."""
-    global current_dummy_mode, current_api_provider
-    
     # Check if we should use dummy data
-    if current_dummy_mode:
+    if get_current_dummy_mode():
         print("🧪 Using dummy data instead of API call...")
         dummy_data, error = load_dummy_data()
         if error:
@@ -568,7 +1084,7 @@ def extract_information_from_pdf(manuscript_text):
         return dummy_data, None
     
     # Call the AI API with current provider
-    poster, error = call_ai_api(manuscript_text, current_api_provider)
+    poster, error = call_ai_api(manuscript_text, get_current_api_provider())
     if error:
         return None, error
     
@@ -576,12 +1092,10 @@ def extract_information_from_pdf(manuscript_text):
     save_dummy_data(poster)
     return poster, None
 
-def extract_information_from_pdf_with_provider(manuscript_text, provider):
+def extract_information_from_pdf_with_provider(manuscript_text, provider, failed_groups=None):
     """Generate poster content using AI API with specified provider or dummy data."""
-    global current_dummy_mode
-    
     # Check if we should use dummy data
-    if current_dummy_mode:
+    if get_current_dummy_mode():
         print("🧪 Using dummy data instead of API call...")
         dummy_data, error = load_dummy_data()
         if error:
@@ -589,12 +1103,13 @@ def extract_information_from_pdf_with_provider(manuscript_text, provider):
         return dummy_data, None
     
     # Call the AI API with specified provider
-    poster, error = call_ai_api(manuscript_text, provider)
+    poster, error = call_ai_api(manuscript_text, provider, failed_groups)
     if error:
         return None, error
     
-    # Save the API response as dummy data for future testing
-    save_dummy_data(poster)
+    # Save the API response as dummy data for future testing (unless some fields are missing)
+    if not failed_groups:
+        save_dummy_data(poster)
     return poster, None
 
 def find_shape_in_groups(slide, target_name):
@@ -608,6 +1123,149 @@ def find_shape_in_groups(slide, target_name):
                     return subshape
     return None
 
+def build_shape_index(slide):
+    """Index shapes by lower-case name, including shapes inside groups (same first-match order as find_shape_in_groups)."""
+    index = {}
+    for shape in slide.shapes:
+        index.setdefault(shape.name.lower(), shape)
+        if hasattr(shape, 'shapes'):
+            for subshape in shape.shapes:
+                index.setdefault(subshape.name.lower(), subshape)
+    return index
+
+def find_indexed_shape(shape_index, target_name):
+    """Find shape by name using an index from build_shape_index."""
+    return shape_index.get(target_name.lower())
+
+def is_job_file(path):
+    """Whether a file belongs to a single upload (its job workspace) rather than the library."""
+    return os.path.abspath(path).startswith(os.path.abspath(JOB_WORKSPACE_FOLDER) + os.sep)
+
+def get_template_manifest(template_path, presentation=None):
+    """
+    Compiled manifest of a template (shape paths, geometry, fonts, figure slots, missing shapes).
+    Library templates keep a _manifest.json sidecar; one-off uploads are compiled in memory only.
+    Returns None if the template cannot be compiled.
+    """
+    try:
+        return template_manifest.get_manifest(template_path, list(POSTER_SHAPE_MAP.values()),
+                                              presentation=presentation, write=not is_job_file(template_path))
+    except Exception as e:
+        print(f"⚠️ Could not compile template manifest for {os.path.basename(template_path)}: {e}")
+        return None
+
+def load_template_for_render(template_path):
+    """
+    Load a PowerPoint template and index the shapes on its first slide through its manifest.
+    Library templates are copied from a parse kept in memory rather than read again.
+    Returns (presentation, shape_index, manifest, error, seconds).
+    """
+    try:
+        start = time.perf_counter()
+        prs = template_manifest.load_presentation(template_path, keep=not is_job_file(template_path))
+        if len(prs.slides) == 0:
+            return None, None, None, "No slides found in template", 0.0
+        slide = prs.slides[0]
+        manifest = get_template_manifest(template_path, presentation=prs)
+        shape_index = template_manifest.index_shapes(slide, manifest, RENDER_SHAPE_NAMES) if manifest else None
+        if shape_index is None:
+            shape_index = build_shape_index(slide)  # No manifest, or it does not match the slide
+        return prs, shape_index, manifest, None, time.perf_counter() - start
+    except Exception as e:
+        return None, None, None, f"Error loading template: {e}", 0.0
+
+def preprocess_figure_image(image_path, prepared_path=None):
+    """
+    Downscale and recompress an oversized figure so the .pptx does not carry more pixels than it can print.
+    Writes to `prepared_path` (default: <name>_prepared<ext> next to the original).
+    Returns the path to use (the original path if nothing was changed or Pillow is unavailable).
+    """
+    if Image is None:
+        return image_path
+    try:
+        with Image.open(image_path) as img:
+            if max(img.size) <= MAX_FIGURE_PIXELS:
+                return image_path
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((MAX_FIGURE_PIXELS, MAX_FIGURE_PIXELS), Image.LANCZOS)
+            base, ext = os.path.splitext(image_path)
+            prepared_path = prepared_path or f"{base}_prepared{ext}"
+            if ext.lower() in ('.jpg', '.jpeg'):
+                img.convert('RGB').save(prepared_path, 'JPEG', quality=FIGURE_JPEG_QUALITY, optimize=True)
+            else:
+                img.save(prepared_path, 'PNG', optimize=True)
+        print(f"[DEBUG] Downscaled figure {os.path.basename(image_path)} to fit {MAX_FIGURE_PIXELS}px")
+        return prepared_path
+    except Exception as e:
+        print(f"[WARNING] Could not preprocess figure {image_path}: {e}")
+        return image_path
+
+def slim_output_file(output_file):
+    """
+    Strip unused layouts, masters, the thumbnail and orphaned media from a rendered poster (in place).
+    Returns {'bytes_before', 'bytes_after', 'bytes_saved', 'seconds'}, or None if slimming failed.
+    """
+    try:
+        report = pptx_slimmer.slim_pptx(output_file, compresslevel=OUTPUT_COMPRESSLEVEL)
+    except Exception as e:
+        # The unslimmed poster is still valid, so keep it
+        print(f"[WARNING] Could not slim {os.path.basename(output_file)}: {e}")
+        return None
+    if report['bytes_saved']:
+        print(f"🪶 Slimmed poster by {report['bytes_saved'] // 1024}KB "
+              f"({report['layouts_removed']} layouts, {len(report['parts_removed'])} parts removed) in {report['seconds']}s")
+    return {key: report[key] for key in ('bytes_before', 'bytes_after', 'bytes_saved', 'seconds')}
+
+def render_poster_preview(presentation, preview_file):
+    """
+    Draw the populated slide into a small image at preview_file (format from its extension).
+    Returns the seconds taken, or None if it could not be drawn.
+    """
+    if slide_preview is None:
+        return None
+    try:
+        start = time.perf_counter()
+        image = slide_preview.render_presentation(presentation, POSTER_PREVIEW_WIDTH)
+        if image is None:
+            return None
+        if preview_file.endswith('.webp'):
+            image.save(preview_file, 'WEBP', quality=80, method=4)
+        else:
+            image.save(preview_file, 'PNG', optimize=True)
+        return time.perf_counter() - start
+    except Exception as e:
+        # The poster itself is fine; the user just gets no preview
+        print(f"[WARNING] Could not draw poster preview: {e}")
+        return None
+
+def prepare_job_figure(stored, job_path):
+    """
+    Get the prepared variant of a stored figure (resizing it only the first time the
+    store sees it) and check it out into the job's own file. Returns job_path.
+    """
+    variant_path = figure_store.prepared_variant(stored, FIGURE_VARIANT_TAG, preprocess_figure_image)
+    return figure_store.checkout(variant_path, job_path)
+
+def extract_poster_content_from_pdf(pdf_path, provider):
+    """
+    Extract PDF text and call the AI API (the slow branch of the upload pipeline).
+    Returns (extracted_data, error_message, stage_timings, failed_groups).
+    """
+    timings = {}
+    failed_groups = []
+    start = time.perf_counter()
+    manuscript_text = extract_text_from_pdf(pdf_path)
+    timings['pdf_extract'] = round(time.perf_counter() - start, 4)
+    if not manuscript_text or manuscript_text.startswith("Error"):
+        return None, 'Failed to extract text from PDF. Please check if the PDF contains extractable text.', timings, failed_groups
+
+    start = time.perf_counter()
+    extracted_data, error = extract_information_from_pdf_with_provider(manuscript_text, provider, failed_groups)
+    timings['llm'] = round(time.perf_counter() - start, 4)
+    if error:
+        return None, f'Error extracting information: {error}', timings, failed_groups
+    return extracted_data, None, timings, failed_groups
+
 def get_title_font_size(title, template_name=None):
     """Return font size (Pt) for title based on content length and template configuration."""
     from template_configs import get_dynamic_font_size_config, get_default_dynamic_font_sizes
@@ -783,12 +1441,17 @@ def insert_colored_headline(shape, headline, highlight_rgb=(255,140,0), default_
 
 
 
-def populate_powerpoint_template(extracted_data, template_path, output_file, figure_paths=None, figure_descriptions=None):
-    """Populate PowerPoint template with extracted academic poster information and insert up to 3 figures if provided."""
+def populate_powerpoint_template(extracted_data, template_path, output_file, figure_paths=None, figure_descriptions=None, presentation=None, shape_index=None):
+    """
+    Populate PowerPoint template with extracted academic poster information and insert up to 4 figures if provided.
+    A presentation and shape index already loaded by load_template_for_render can be passed in to skip re-parsing.
+    """
     try:
-        # Load the PowerPoint template
-        prs = Presentation(template_path)
+        # Load the PowerPoint template (unless it was preloaded while the AI call was running)
+        prs = presentation if presentation is not None else Presentation(template_path)
         slide = prs.slides[0]
+        if shape_index is None:
+            shape_index = build_shape_index(slide)
         
         # Get template name for configuration
         import os
@@ -805,32 +1468,16 @@ def populate_powerpoint_template(extracted_data, template_path, output_file, fig
             title_settings = template_configs.get_font_settings(template_name_without_ext, "title")
             print(f"[DEBUG] Title settings: {title_settings}")
         
-        # Map poster dictionary keys to shape names in template
-        shape_map = {
-            "headline": "HeadlineBox",
-            "title": "TitleBox",
-            "authors": "AuthorBox",
-            "affiliations": "AffiliationBox",
-            "subtitle": "SubtitleBox",
-            "Introduction": "IntroductionBox",
-            "Objective": "ObjectiveBox",
-            "Methods": "MethodsBox",
-            "Results": "ResultsBox",
-            "Discussion": "DiscussionBox",
-            "Conclusions": "ConclusionBox",
-            "References": "ReferencesBox"
-        }
-        
         # Fill in the content
         title_font_size = None
-        for key, shape_name in shape_map.items():
+        for key, shape_name in POSTER_SHAPE_MAP.items():
             if key == "title":
                 content = extracted_data.get(key, "(No Title Extracted)")
             else:
                 content = extracted_data.get(key, "")
             if content:
                 # Find the shape with the exact name
-                shape = find_shape_in_groups(slide, shape_name)
+                shape = find_indexed_shape(shape_index, shape_name)
                 
                 # Add debugging for references specifically
                 if key == "References":
@@ -1075,7 +1722,7 @@ def populate_powerpoint_template(extracted_data, template_path, output_file, fig
                     placeholder_name = f'Fig{i+1}Placeholder'
                     print(f"[DEBUG] Looking for placeholder: {placeholder_name}")
                     
-                    fig_shape = find_shape_in_groups(slide, placeholder_name)
+                    fig_shape = find_indexed_shape(shape_index, placeholder_name)
                     if fig_shape:
                         print(f"[DEBUG] ✅ Found placeholder: {placeholder_name}")
                         
@@ -1088,9 +1735,9 @@ def populate_powerpoint_template(extracted_data, template_path, output_file, fig
                     else:
                         print(f"[DEBUG] ❌ Placeholder {placeholder_name} NOT found on slide.")
                         # Try alternative placeholder names
-                        alt_names = [f'Figure{i+1}Placeholder', f'Fig{i+1}PlaceholderLarge', f'Fig{i+1}PlaceholderSmall']
+                        alt_names = figure_placeholder_names(i+1)[1:]
                         for alt_name in alt_names:
-                            alt_shape = find_shape_in_groups(slide, alt_name)
+                            alt_shape = find_indexed_shape(shape_index, alt_name)
                             if alt_shape:
                                 print(f"[DEBUG] ✅ Found alternative placeholder: {alt_name}")
                                 success, error = insert_image_safely(slide, fig_path, alt_shape, alt_name)
@@ -1122,12 +1769,12 @@ def populate_powerpoint_template(extracted_data, template_path, output_file, fig
                             # Determine description box name based on figure number
                             desc_box_name = f'FigureDesc{i}'
                             
-                            desc_shape = find_shape_in_groups(slide, desc_box_name)
+                            desc_shape = find_indexed_shape(shape_index, desc_box_name)
                             if not desc_shape:
                                 # Try alternative description box names
-                                alt_desc_names = [f'FigDesc{i}', f'Figure{i}Desc', f'Fig{i}Desc']
+                                alt_desc_names = figure_description_names(i)[1:]
                                 for alt_desc_name in alt_desc_names:
-                                    desc_shape = find_shape_in_groups(slide, alt_desc_name)
+                                    desc_shape = find_indexed_shape(shape_index, alt_desc_name)
                                     if desc_shape:
                                         print(f"[DEBUG] Found alternative description box: {alt_desc_name}")
                                         break
@@ -1214,20 +1861,54 @@ def populate_powerpoint_template(extracted_data, template_path, output_file, fig
     except Exception as e:
         return False, f"Error populating PowerPoint template: {e}"
 
+def page_response(template_name):
+    """A page from the in-memory page cache, compressed as the client accepts, revalidated by ETag."""
+    if not PAGE_CACHE_ENABLED:
+        return render_template(template_name)
+    page = PAGE_CACHE.get(template_name, lambda: render_template(template_name))
+    encoding = static_assets.negotiate(request.headers.get('Accept-Encoding'), page['variants'])
+    etag = f"{page['etag']}-{encoding}" if encoding else page['etag']
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(page['variants'][encoding])
+        response.mimetype = 'text/html'
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Pages keep their URL; the assets they name are immutable
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/')
 def index():
     """Main landing page for email capture."""
-    return render_template('landing_page.html')
+    return page_response('landing_page.html')
 
 @app.route('/app')
 def app_page():
     """Main application page with upload form."""
-    return render_template('index.html')
+    return page_response('index.html')
 
 @app.route('/landing_page.html')
 def landing_page():
     """Landing page for email capture."""
-    return render_template('landing_page.html')
+    return page_response('landing_page.html')
+
+@app.route('/static/dist/<path:filename>')
+def static_asset(filename):
+    """Serve a fingerprinted asset, precompressed as the client accepts. Its name changes whenever it does."""
+    file_path = safe_join(static_assets.DIST_FOLDER, filename)
+    if not file_path or filename.startswith('pages/') or not os.path.isfile(file_path):
+        return jsonify({'error': 'Asset not found.'}), 404
+    send_path, encoding = static_assets.encoded_variant(file_path, request.headers.get('Accept-Encoding'))
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = send_file(send_path, mimetype=mimetype, conditional=True, etag=True, max_age=31536000)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = static_assets.IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/template_library/<path:filename>')
 def serve_template_library(filename):
@@ -1242,6 +1923,7 @@ def test():
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Handle file upload and processing."""
+    workspace = None
     try:
         print(f"[DEBUG] Upload request received. Content-Length: {request.content_length}")
         print(f"[DEBUG] Max content length: {app.config['MAX_CONTENT_LENGTH']}")
@@ -1260,14 +1942,22 @@ def upload_files():
         
         # Get form data (academic posters only)
         extraction_type = "academic"
-        global current_dummy_mode
+        # Read the mode once so the whole request sees a consistent value
+        current_dummy_mode = get_current_dummy_mode()
+
+        # Per-stage wall-clock timings (seconds), returned to the client for load testing
+        stage_timings = {}
+        stage_start = time.perf_counter()
+
+        # Private folder for this job's inputs and scratch files, removed when the request ends
+        workspace = JobWorkspace(JOB_WORKSPACE_FOLDER)
 
         # Handle up to 4 figure image uploads (reduced from 6 to avoid 413 errors)
         figure_paths = [None, None, None, None]
+        stored_figures = [None, None, None, None]
         figures_uploaded = False
         total_figure_size = 0
         max_figure_size = 100 * 1024 * 1024  # 100MB per figure
-        files_to_cleanup = []  # Track files for cleanup
         
         for i in range(1, 5):
             fig_file = request.files.get(f'figure{i}_file')
@@ -1287,18 +1977,16 @@ def upload_files():
                 if total_figure_size > MAX_CONTENT_LENGTH:
                     return jsonify({'error': f'Total figure size ({total_figure_size // (1024*1024)}MB) exceeds limit. Please reduce file sizes.'}), 400
                 
-                fig_path = os.path.join(UPLOAD_FOLDER, secure_filename(fig_file.filename))
-                fig_file.save(fig_path)
-                files_to_cleanup.append(fig_path)  # Add to cleanup list
-                
-                # Validate the uploaded image
-                is_valid, error_msg = validate_image_file(fig_path)
-                if not is_valid:
-                    # Clean up the invalid file immediately
-                    cleanup_uploaded_files([fig_path], keep_final_output=False)
+                # Store by content hash; a figure seen before is neither written twice nor re-validated
+                ext = os.path.splitext(secure_filename(fig_file.filename))[1].lower()
+                stored, error_msg = figure_store.ingest(fig_file, ext, validate=validate_image_file)
+                if error_msg:
                     return jsonify({'error': f'Figure {i}: {error_msg}'}), 400
+                if stored.existed:
+                    print(f"♻️ Figure {i} already stored ({stored.digest[:12]}); reusing it")
                 
-                figure_paths[i-1] = fig_path
+                stored_figures[i-1] = stored
+                figure_paths[i-1] = workspace.file(f"figure{i}{ext}")
                 figures_uploaded = True
         
         # Set figure_paths to None if no figures were uploaded
@@ -1306,56 +1994,38 @@ def upload_files():
             figure_paths = None
 
         # Handle dummy mode (no PDF required)
+        pdf_path = None
+        requested_provider = None  # Only API mode asks for a provider
         if current_dummy_mode:
             print("🧪 Processing in dummy mode - no PDF required")
             if not os.path.exists(DUMMY_DATA_FILE):
                 return jsonify({'error': 'Dummy data not found. Please process a PDF in API mode first to create dummy data.'}), 400
-            dummy_data, error = load_dummy_data()
-            if error:
-                return jsonify({'error': f'Error loading dummy data: {error}'}), 400
-            extracted_data = dummy_data
             pdf_basename = "dummy_data"
         else:
             if 'pdf_file' not in request.files:
                 return jsonify({'error': 'Please upload a PDF file for API mode.'}), 400
             pdf_file = request.files['pdf_file']
-            template_file = request.files.get('template_file')
-            selected_template = request.form.get('selected_template')
             if pdf_file.filename == '':
                 return jsonify({'error': 'Please select a PDF file.'}), 400
             if not allowed_file(pdf_file.filename, {'pdf'}):
                 return jsonify({'error': 'PDF file must have .pdf extension.'}), 400
-            pdf_path = os.path.join(UPLOAD_FOLDER, secure_filename(pdf_file.filename))
+            pdf_path = workspace.file(secure_filename(pdf_file.filename))
             pdf_file.save(pdf_path)
-            files_to_cleanup.append(pdf_path)  # Add to cleanup list
-            
-            manuscript_text = extract_text_from_pdf(pdf_path)
-            if not manuscript_text or manuscript_text.startswith("Error"):
-                cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
-                return jsonify({'error': 'Failed to extract text from PDF. Please check if the PDF contains extractable text.'}), 400
+            pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
             
             # Get AI provider from form data
             requested_provider = request.form.get('ai_provider', 'openai')
             print(f"🤖 User requested AI provider: {requested_provider}")
-            
-            # Extract information using the requested provider
-            extracted_data, error = extract_information_from_pdf_with_provider(manuscript_text, requested_provider)
-            if error:
-                cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
-                return jsonify({'error': f'Error extracting information: {error}'}), 400
-            pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
 
-        # Template selection logic
+        # Template selection logic (resolved before the AI call so a bad template fails fast)
         template_file = request.files.get('template_file')
         selected_template = request.form.get('selected_template')
         template_path = None
         if template_file and template_file.filename != '':
             if not allowed_file(template_file.filename, {'pptx'}):
-                cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
                 return jsonify({'error': 'Template file must have .pptx extension.'}), 400
-            template_path = os.path.join(UPLOAD_FOLDER, secure_filename(template_file.filename))
+            template_path = workspace.file(secure_filename(template_file.filename))
             template_file.save(template_path)
-            files_to_cleanup.append(template_path)  # Add to cleanup list
         elif selected_template and selected_template != 'default':
             # Search for template in all folders
             template_found = False
@@ -1364,37 +2034,120 @@ def upload_files():
                 if os.path.exists(folder_path):
                     test_path = os.path.join(folder_path, selected_template)
                     if os.path.exists(test_path):
-                        template_path = test_path
+                        template_path = library_render_path(test_path)
                         template_found = True
                         break
             
             if not template_found:
-                cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
                 return jsonify({'error': 'Selected template not found in library.'}), 400
         else:
             template_path = "default_template.pptx"
             if not os.path.exists(template_path):
-                cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
                 return jsonify({'error': 'No template selected and default template not found. Please upload a PowerPoint template or select from library.'}), 400
 
         # Extract figure descriptions from form data
         figure_descriptions = request.form.get('figure_descriptions', '{}')
-        
-        # Create output filename
+        stage_timings['receive'] = round(time.perf_counter() - stage_start, 4)
+
+        # Run the pipeline as a dependency graph: the PDF -> AI branch is the slow one,
+        # so template loading/shape indexing and figure preparation run while it is in flight
+        stage_start = time.perf_counter()
+        if not current_dummy_mode:
+            extraction_future = PIPELINE_EXECUTOR.submit(extract_poster_content_from_pdf, pdf_path, requested_provider)
+        template_future = PIPELINE_EXECUTOR.submit(load_template_for_render, template_path)
+        figure_futures = [PIPELINE_EXECUTOR.submit(prepare_job_figure, stored, path) if path else None
+                          for stored, path in zip(stored_figures, figure_paths or [])]
+
+        failed_groups = []
+        if current_dummy_mode:
+            extracted_data, extraction_error = load_dummy_data()
+            if extraction_error:
+                extraction_error = f'Error loading dummy data: {extraction_error}'
+        else:
+            extracted_data, extraction_error, extraction_timings, failed_groups = extraction_future.result()
+            stage_timings.update(extraction_timings)
+
+        presentation, shape_index, manifest, template_error, template_seconds = template_future.result()
+        stage_timings['template_load'] = round(template_seconds, 4)
+        if figure_futures:
+            figure_paths = [future.result() if future else None for future in figure_futures]
+        stage_timings['parallel'] = round(time.perf_counter() - stage_start, 4)
+
+        if extraction_error:
+            # Dummy data errors say nothing about the AI providers
+            retry_after = None if current_dummy_mode else ai_unavailable_retry_after(requested_provider)
+            if retry_after is not None:
+                # Every provider is failing or the queue is full; tell the client when to come back
+                response = jsonify({'error': extraction_error, 'retry_after': round(retry_after)})
+                response.headers['Retry-After'] = str(max(1, round(retry_after)))
+                return response, 503
+            return jsonify({'error': extraction_error}), 400
+        if template_error:
+            return jsonify({'error': f'Error creating presentation: {template_error}'}), 400
+        
+        # Render inside the workspace; the job ID keeps same-second posters of the same PDF apart
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = os.path.join(UPLOAD_FOLDER, f"{pdf_basename}_academic_{timestamp}.pptx")
-        success, error = populate_powerpoint_template(extracted_data, template_path, output_file, figure_paths, figure_descriptions)
-        if not success:
-            cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
-            return jsonify({'error': f'Error creating presentation: {error}'}), 400
+        output_name = f"{pdf_basename}_academic_{timestamp}_{workspace.job_id}.pptx"
+        output_file = workspace.file(output_name)
+        preview_format = POSTER_PREVIEW_FORMAT if POSTER_PREVIEW_FORMAT in POSTER_PREVIEW_MIMETYPES else 'png'
+        preview_name = f"{os.path.splitext(output_name)[0]}_preview.{preview_format}"
+        preview_file = workspace.file(preview_name) if POSTER_PREVIEW_ENABLED else None
+        preview_ready = False
+        stage_start = time.perf_counter()
+        cache_key = None
+        render_cache_status = 'disabled'
+        slimming = None
+        # A working copy has nothing left to strip, so its posters are not slimmed again
+        slim_output = SLIM_OUTPUT and not template_working_copy.is_working_copy(template_path)
+        if RENDER_CACHE_ENABLED:
+            try:
+                figure_digests = [f"{stored.digest}.{FIGURE_VARIANT_TAG}" if stored else None
+                                  for stored in stored_figures] if figure_paths else None
+                render_options = {'slim': slim_output, 'compresslevel': OUTPUT_COMPRESSLEVEL if slim_output else None}
+                cache_key = render_cache.render_key(extracted_data, template_path, figure_paths, figure_descriptions,
+                                                    figure_digests=figure_digests, options=render_options)
+                render_cache_status = 'hit' if render_cache.fetch(cache_key, output_file) else 'miss'
+            except OSError as e:
+                print(f"⚠️ Render cache lookup failed: {e}")
+                cache_key = None
+        if render_cache_status == 'hit':
+            print(f"🗃️ Render cache hit: {cache_key[:12]}")
+            if preview_file:
+                preview_ready = render_cache.fetch_preview(cache_key, preview_file)
+                if not preview_ready:
+                    # Cached before previews existed; draw it from the cached poster once
+                    preview_seconds = render_poster_preview(Presentation(output_file), preview_file)
+                    preview_ready = preview_seconds is not None
+        else:
+            success, error = populate_powerpoint_template(extracted_data, template_path, output_file, figure_paths, figure_descriptions,
+                                                          presentation=presentation, shape_index=shape_index)
+            if not success:
+                return jsonify({'error': f'Error creating presentation: {error}'}), 400
+            if preview_file:
+                # The populated presentation is still in memory, so nothing is re-read
+                preview_seconds = render_poster_preview(presentation, preview_file)
+                preview_ready = preview_seconds is not None
+                if preview_ready:
+                    stage_timings['preview'] = round(preview_seconds, 4)
+            if slim_output:
+                slimming = slim_output_file(output_file)
+        if cache_key:
+            try:
+                render_cache.store(cache_key, output_file, preview_file if preview_ready else None)
+            except OSError as e:
+                print(f"⚠️ Could not store poster in render cache: {e}")
+        stage_timings['render'] = round(time.perf_counter() - stage_start, 4)
         
-        # Clean up uploaded files after successful processing
-        cleanup_uploaded_files(files_to_cleanup, keep_final_output=KEEP_FINAL_OUTPUT)
+        # Atomic rename into the downloads folder: /download never sees a partial poster
+        output_file = workspace.publish(output_file, UPLOAD_FOLDER, output_name)
+        UPLOAD_JANITOR.record(output_file)
+        if preview_ready:
+            UPLOAD_JANITOR.record(workspace.publish(preview_file, UPLOAD_FOLDER, preview_name))
         
         mode_message = "Dummy Mode" if current_dummy_mode else "API Mode"
         
         # Get AI provider information for the response (use the provider that was actually used)
-        actual_provider = requested_provider if 'requested_provider' in locals() else current_api_provider
+        actual_provider = requested_provider or get_current_api_provider()
         ai_provider_info = {
             'provider': actual_provider,
             'display_name': 'ChatGPT (OpenAI)' if actual_provider == 'openai' else 'Claude (Anthropic)',
@@ -1407,45 +2160,82 @@ def upload_files():
             'filename': os.path.basename(output_file),
             'extracted_data': extracted_data,
             'mode_used': mode_message,
-            'ai_provider': ai_provider_info
+            'ai_provider': ai_provider_info,
+            'stage_timings': stage_timings,
+            'render_cache': render_cache_status,
+            'slimming': slimming,
+            'preview': preview_name if preview_ready else None,
+            # Sectioned extraction: field groups the AI could not extract (their fields are blank); worth a retry
+            'failed_groups': failed_groups,
+            # Extracted fields this template has no box for (their content is not on the poster)
+            'skipped_fields': [key for key, shape_name in POSTER_SHAPE_MAP.items()
+                               if manifest and shape_name in manifest['missing_shapes'] and extracted_data.get(key)]
         })
     except Exception as e:
-        # Clean up any uploaded files if there was an error
-        if 'files_to_cleanup' in locals():
-            cleanup_uploaded_files(files_to_cleanup, keep_final_output=False)
         return jsonify({'error': f'An unexpected error occurred: {e}'}), 500
+    finally:
+        # One recursive delete removes the job's inputs and scratch files, whatever the outcome
+        if workspace and AUTO_CLEANUP_UPLOADS:
+            workspace.cleanup()
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    """Download the generated PowerPoint file and optionally clean it up."""
+    """
+    Download a generated PowerPoint file. Supports byte ranges (resumed downloads),
+    conditional requests and handing the transfer to a reverse proxy (DOWNLOAD_OFFLOAD).
+    """
     try:
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        if os.path.exists(file_path):
-            # If auto-cleanup is enabled, delete the file after download
-            if AUTO_CLEANUP_UPLOADS and KEEP_FINAL_OUTPUT:
-                # Use a callback to delete the file after sending
-                def cleanup_after_send():
-                    try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                            print(f"🗑️ Cleaned up after download: {filename}")
-                    except Exception as e:
-                        print(f"⚠️ Could not delete file after download {filename}: {e}")
-                
-                response = send_file(file_path, as_attachment=True, download_name=filename)
-                response.call_on_close(cleanup_after_send)
-                return response
-            else:
-                return send_file(file_path, as_attachment=True, download_name=filename)
-        else:
+        file_path = safe_join(UPLOAD_FOLDER, filename)
+        if not file_path or not os.path.isfile(file_path):
             return jsonify({'error': 'File not found.'}), 404
+        UPLOAD_JANITOR.touch(file_path)  # Recently downloaded posters are evicted last
+
+        if DOWNLOAD_OFFLOAD == 'x-accel':
+            # nginx serves the file (ranges and conditionals included) from its internal location
+            response = app.response_class(mimetype=PPTX_MIMETYPE)
+            response.headers['X-Accel-Redirect'] = DOWNLOAD_ACCEL_PREFIX + quote(filename)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        # send_file answers Range / If-Range with 206, If-None-Match / If-Modified-Since with 304,
+        # and only sets X-Sendfile (no body) when USE_X_SENDFILE is on
+        response = send_file(file_path, mimetype=PPTX_MIMETYPE, as_attachment=True, download_name=filename,
+                             conditional=True, etag=True)
+        response.headers['Accept-Ranges'] = 'bytes'
+
+        if (AUTO_CLEANUP_UPLOADS and DELETE_AFTER_DOWNLOAD and not DOWNLOAD_OFFLOAD
+                and response.status_code == 200):
+            # Only a complete download removes the file; partial and revalidated ones keep it for the retry
+            def cleanup_after_send():
+                try:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                        UPLOAD_JANITOR.forget(file_path)
+                        print(f"🗑️ Cleaned up after download: {filename}")
+                except Exception as e:
+                    print(f"⚠️ Could not delete file after download {filename}: {e}")
+
+            response.call_on_close(cleanup_after_send)
+        return response
     except Exception as e:
         return jsonify({'error': f'Error downloading file: {e}'}), 500
 
+@app.route('/preview/<filename>')
+def poster_preview(filename):
+    """Serve the preview image of a generated poster."""
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    file_path = safe_join(UPLOAD_FOLDER, filename)
+    if extension not in POSTER_PREVIEW_MIMETYPES or not file_path or not os.path.isfile(file_path):
+        return jsonify({'error': 'Preview not found.'}), 404
+    # Every poster gets a new name, so a preview never changes once published
+    response = send_file(file_path, mimetype=POSTER_PREVIEW_MIMETYPES[extension], conditional=True, etag=True, max_age=86400)
+    response.headers['Cache-Control'] = 'private, max-age=86400, immutable'
+    return response
+
 @app.route('/api/mode', methods=['GET'])
 def get_mode():
     """Get current dummy data mode."""
-    global current_dummy_mode
+    current_dummy_mode = get_current_dummy_mode()
     return jsonify({
         'use_dummy_data': current_dummy_mode,
         'mode_name': 'Dummy Mode' if current_dummy_mode else 'API Mode'
@@ -1454,20 +2244,19 @@ def get_mode():
 @app.route('/api/mode', methods=['POST'])
 def set_mode():
     """Set dummy data mode."""
-    global current_dummy_mode
     try:
         data = request.get_json()
         if data is None:
             return jsonify({'success': False, 'error': 'No JSON data provided'}), 400
         
         use_dummy_data = data.get('use_dummy_data', False)
-        current_dummy_mode = use_dummy_data
+        set_current_dummy_mode(use_dummy_data)
         
         print(f"🔄 Mode changed to: {'Dummy Mode' if use_dummy_data else 'API Mode'}")
         
         return jsonify({
             'success': True,
-            'use_dummy_data': current_dummy_mode,
+            'use_dummy_data': get_current_dummy_mode(),
             'message': f"Switched to {'Dummy Mode' if use_dummy_data else 'API Mode'}"
         })
         
@@ -1477,9 +2266,8 @@ def set_mode():
 @app.route('/api/provider', methods=['GET'])
 def get_api_provider():
     """Get current API provider."""
-    global current_api_provider
     return jsonify({
-        'provider': current_api_provider,
+        'provider': get_current_api_provider(),
         'available_providers': {
             'openai': {
                 'name': 'ChatGPT (OpenAI)',
@@ -1497,7 +2285,6 @@ def get_api_provider():
 @app.route('/api/provider', methods=['POST'])
 def set_api_provider():
     """Set API provider."""
-    global current_api_provider
     try:
         data = request.get_json()
         if data is None:
@@ -1515,7 +2302,7 @@ def set_api_provider():
         elif provider == 'anthropic' and not ANTHROPIC_API_KEY:
             return jsonify({'success': False, 'error': 'Anthropic API key not configured'}), 400
         
-        current_api_provider = provider
+        set_current_api_provider(provider)
         
         provider_names = {
             'openai': 'ChatGPT (OpenAI)',
@@ -1526,7 +2313,7 @@ def set_api_provider():
         
         return jsonify({
             'success': True,
-            'provider': current_api_provider,
+            'provider': get_current_api_provider(),
             'message': f"Switched to {provider_names[provider]}"
         })
         
@@ -1581,7 +2368,9 @@ def get_template_library():
         return jsonify({
             'success': True,
             'templates': templates,
-            'count': len(templates)
+            'count': len(templates),
+            'previews': TEMPLATE_PREVIEWS.status(),
+            'working_copies': WORKING_COPIES.status()
         })
     except Exception as e:
         print(f"[DEBUG] Error in template library API: {e}")
@@ -1607,9 +2396,13 @@ def upload_template_to_library():
         if not allowed_file(template_file.filename, {'pptx'}):
             return jsonify({'success': False, 'error': 'Template file must have .pptx extension'}), 400
         
-        # Save to library
+        # Save to library; the manifest is compiled now, so a template without e.g. a ResultsBox is flagged at upload
         filename = secure_filename(template_file.filename)
-        success, error = save_template_to_library(template_file, filename)
+        manifest, error = save_template_to_library(template_file, filename)
+        if manifest is None:
+            return jsonify({'success': False, 'error': error}), 400 if error == TEMPLATE_UNREADABLE_ERROR else 500
+        if manifest['missing_shapes']:
+            print(f"⚠️ Template {filename} has no {', '.join(manifest['missing_shapes'])}")
         
         # Handle preview image if provided
         preview_filename = None
@@ -1621,14 +2414,13 @@ def upload_template_to_library():
             preview_path = os.path.join(TEMPLATE_LIBRARY_FOLDER, preview_filename)
             preview_file.save(preview_path)
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': f'Template "{filename}" added to library successfully!',
-                'filename': filename
-            })
-        else:
-            return jsonify({'success': False, 'error': error}), 500
+        return jsonify({
+            'success': True,
+            'message': f'Template "{filename}" added to library successfully!',
+            'filename': filename,
+            'missing_shapes': manifest['missing_shapes'],
+            'figure_slots': len(manifest['figure_slots'])
+        })
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1640,6 +2432,8 @@ def delete_template_from_library(filename):
         template_path = os.path.join(TEMPLATE_LIBRARY_FOLDER, filename)
         if os.path.exists(template_path):
             os.remove(template_path)
+            template_manifest.forget(template_path)
+            template_working_copy.forget(template_path)
             
             # Also delete preview if it exists
             preview_filename = os.path.splitext(filename)[0] + '_preview.png'
@@ -1688,6 +2482,21 @@ def get_template_preview(filename):
     except Exception as e:
         return jsonify({'error': f'Error serving preview: {e}'}), 500
 
+@app.route('/api/template-library/manifest/<filename>')
+def get_template_manifest_route(filename):
+    """Get a library template's compiled manifest (shapes, geometry, figure slots, missing shapes)."""
+    try:
+        for folder in ['available', 'coming_soon', 'premium']:
+            template_path = safe_join(os.path.join(TEMPLATE_LIBRARY_FOLDER, folder), filename)
+            if template_path and os.path.isfile(template_path):
+                manifest = get_template_manifest(library_render_path(template_path))
+                if manifest is None:
+                    return jsonify({'error': 'Template could not be compiled'}), 500
+                return jsonify(manifest)
+        return jsonify({'error': 'Template not found'}), 404
+    except Exception as e:
+        return jsonify({'error': f'Error reading manifest: {e}'}), 500
+
 @app.route('/api/template-library/delete', methods=['POST'])
 def delete_template():
     """Move a template to the archive instead of deleting it."""
@@ -1738,6 +2547,13 @@ def delete_template():
         preview_extensions = ['.png', '.jpg', '.jpeg']
         moved_files = [filename]  # Track all moved files
         
+        manifest_file = template_manifest.manifest_path(template_path)
+        if os.path.exists(manifest_file):
+            shutil.move(manifest_file, os.path.join(archive_folder, os.path.basename(manifest_file)))
+            moved_files.append(os.path.basename(manifest_file))
+        # The working copy is derived from the template, so it is dropped rather than archived
+        template_working_copy.forget(template_path)
+        
         for ext in preview_extensions:
             # Move auto-generated preview
             preview_path = os.path.join(TEMPLATE_LIBRARY_FOLDER, template_folder, base + '_preview' + ext)
@@ -1959,6 +2775,36 @@ def health_check():
     """Health check endpoint."""
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+@app.route('/api/startup')
+def startup_status():
+    """Get this worker's warm-up progress, what it inherited preloaded, its imported libraries and its memory."""
+    preloaded = PRELOAD_TASKS.status()
+    return jsonify({
+        'enabled': STARTUP_WARMUP,
+        **STARTUP_WARMUP_TASKS.status(),
+        'preloaded': preloaded['tasks'] if preloaded['finished'] else None,
+        'imported': [name for name in ('openai', 'anthropic', 'PyPDF2') if name in sys.modules],
+        'memory': process_memory()
+    })
+
+@app.route('/api/llm-stats')
+def llm_stats():
+    """Get AI request latency percentiles, hedging, circuit breaker and rate limit statistics."""
+    return jsonify({
+        'worker_pid': os.getpid(),
+        'hedging_enabled': HEDGE_REQUESTS,
+        'latency': LLM_LATENCY.snapshot(HEDGE_PERCENTILE),
+        'hedging': HEDGE_STATS.snapshot(),
+        'hedge_clients': HEDGE_CLIENTS.snapshot(),
+        'circuit_breakers': {p: breaker.snapshot() for p, breaker in CIRCUIT_BREAKERS.items()},
+        'rate_limits': RATE_LIMITER.snapshot()
+    })
+
+@app.route('/api/render-cache')
+def render_cache_status():
+    """Get render cache size and hit statistics."""
+    return jsonify({'enabled': RENDER_CACHE_ENABLED, **render_cache.stats()})
+
 @app.route('/api/upload-limits')
 def get_upload_limits():
     """Get current upload limits for debugging."""
@@ -2026,17 +2872,17 @@ def test_upload():
 def manual_cleanup():
     """Manually trigger cleanup of old files."""
     try:
-        data = request.get_json() or {}
-        days_old = data.get('days_old', 1)
-        
-        # Count files before cleanup
-        files_before = len([f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))])
-        
-        # Run cleanup
-        cleanup_old_files(days_old)
-        
-        # Count files after cleanup
-        files_after = len([f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))])
+        data = request.get_json(silent=True) or {}
+        try:
+            days_old = float(data.get('days_old', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'days_old must be a number.'}), 400
+        
+        report = cleanup_old_files(days_old)
+        if report is None:
+            return jsonify({'error': 'Automatic cleanup is disabled or failed.'}), 409
+        files_before = report['files_before']
+        files_after = report['files_after']
         files_removed = files_before - files_after
         
         return jsonify({
@@ -2044,7 +2890,9 @@ def manual_cleanup():
             'message': f'Cleanup completed. Removed {files_removed} old files.',
             'files_before': files_before,
             'files_after': files_after,
-            'files_removed': files_removed
+            'files_removed': files_removed,
+            'expired': report['expired'],
+            'evicted': report['evicted']
         })
         
     except Exception as e:
@@ -2052,17 +2900,18 @@ def manual_cleanup():
 
 @app.route('/api/cleanup-status')
 def cleanup_status():
-    """Get current cleanup settings and upload folder status."""
+    """Get current cleanup settings and upload folder status (from the janitor's inventory)."""
     try:
-        files_in_uploads = [f for f in os.listdir(UPLOAD_FOLDER) if os.path.isfile(os.path.join(UPLOAD_FOLDER, f))]
-        total_size = sum(os.path.getsize(os.path.join(UPLOAD_FOLDER, f)) for f in files_in_uploads)
+        status = UPLOAD_JANITOR.status()
+        if status['last_sweep'] is None and not AUTO_CLEANUP_UPLOADS:
+            # No janitor in this process; take one inventory so the numbers mean something
+            UPLOAD_JANITOR.refresh()
+            status = UPLOAD_JANITOR.status()
         
         return jsonify({
             'auto_cleanup_enabled': AUTO_CLEANUP_UPLOADS,
             'keep_final_output': KEEP_FINAL_OUTPUT,
-            'files_count': len(files_in_uploads),
-            'total_size_mb': round(total_size / (1024 * 1024), 2),
-            'files': files_in_uploads[:10]  # Show first 10 files
+            **status
         })
         
     except Exception as e:
@@ -2169,6 +3018,12 @@ if __name__ == '__main__':
     else:
         print("❌ Anthropic API key not configured")
     
+    if OPENAI_BASE_URL:
+        print(f"🧪 OpenAI base URL override: {OPENAI_BASE_URL}")
+    if ANTHROPIC_BASE_URL:
+        print(f"🧪 Anthropic base URL override: {ANTHROPIC_BASE_URL}")
+    
+    current_api_provider = get_current_api_provider()
     print(f"🔧 Default API provider: {current_api_provider.upper()}")
     
     # Clean up old files on startup if auto-cleanup is enabled
@@ -2177,7 +3032,7 @@ if __name__ == '__main__':
         cleanup_old_files(1)  # Clean files older than 1 day
         print("✅ Startup cleanup completed")
     
-    if current_dummy_mode:
+    if get_current_dummy_mode():
         print("🧪 Using dummy data for testing (no API calls)")
     else:
         provider_names = {
@@ -2187,6 +3042,9 @@ if __name__ == '__main__':
         print(f"💡 Using {provider_names.get(current_api_provider, current_api_provider.upper())} API for intelligent information extraction!")
         print("🔑 Make sure your API keys are set in .env file")
     
+    if STATIC_ASSET_BUILD:
+        static_assets.build_if_stale()
+
     # Use environment variable for debug mode (True in development)
     debug_mode = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     app.run(debug=debug_mode, host='0.0.0.0', port=port) 
\ No newline at end of file
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Poster JSON Parser Benchmark
+Compares poster_json.parse_poster_json with the old clean-up pipeline
+(fence stripping, two whole-document regex passes, json.loads, then eval)
+on normal, large and malformed AI responses.
+
+Usage:
+    python benchmark_poster_json.py
+    python benchmark_poster_json.py --repeat 200 --large-kb 500
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+
+import poster_json
+
+POSTER_KEYS = ["headline", "title", "authors", "affiliations", "subtitle", "Introduction",
+               "Objective", "Methods", "Results", "Discussion", "Conclusions", "References"]
+
+SENTENCE = "Digital interventions reduced pain intensity (Smith et al., 2022) in 2,847 adults. "
+
+
+def sample_poster(words_per_field=80):
+    sentence_count = max(1, words_per_field // 12)
+    return {key: (SENTENCE * sentence_count).strip() if key[0].isupper() else f"Sample {key}"
+            for key in POSTER_KEYS}
+
+
+def build_cases(large_kb):
+    """Return {name: response_text}."""
+    poster = sample_poster()
+    valid = json.dumps(poster, indent=2)
+
+    large = dict(poster)
+    large['References'] = " ".join(f"Author{i} A, Author{i} B. Title {i}. J Test. 2024;{i}:1-10."
+                                   for i in range(large_kb * 1024 // 50))
+    large_text = json.dumps(large, indent=2)
+
+    single_quoted = "{" + ", ".join(f"'{k}': '{v}'" for k, v in poster.items()) + "}"
+    raw_newlines = valid.replace(". Digital", ".\nDigital")
+    trailing_commas = valid[:-2] + ",\n}"
+    wrapped = f"Here's the structured content for your poster:\n```json\n{valid}\n```\nLet me know if you need changes."
+    python_literals = valid[:-2] + ',\n  "verified": True,\n  "notes": None\n}'
+    apostrophes = single_quoted.replace("Digital", "Patients' digital")
+    truncated = valid[:len(valid) * 3 // 4]
+    large_malformed = large_text.replace(". Digital", ".\nDigital")[:-2] + ",\n}"
+
+    return {
+        'valid': valid,
+        'wrapped in prose and fences': wrapped,
+        'raw newlines in strings': raw_newlines,
+        'single quotes': single_quoted,
+        'single quotes with apostrophes': apostrophes,
+        'trailing commas': trailing_commas,
+        'python literals': python_literals,
+        'truncated': truncated,
+        f'large ({len(large_text) // 1024}KB)': large_text,
+        f'large malformed ({len(large_malformed) // 1024}KB)': large_malformed,
+    }
+
+
+def legacy_parse(raw_content):
+    """The parsing pipeline call_ai_api used before poster_json (kept for comparison)."""
+    cleaned_content = (
+        raw_content.strip()
+        .removeprefix("```python")
+        .removesuffix("```")
+        .removeprefix("```json")
+        .removesuffix("```")
+        .strip()
+    )
+    if cleaned_content.startswith("Here's the structured content"):
+        json_start = cleaned_content.find('{')
+        if json_start != -1:
+            cleaned_content = cleaned_content[json_start:]
+    cleaned_content = re.sub(r'"([^"]*?)(?:\n|\r)([^"]*?)"', r'"\1 \2"', cleaned_content)
+    cleaned_content = re.sub(r'([^"])\n([^"])', r'\1 \2', cleaned_content)
+    try:
+        return json.loads(cleaned_content)
+    except json.JSONDecodeError:
+        return eval(cleaned_content)
+
+
+def new_parse(raw_content):
+    poster, error = poster_json.parse_poster_json(raw_content, POSTER_KEYS)
+    if error:
+        raise ValueError(error)
+    return poster
+
+
+def time_parser(parser, text, repeat):
+    """Return (microseconds per call, ok, error message)."""
+    try:
+        result = parser(text)
+        ok = isinstance(result, dict) and all(isinstance(result.get(k, ""), str) for k in POSTER_KEYS)
+    except Exception as e:
+        return None, False, f"{type(e).__name__}: {str(e)[:40]}"
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser(text)
+    return (time.perf_counter() - start) / repeat * 1e6, ok, ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the poster JSON parser against the old regex + eval pipeline.')
+    parser.add_argument('--repeat', type=int, default=100, help='Timed runs per case')
+    parser.add_argument('--large-kb', type=int, default=200, help='Approximate size of the large responses')
+    args = parser.parse_args()
+
+    # Silence the parser's repair messages while timing
+    import builtins
+    real_print = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        rows = []
+        for name, text in build_cases(args.large_kb).items():
+            repeat = max(1, args.repeat // 10) if len(text) > 100_000 else args.repeat
+            rows.append((name, time_parser(legacy_parse, text, repeat), time_parser(new_parse, text, repeat)))
+    finally:
+        builtins.print = real_print
+
+    print(f"{'case':<34} {'legacy':>14} {'poster_json':>14}")
+    for name, (old_us, old_ok, old_err), (new_us, new_ok, new_err) in rows:
+        old = f"{old_us:10.1f} us" if old_us is not None else "failed"
+        new = f"{new_us:10.1f} us" if new_us is not None else "failed"
+        print(f"{name:<34} {old:>14} {new:>14}")
+        for label, err in (("legacy", old_err), ("poster_json", new_err)):
+            if err:
+                print(f"{'':<34}   {label}: {err}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures what a fresh worker pays before it can serve: the time to `import app`
+and the process's memory (peak RSS) afterwards, in a new interpreter each run,
+then the first request to /health. With --eager the provider SDKs and PyPDF2
+are imported first, as app.py used to at module import, for comparison.
+
+With --fork N it also measures N workers forked from a master that preloaded the
+app (gunicorn.conf.py), against N workers that each import the app and load the
+same templates and libraries themselves: memory shared and private per worker
+(from /proc/self/smaps_rollup, so Linux only) and the time until each is ready.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 10 --eager
+    python benchmark_startup.py --fork 4
+    python benchmark_startup.py --json >> startup_history.jsonl
+"""
+
+import os
+import sys
+import json
+import statistics
+import argparse
+import subprocess
+
+EAGER_MODULES = ['openai', 'anthropic', 'PyPDF2']
+OPTIONAL_MODULES = EAGER_MODULES + ['pptx', 'PIL', 'numpy']
+
+# Runs in a fresh interpreter; prints one JSON line
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in {eager!r}:
+    __import__(name)
+import app
+import_seconds = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+client = app.app.test_client()
+start = time.perf_counter()
+client.get('/health')
+first_request_seconds = time.perf_counter() - start
+print(json.dumps({{
+    'import_seconds': import_seconds,
+    'peak_rss_mb': peak_mb,
+    'first_request_seconds': first_request_seconds,
+    'modules': len(sys.modules),
+    'imported': [name for name in {optional!r} if name in sys.modules],
+}}))
+"""
+
+
+# Preload mode: warm up once, fork the workers, measure them all while they are alive together
+PRELOAD_CHILD = """
+import gc, json, os, time
+import app
+from startup_warmup import process_memory
+start = time.perf_counter()
+app.preload_for_fork()
+gc.freeze()
+master_seconds = time.perf_counter() - start
+go_read, go_write = os.pipe()
+done_read, done_write = os.pipe()
+reports = []
+for _ in range({workers}):
+    report_read, report_write = os.pipe()
+    if os.fork() == 0:
+        start = time.perf_counter()
+        app.app.test_client().get('/health')
+        ready = time.perf_counter() - start
+        os.read(go_read, 1)
+        os.write(report_write, json.dumps(dict(process_memory(), ready_seconds=ready)).encode())
+        os.read(done_read, 1)
+        os._exit(0)
+    os.close(report_write)
+    reports.append(report_read)
+os.write(go_write, b'x' * {workers})
+workers = [json.loads(os.read(fd, 4096)) for fd in reports]
+master = process_memory()
+os.write(done_write, b'x' * {workers})
+for _ in range({workers}):
+    os.wait()
+print(json.dumps({{'master_seconds': master_seconds, 'master': master, 'workers': workers}}))
+"""
+
+# Per-worker mode: what each worker costs when it imports the app and loads the same things itself
+WORKER_CHILD = """
+import json, time
+start = time.perf_counter()
+import app
+from startup_warmup import process_memory
+app.PRELOAD_TASKS.run()
+app.app.test_client().get('/health')
+print(json.dumps(dict(process_memory(), ready_seconds=time.perf_counter() - start)))
+"""
+
+
+def _run_child(code):
+    env = dict(os.environ)
+    if not env.get('OPENAI_API_KEY') and not env.get('ANTHROPIC_API_KEY'):
+        env['OPENAI_API_KEY'] = 'sk-benchmark'  # app.py refuses to start without a key; no call is made
+    env['STARTUP_WARMUP'] = 'false'  # Measure the worker's own startup, not its background warm-up
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_fork(workers):
+    """Per-worker memory and time to ready, with a preloading master and with each worker loading for itself."""
+    preload = _run_child(PRELOAD_CHILD.format(workers=workers))
+    separate = [_run_child(WORKER_CHILD) for _ in range(workers)]
+    mean = lambda reports, key: round(statistics.mean(r[key] for r in reports), 1)
+    summary = {}
+    for mode, reports in (('preload', preload['workers']), ('per_worker', separate)):
+        summary[mode] = {key: mean(reports, key) for key in ('rss_mb', 'pss_mb', 'shared_mb', 'private_mb')}
+        summary[mode]['ready_seconds'] = round(statistics.mean(r['ready_seconds'] for r in reports), 3)
+    summary['preload']['master_seconds'] = round(preload['master_seconds'], 2)
+    summary['preload']['master_rss_mb'] = preload['master']['rss_mb']
+    summary['private_mb_saved_per_worker'] = round(summary['per_worker']['private_mb'] - summary['preload']['private_mb'], 1)
+    return summary
+
+
+def measure(eager):
+    """One run in a new interpreter. Returns the child's measurements."""
+    return _run_child(CHILD.format(eager=EAGER_MODULES if eager else [], optional=OPTIONAL_MODULES))
+
+
+def summarize(runs):
+    return {
+        'import_seconds': round(statistics.median(r['import_seconds'] for r in runs), 3),
+        'peak_rss_mb': round(statistics.median(r['peak_rss_mb'] for r in runs), 1),
+        'first_request_seconds': round(statistics.median(r['first_request_seconds'] for r in runs), 4),
+        'modules': runs[-1]['modules'],
+        'imported': runs[-1]['imported'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure `import app` time and memory")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per mode (the median is reported)")
+    parser.add_argument('--eager', action='store_true', help="Also measure with the SDKs imported up front")
+    parser.add_argument('--json', action='store_true', help="Print one JSON line (for tracking over time)")
+    parser.add_argument('--fork', type=int, metavar='WORKERS',
+                        help="Also compare WORKERS forked from a preloading master with WORKERS loading for themselves (Linux)")
+    args = parser.parse_args()
+
+    modes = [('lazy', False)] + ([('eager', True)] if args.eager else [])
+    results = {name: summarize([measure(eager) for _ in range(args.runs)]) for name, eager in modes}
+    if args.fork:
+        results['fork'] = measure_fork(args.fork)
+
+    if args.json:
+        print(json.dumps({'python': sys.version.split()[0], 'runs': args.runs, **results}))
+        return
+
+    print(f"{'mode':<8} {'import app':>11} {'peak RSS':>10} {'1st request':>12} {'modules':>8}  optional libraries imported")
+    for name, summary in results.items():
+        if name == 'fork':
+            continue
+        print(f"{name:<8} {summary['import_seconds']:>10.3f}s {summary['peak_rss_mb']:>8.1f}MB "
+              f"{summary['first_request_seconds'] * 1000:>10.1f}ms {summary['modules']:>8}  "
+              f"{', '.join(summary['imported']) or '-'}")
+    if 'eager' in results:
+        lazy, eager = results['lazy'], results['eager']
+        print(f"\n⏱️ Lazy imports save {eager['import_seconds'] - lazy['import_seconds']:.3f}s and "
+              f"{eager['peak_rss_mb'] - lazy['peak_rss_mb']:.1f}MB per worker start")
+
+    if 'fork' in results:
+        fork = results['fork']
+        print(f"\n{'workers':<11} {'RSS':>8} {'shared':>8} {'private':>8} {'ready':>8}")
+        for mode in ('per_worker', 'preload'):
+            m = fork[mode]
+            print(f"{mode:<11} {m['rss_mb']:>6.1f}MB {m['shared_mb']:>6.1f}MB {m['private_mb']:>6.1f}MB {m['ready_seconds']:>7.3f}s")
+        print(f"\n🔥 Preloading ({fork['preload']['master_seconds']}s in the master) saves "
+              f"{fork['private_mb_saved_per_worker']}MB of private memory per worker")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Figure Store
+Content-addressed storage for uploaded figures and their prepared (downscaled)
+variants. A figure is stored once under the SHA-256 of its bytes, so the same
+image uploaded by several co-authors costs no extra disk, validation or
+resizing, and two jobs uploading "figure1.png" never touch each other's files.
+
+Jobs never use store files directly: they check out a hard link into their own
+folder. A blob's reference count is therefore its link count minus one, which
+every worker sees and which drops on its own when a job's files are deleted.
+Blobs nobody references are expired after FIGURE_STORE_TTL_HOURS of disuse.
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import time
+
+FIGURE_STORE_FOLDER = os.getenv('FIGURE_STORE_FOLDER', 'figure_store')
+FIGURE_STORE_TTL_SECONDS = float(os.getenv('FIGURE_STORE_TTL_HOURS', 24)) * 3600
+
+_CHUNK = 1024 * 1024
+
+# Suffix of the marker written when preparing a figure left it unchanged
+_UNCHANGED_MARKER = '.unchanged'
+
+
+class StoredFigure:
+    """A figure blob in the store."""
+
+    def __init__(self, digest, ext, path, existed):
+        self.digest = digest
+        self.ext = ext
+        self.path = path
+        self.existed = existed  # True if an identical figure was already stored
+
+    def __repr__(self):
+        return f"StoredFigure({self.digest[:12]}{self.ext}, existed={self.existed})"
+
+
+def _blob_dir():
+    path = os.path.join(FIGURE_STORE_FOLDER, 'blobs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _staging_path(directory):
+    return os.path.join(directory, f".{os.getpid()}.{threading.get_ident()}.{time.time_ns()}.tmp")
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def ingest(file_storage, ext, validate=None):
+    """
+    Stream an uploaded file into the store, hashing it on the way.
+    `validate(path)` -> (ok, error) runs only for figures not seen before.
+    Returns (StoredFigure, error).
+    """
+    ext = ext.lower()
+    directory = _blob_dir()
+    staging = _staging_path(directory)
+    digest = hashlib.sha256()
+    try:
+        with open(staging, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(_CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        blob_path = os.path.join(directory, digest.hexdigest() + ext)
+        if os.path.exists(blob_path):
+            _touch(blob_path)
+            return StoredFigure(digest.hexdigest(), ext, blob_path, True), None
+
+        if validate:
+            ok, error = validate(staging)
+            if not ok:
+                return None, error
+        os.replace(staging, blob_path)
+        return StoredFigure(digest.hexdigest(), ext, blob_path, False), None
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def prepared_variant(stored, variant_tag, prepare):
+    """
+    Return the store path of a prepared variant of `stored`, creating it once.
+    `prepare(source_path, output_path)` returns output_path, or source_path if the
+    figure needed no changes. `variant_tag` must change whenever the preparation
+    settings do (e.g. 'max3000q90').
+    """
+    directory = _blob_dir()
+    variant_path = os.path.join(directory, f"{stored.digest}.{variant_tag}{stored.ext}")
+    marker_path = os.path.join(directory, f"{stored.digest}.{variant_tag}{_UNCHANGED_MARKER}")
+
+    if os.path.exists(variant_path):
+        _touch(variant_path)
+        return variant_path
+    if os.path.exists(marker_path):
+        _touch(marker_path)
+        return stored.path
+
+    staging = _staging_path(directory) + stored.ext
+    try:
+        result = prepare(stored.path, staging)
+        if result == stored.path:
+            open(marker_path, 'a').close()
+            return stored.path
+        os.replace(staging, variant_path)
+        return variant_path
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def checkout(store_path, job_path):
+    """
+    Give a job its own name for a store file (a hard link, so it holds a reference).
+    Falls back to copying on filesystems without hard links.
+    """
+    try:
+        os.link(store_path, job_path)
+    except FileExistsError:
+        os.remove(job_path)
+        os.link(store_path, job_path)
+    except OSError:
+        shutil.copyfile(store_path, job_path)
+    _touch(store_path)
+    return job_path
+
+
+def refcount(store_path):
+    """Number of job files currently linked to a store file."""
+    try:
+        return os.stat(store_path).st_nlink - 1
+    except FileNotFoundError:
+        return 0
+
+
+def sweep(ttl_seconds=None):
+    """
+    Remove store files that no job references and that were last used more than
+    ttl_seconds ago. Returns (files_removed, bytes_freed).
+    """
+    ttl_seconds = FIGURE_STORE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    freed = 0
+    try:
+        with os.scandir(os.path.join(FIGURE_STORE_FOLDER, 'blobs')) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                # Linked into a job folder, or used recently (stale .tmp files are crashed uploads)
+                if stat.st_nlink > 1 or stat.st_mtime >= cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                    freed += stat.st_size
+                except FileNotFoundError:
+                    pass
+    except FileNotFoundError:
+        pass
+    if removed:
+        print(f"🧹 Figure store: expired {removed} file(s), freed {freed / (1024 * 1024):.1f}MB")
+    return removed, freed
+
+
+def stats():
+    """Blob count, size and how many are referenced by jobs right now."""
+    blobs = 0
+    referenced = 0
+    total = 0
+    try:
+        with os.scandir(os.path.join(FIGURE_STORE_FOLDER, 'blobs')) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False) and not entry.name.endswith(('.tmp', _UNCHANGED_MARKER)):
+                    stat = entry.stat(follow_symlinks=False)
+                    blobs += 1
+                    total += stat.st_size
+                    if stat.st_nlink > 1:
+                        referenced += 1
+    except FileNotFoundError:
+        pass
+    return {'files': blobs, 'referenced': referenced, 'size_mb': round(total / (1024 * 1024), 2)}
@@ -0,0 +1,47 @@
+"""
+Gunicorn settings, read automatically by `gunicorn app:app` from the working directory
+(command-line options such as the Procfile's --bind and --threads take precedence).
+
+With preloading on (the default), the master imports the app once and runs
+app.preload_for_fork() before it forks any worker: provider SDKs, the PDF library
+and every library template's working copy, hash, manifest and decoded pictures
+are loaded there, and the workers share those pages copy-on-write. A respawned
+worker starts warm. Preloading means a HUP no longer reloads the code; restart
+the master to deploy. Set GUNICORN_PRELOAD=false to import the app in each worker
+instead (each then warms itself up in the background; see startup_warmup.py).
+"""
+
+import gc
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def on_starting(server):
+    """Master, before the app is imported: rebuild the UI's static assets if a page or static file changed."""
+    if os.getenv('STATIC_ASSET_BUILD', 'true').lower() == 'true':
+        import static_assets
+        static_assets.build_if_stale()
+
+
+def when_ready(server):
+    """Master, after the app is imported and the sockets are bound, before the first fork."""
+    if not preload_app:
+        return
+    import app
+    app.preload_for_fork()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach: a collection in a
+    # worker would otherwise write to every object's header and unshare its page
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    if preload_app:
+        import app
+        memory = app.process_memory()
+        if 'shared_mb' in memory:
+            worker.log.info(f"🔥 Worker {os.getpid()} ready: {memory['shared_mb']}MB shared with the master, "
+                            f"{memory['private_mb']}MB private")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Job Workspace
+Every upload gets a private scratch directory named after a random job ID, so
+concurrent requests never share file names and cleaning up one job can never
+delete another job's files.
+
+Inputs and intermediate files live only inside the workspace. The finished
+poster is written there too and then published into the outputs folder with a
+single rename, so /download never sees a half-written file. When the job ends
+the whole workspace is removed in one recursive delete.
+"""
+
+import os
+import time
+import uuid
+import shutil
+
+# Workspaces older than this are left over from a crashed worker
+STALE_WORKSPACE_SECONDS = 6 * 3600
+
+
+class JobWorkspace:
+    """Private scratch directory for one job."""
+
+    def __init__(self, root, job_id=None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.path = os.path.join(root, self.job_id)
+        os.makedirs(self.path)  # Fails loudly if the ID were ever reused
+
+    def file(self, name):
+        """Path of a file inside the workspace."""
+        return os.path.join(self.path, name)
+
+    def publish(self, source, output_folder, name):
+        """
+        Move a finished file out of the workspace into output_folder under `name`.
+        The rename is atomic, so readers see either no file or the whole file.
+        Returns the published path.
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        destination = os.path.join(output_folder, name)
+        os.replace(source, destination)
+        return destination
+
+    def cleanup(self):
+        """Remove the workspace and everything in it."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+
+def sweep_stale(root, max_age_seconds=STALE_WORKSPACE_SECONDS):
+    """Remove workspaces left behind by crashed workers. Returns the number removed."""
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+    except FileNotFoundError:
+        pass
+    if removed:
+        print(f"🧹 Removed {removed} stale job workspace(s)")
+    return removed
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+LLM Request Hedging
+Races a slow AI request against a second provider. If the primary provider has
+not answered within its rolling p90 latency, the same request is sent to the
+other provider; the first valid answer wins and the other request is cancelled.
+
+Latencies and hedge counters are kept per process (each gunicorn worker
+reports its own numbers).
+"""
+
+import os
+import ssl
+import math
+import errno
+import socket
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import httpx
+
+# Latency samples kept per provider/request kind
+LATENCY_WINDOW = 200
+
+# Samples needed before the rolling percentile is trusted
+MIN_SAMPLES = 20
+
+# httpcore trace events that hand over a newly connected network stream (direct, through an
+# HTTP proxy tunnel or through SOCKS). start_tls wraps the TCP socket in an SSLSocket and
+# detaches the original, so the TLS stream has to be tracked too
+_CONNECTED_EVENTS = ('connection.connect_tcp.complete', 'connection.connect_unix_socket.complete',
+                     'connection.start_tls.complete', 'proxy.start_tls.complete',
+                     'socks.connect_tcp.complete', 'socks.start_tls.complete')
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per (provider, kind)."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider, kind, seconds):
+        with self._lock:
+            key = (provider, kind)
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+            self._samples[key].append(seconds)
+
+    def percentile(self, provider, kind, pct, min_samples=MIN_SAMPLES):
+        """Nearest-rank percentile in seconds, or None until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples.get((provider, kind), ()))
+        if len(samples) < min_samples:
+            return None
+        rank = max(1, math.ceil(pct / 100.0 * len(samples)))
+        return samples[rank - 1]
+
+    def snapshot(self, pct):
+        with self._lock:
+            keys = list(self._samples)
+        report = {}
+        for provider, kind in keys:
+            value = self.percentile(provider, kind, pct, min_samples=1)
+            with self._lock:
+                count = len(self._samples[(provider, kind)])
+            report[f"{provider}/{kind}"] = {'samples': count, f'p{pct}_seconds': round(value, 3)}
+        return report
+
+
+class HedgeStats:
+    """Counters for how often requests were hedged and which side won."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def count(self, primary, outcome):
+        with self._lock:
+            provider_counters = self.counters.setdefault(primary, {
+                'requests': 0, 'hedged': 0, 'primary_wins': 0, 'hedge_wins': 0, 'both_failed': 0,
+            })
+            provider_counters[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            report = {}
+            for provider, counters in self.counters.items():
+                entry = dict(counters)
+                requests = counters['requests'] or 1
+                hedged = counters['hedged'] or 1
+                entry['hedge_rate'] = round(counters['hedged'] / requests, 3)
+                entry['hedge_win_rate'] = round(counters['hedge_wins'] / hedged, 3)
+                report[provider] = entry
+            return report
+
+
+class CancellableTransport(httpx.HTTPTransport):
+    """
+    HTTP transport whose in-flight requests can be aborted from another thread.
+    Closing an httpx client does not interrupt a blocked read, so cancel() shuts
+    the sockets down, which makes the waiting read fail straight away. Sockets are
+    picked up through httpcore's public `trace` request extension as they connect
+    and again once TLS is set up on them.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._streams = weakref.WeakSet()  # Dropped connections fall out by themselves
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def _track(self, stream):
+        with self._lock:
+            self._streams.add(stream)
+        if self.cancelled:
+            self._shutdown(stream)
+
+    @staticmethod
+    def _shutdown(stream):
+        sock = stream.get_extra_info('socket')
+        if sock is None or sock.fileno() == -1:
+            return  # Closed, or detached by start_tls (the TLS stream is shut down instead)
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError as e:
+            if e.errno != errno.ENOTCONN:  # ENOTCONN: the peer has already disconnected
+                print(f"⚠️ Could not shut down a cancelled request's connection: {e}")
+
+    def handle_request(self, request):
+        if self.cancelled:
+            raise httpx.ConnectError("Request cancelled", request=request)
+        outer_trace = request.extensions.get('trace')
+
+        def trace(event, info):
+            if event in _CONNECTED_EVENTS:
+                self._track(info['return_value'])
+            if outer_trace is not None:
+                outer_trace(event, info)
+
+        request.extensions = {**request.extensions, 'trace': trace}
+        return super().handle_request(request)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            streams = list(self._streams)
+        for stream in streams:
+            self._shutdown(stream)
+
+
+class _PooledClient:
+    def __init__(self, client, http_client, transport):
+        self.client = client
+        self.http_client = http_client
+        self.transport = transport
+        self.owner = None  # The AttemptHandle using it, if any
+
+
+class HedgeClientPool:
+    """
+    Reusable cancellable clients for hedged attempts, per provider, so a hedge does not
+    pay for a new client and TLS handshake. An attempt checks one out (a new one if none
+    is idle) and checks it back in when done. Cancelling the attempt shuts down its
+    client's sockets, so a cancelled client is closed instead of kept. All clients share
+    one SSL context, created once.
+    """
+
+    def __init__(self, make_client, size=4, timeout=None, verify=True):
+        self._make_client = make_client  # (provider, http_client) -> SDK client
+        self.size = size
+        self.timeout = timeout
+        self.ssl_context = verify if isinstance(verify, ssl.SSLContext) else httpx.create_ssl_context(verify=verify)
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.created = 0
+        self.reused = 0
+
+    def checkout(self, provider, handle):
+        """A client for `provider`, cancelled along with `handle`."""
+        pooled = None
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = {}  # Connections must not be shared with the parent process
+                self._pid = os.getpid()
+            idle = self._idle.get(provider, [])
+            while idle and pooled is None:
+                candidate = idle.pop()
+                if candidate.transport.cancelled:
+                    candidate.http_client.close()
+                else:
+                    pooled = candidate
+                    self.reused += 1
+        if pooled is None:
+            transport = CancellableTransport(verify=self.ssl_context)
+            http_client = httpx.Client(transport=transport, timeout=self.timeout)
+            pooled = _PooledClient(self._make_client(provider, http_client), http_client, transport)
+            with self._lock:
+                self.created += 1
+        pooled.owner = handle
+        handle.on_cancel(lambda: self._cancel(pooled, handle))
+        return pooled
+
+    def _cancel(self, pooled, handle):
+        # Only while this attempt still holds the client; it may be serving another one by now
+        with self._lock:
+            if pooled.owner is handle:
+                pooled.transport.cancel()
+
+    def checkin(self, provider, pooled):
+        with self._lock:
+            pooled.owner = None
+            idle = self._idle.setdefault(provider, [])
+            if not pooled.transport.cancelled and self._pid == os.getpid() and len(idle) < self.size:
+                idle.append(pooled)
+                return
+        pooled.http_client.close()
+
+    def snapshot(self):
+        with self._lock:
+            return {'idle': {provider: len(idle) for provider, idle in self._idle.items()},
+                    'created': self.created, 'reused': self.reused}
+
+
+class AttemptHandle:
+    """Lets the race cancel an attempt that is already talking to a provider."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._closers = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, closer):
+        """Register a callable (e.g. closing the attempt's HTTP client) run on cancel."""
+        with self._lock:
+            if not self.cancelled:
+                self._closers.append(closer)
+                return
+        closer()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            closers, self._closers = self._closers, []
+        for closer in closers:
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+def race_with_hedge(attempt, primary, secondary, hedge_delay, executor, stats):
+    """
+    Run attempt(provider, handle) -> (result, error) on `primary`; if it has not
+    produced a valid result after `hedge_delay` seconds (or fails sooner), also run
+    it on `secondary`. Returns (result, error, winning_provider).
+    """
+    stats.count(primary, 'requests')
+    handles = {primary: AttemptHandle()}
+    futures = {executor.submit(attempt, primary, handles[primary]): primary}
+
+    done, _ = wait(futures, timeout=hedge_delay)
+    if done:
+        result, error = next(iter(done)).result()
+        if error is None:
+            stats.count(primary, 'primary_wins')
+            return result, None, primary
+        print(f"⚠️ {primary.upper()} failed before hedge delay ({error}); trying {secondary.upper()}")
+    else:
+        print(f"⏱️ {primary.upper()} slower than {hedge_delay:.1f}s; hedging with {secondary.upper()}")
+
+    stats.count(primary, 'hedged')
+    handles[secondary] = AttemptHandle()
+    futures[executor.submit(attempt, secondary, handles[secondary])] = secondary
+
+    errors = {}
+    pending = set(f for f in futures if f not in done)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = futures[future]
+            result, error = future.result()
+            if error is None:
+                for loser, handle in handles.items():
+                    if loser != provider:
+                        handle.cancel()
+                stats.count(primary, 'primary_wins' if provider == primary else 'hedge_wins')
+                return result, None, provider
+            errors[provider] = error
+
+    # Primary failed before the hedge fired, so its error was read above
+    if primary not in errors:
+        errors[primary] = next(f for f, p in futures.items() if p == primary).result()[1]
+    stats.count(primary, 'both_failed')
+    return None, "; ".join(f"{p.upper()}: {e}" for p, e in errors.items()), primary
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+LLM Rate Limiter
+Per-provider token buckets for requests/min and tokens/min, shared by all
+gunicorn workers through the shared state store, so a deadline rush queues
+locally instead of turning into a cascade of 429s. The buckets are live values
+there: the writes on every call leave the workers' settings caches alone.
+
+Each call reserves its request and estimated tokens up front. If the buckets
+are overdrawn the caller waits for its turn (the admission queue); if the
+wait would be longer than the admission limit the call is turned away with
+an estimated wait instead. On a 429 the allowed rate is halved, and it creeps
+back up by a small step after every success (AIMD).
+"""
+
+import time
+import threading
+
+import shared_state
+
+# AIMD settings
+DECREASE_FACTOR = 0.5      # Multiply the allowed rate by this on a 429
+INCREASE_STEP = 0.02       # Add this to the rate scale after each success
+MIN_SCALE = 0.1            # Never throttle below 10% of the configured limits
+
+# Longest wait allowed before a call is turned away
+MAX_QUEUE_WAIT = 120.0
+
+# Waiting callers wake at least this often to check for cancellation
+WAIT_SLICE = 1.0
+
+
+class AdmissionRejected(Exception):
+    """The provider's queue is too long; `wait` is the estimated wait in seconds."""
+
+    def __init__(self, provider, wait):
+        super().__init__(f"{provider} queue is full (estimated wait {wait:.0f}s)")
+        self.provider = provider
+        self.wait = wait
+
+
+def _refill(state, limits, now):
+    """Top both buckets up for the time since the last update."""
+    scale = state['scale']
+    elapsed = max(0.0, now - state['updated'])
+    for bucket in ('requests', 'tokens'):
+        capacity = limits[bucket] * scale
+        state[bucket] = min(capacity, state[bucket] + elapsed * capacity / 60.0)
+    state['updated'] = now
+
+
+def _wait_for(state, limits):
+    """Seconds until both buckets are back to zero."""
+    wait = 0.0
+    for bucket in ('requests', 'tokens'):
+        rate = limits[bucket] * state['scale'] / 60.0
+        if state[bucket] < 0 and rate > 0:
+            wait = max(wait, -state[bucket] / rate)
+    return wait
+
+
+class RateLimiter:
+    """Shared token buckets with AIMD and an admission limit."""
+
+    def __init__(self, limits, max_queue_wait=MAX_QUEUE_WAIT):
+        # limits: provider -> {'requests': per minute, 'tokens': per minute}; 0 disables a provider's limiter
+        self.limits = limits
+        self.max_queue_wait = max_queue_wait
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+    def _enabled(self, provider):
+        limits = self.limits.get(provider)
+        return bool(limits and limits['requests'] > 0 and limits['tokens'] > 0)
+
+    def _default_state(self, provider):
+        limits = self.limits[provider]
+        return {'requests': float(limits['requests']), 'tokens': float(limits['tokens']),
+                'updated': time.time(), 'scale': 1.0}
+
+    def _update(self, provider, func):
+        return shared_state.update_live_value(f'rate_limit:{provider}', func, self._default_state(provider))
+
+    def acquire(self, provider, estimated_tokens, should_stop=None):
+        """
+        Reserve one request and `estimated_tokens` tokens, waiting for our turn if needed.
+        Raises AdmissionRejected when the wait would exceed the admission limit.
+        Returns the number of seconds spent queued.
+        """
+        if not self._enabled(provider):
+            return 0.0
+        limits = self.limits[provider]
+        outcome = {}
+
+        def reserve(state):
+            state = dict(state)
+            _refill(state, limits, time.time())
+            cost = {'requests': 1.0, 'tokens': float(min(estimated_tokens, limits['tokens'] * state['scale']))}
+            trial = dict(state, requests=state['requests'] - cost['requests'], tokens=state['tokens'] - cost['tokens'])
+            wait = _wait_for(trial, limits)
+            outcome['wait'] = wait
+            if wait > self.max_queue_wait:
+                outcome['rejected'] = True
+                return state
+            return trial
+
+        self._update(provider, reserve)
+        wait = outcome['wait']
+        if outcome.get('rejected'):
+            raise AdmissionRejected(provider, wait)
+        if wait <= 0:
+            return 0.0
+
+        print(f"⏳ {provider.upper()} rate limit: queued for {wait:.1f}s")
+        with self._lock:
+            self._waiting[provider] = self._waiting.get(provider, 0) + 1
+        try:
+            deadline = time.time() + wait
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0 or (should_stop and should_stop()):
+                    break
+                time.sleep(min(WAIT_SLICE, remaining))
+        finally:
+            with self._lock:
+                self._waiting[provider] -= 1
+        return wait
+
+    def estimated_wait(self, provider, estimated_tokens=0):
+        """Seconds a new call would be queued right now (without reserving anything)."""
+        if not self._enabled(provider):
+            return 0.0
+        limits = self.limits[provider]
+        state = dict(shared_state.get_live_value(f'rate_limit:{provider}', self._default_state(provider)))
+        _refill(state, limits, time.time())
+        state['requests'] -= 1.0
+        state['tokens'] -= min(estimated_tokens, limits['tokens'] * state['scale'])
+        return _wait_for(state, limits)
+
+    def record_rate_limited(self, provider):
+        """Multiplicative decrease after the provider answered 429."""
+        if not self._enabled(provider):
+            return
+
+        def decrease(state):
+            state = dict(state)
+            _refill(state, self.limits[provider], time.time())
+            state['scale'] = max(MIN_SCALE, state['scale'] * DECREASE_FACTOR)
+            # Drain what is left so queued callers back off straight away
+            state['requests'] = min(state['requests'], 0.0)
+            state['tokens'] = min(state['tokens'], 0.0)
+            return state
+
+        state = self._update(provider, decrease)
+        print(f"📉 {provider.upper()} returned 429; rate limit scaled to {state['scale']:.0%}")
+
+    def record_success(self, provider):
+        """Additive increase after a successful call."""
+        if not self._enabled(provider):
+            return
+        current = shared_state.get_live_value(f'rate_limit:{provider}')
+        if current is None or current['scale'] >= 1.0:
+            return  # Already at full rate; skip the write
+
+        def increase(state):
+            if state['scale'] >= 1.0:
+                return state
+            state = dict(state)
+            _refill(state, self.limits[provider], time.time())
+            state['scale'] = min(1.0, state['scale'] + INCREASE_STEP)
+            return state
+
+        self._update(provider, increase)
+
+    def snapshot(self):
+        report = {}
+        for provider, limits in self.limits.items():
+            if not self._enabled(provider):
+                report[provider] = {'enabled': False}
+                continue
+            state = shared_state.get_live_value(f'rate_limit:{provider}', self._default_state(provider))
+            with self._lock:
+                waiting = self._waiting.get(provider, 0)
+            report[provider] = {
+                'enabled': True,
+                'requests_per_minute': round(limits['requests'] * state['scale'], 1),
+                'tokens_per_minute': round(limits['tokens'] * state['scale']),
+                'scale': round(state['scale'], 3),
+                'waiting_in_this_worker': waiting,
+                'estimated_wait_seconds': round(self.estimated_wait(provider), 1),
+            }
+        return report
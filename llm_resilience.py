@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+LLM Retry and Circuit Breaker
+Classifies AI provider errors, retries the retryable ones with jittered
+exponential backoff, and keeps a circuit breaker per provider so that a
+provider in a brownout fails fast (or fails over) instead of holding every
+worker thread for a full timeout.
+
+Breaker state is kept per process (each gunicorn worker trips on its own).
+"""
+
+import time
+import random
+import threading
+
+# Retry settings
+MAX_RETRIES = 3            # Retries after the first attempt
+BACKOFF_BASE = 1.0         # Seconds; doubled on each retry before jitter
+BACKOFF_CAP = 20.0         # Longest single wait
+RETRY_AFTER_CAP = 60.0     # Longest Retry-After header we honour
+
+# Circuit breaker settings
+FAILURE_THRESHOLD = 5      # Consecutive retryable failures that open the circuit
+COOLDOWN_SECONDS = 30.0    # How long the circuit stays open before probing
+HALF_OPEN_PROBES = 1       # Requests let through at once while half-open
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class ErrorClass:
+    """How a failed request should be handled."""
+    RETRYABLE = 'retryable'          # Transient (network, timeout, 429, 5xx)
+    FATAL = 'fatal'                  # Bad request, auth, not found - retrying won't help
+    CIRCUIT_OPEN = 'circuit_open'    # Not sent: the provider's breaker is open
+
+
+def classify_error(error):
+    """
+    Classify an exception raised by the OpenAI or Anthropic SDK.
+    Returns (error_class, retry_after_seconds_or_None).
+    """
+    status = getattr(error, 'status_code', None)
+    retry_after = None
+    response = getattr(error, 'response', None)
+    if response is not None:
+        header = response.headers.get('retry-after')
+        try:
+            retry_after = min(float(header), RETRY_AFTER_CAP) if header else None
+        except ValueError:
+            retry_after = None
+
+    if status is not None:
+        if status in RETRYABLE_STATUS_CODES or status >= 500:
+            return ErrorClass.RETRYABLE, retry_after
+        return ErrorClass.FATAL, None
+
+    # No status code: connection problems and timeouts (APIConnectionError and subclasses)
+    name = type(error).__name__
+    if 'Connection' in name or 'Timeout' in name:
+        return ErrorClass.RETRYABLE, None
+    return ErrorClass.FATAL, None
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after FAILURE_THRESHOLD consecutive retryable failures.
+    Open -> half-open after COOLDOWN_SECONDS; half-open lets HALF_OPEN_PROBES
+    requests through, closing on success and re-opening on failure.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 cooldown=COOLDOWN_SECONDS, half_open_probes=HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.counters = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _refresh(self, now):
+        if self.state == self.OPEN and now - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+            self.probes_in_flight = 0
+            print(f"🔌 {self.name.upper()} circuit half-open; probing")
+
+    def allow_request(self):
+        """Whether a request may be sent now (reserves a probe slot when half-open)."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+                self.probes_in_flight += 1
+                return True
+            self.counters['rejected'] += 1
+            return False
+
+    def would_allow(self):
+        """Like allow_request, but without reserving a probe slot."""
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self.state == self.CLOSED or (
+                self.state == self.HALF_OPEN and self.probes_in_flight < self.half_open_probes)
+
+    def retry_after(self):
+        """Seconds until the breaker will let a probe through (0 if it already would)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.counters['successes'] += 1
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                print(f"✅ {self.name.upper()} circuit closed")
+            self.state = self.CLOSED
+            self.probes_in_flight = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.counters['failures'] += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probes_in_flight = 0
+                self.counters['opened'] += 1
+                print(f"🚫 {self.name.upper()} circuit open for {self.cooldown:.0f}s "
+                      f"after {self.consecutive_failures} failures")
+
+    def release_probe(self):
+        """Give back a half-open probe slot that ended without a verdict (e.g. cancelled)."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.probes_in_flight > 0:
+                self.probes_in_flight -= 1
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                **self.counters,
+            }
+
+
+def call_with_retries(send, breaker, should_stop=None, max_retries=MAX_RETRIES, sleep=time.sleep):
+    """
+    Call send() with classified retries behind `breaker`.
+    Returns (result, error_class, exception); error_class is None on success.
+    `should_stop()` is checked before every attempt and wait (e.g. a cancelled hedge).
+    """
+    last_error = None
+    for attempt in range(max_retries + 1):
+        if should_stop and should_stop():
+            return None, ErrorClass.FATAL, last_error
+        if not breaker.allow_request():
+            return None, ErrorClass.CIRCUIT_OPEN, last_error
+
+        try:
+            result = send()
+        except Exception as e:
+            if should_stop and should_stop():
+                breaker.release_probe()
+                return None, ErrorClass.FATAL, e
+            error_class, retry_after = classify_error(e)
+            last_error = e
+            if error_class != ErrorClass.RETRYABLE:
+                # The provider answered; a bad request says nothing about its health
+                breaker.release_probe()
+                return None, error_class, e
+            breaker.record_failure()
+            if attempt == max_retries:
+                break
+            delay = backoff_delay(attempt, retry_after)
+            print(f"🔁 {breaker.name.upper()} {type(e).__name__}; retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+            sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result, None, None
+    return None, ErrorClass.RETRYABLE, last_error
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Load Generator for /upload
+Drives the poster pipeline (upload + optional download) at a target concurrency
+or request rate and reports throughput, per-stage latency percentiles and errors.
+
+Pair it with mock_llm_server.py to load-test without spending API credit.
+
+Corpus layout (default: load_test_corpus/):
+    pdfs/       *.pdf manuscripts (required)
+    figures/    *.png / *.jpg figures (optional)
+    templates/  *.pptx templates to upload (optional)
+Library templates are used when --templates is given (or no templates/ folder exists).
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import zlib
+import struct
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+DEFAULT_CORPUS = 'load_test_corpus'
+TEMPLATE_LIBRARY_FOLDER = 'template_library'
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def list_files(folder, extensions):
+    """List files in `folder` with one of the given extensions."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if os.path.splitext(f)[1].lower() in extensions
+    )
+
+
+def load_corpus(corpus_dir, library_templates):
+    """Collect the PDFs, figures and templates used to build requests."""
+    corpus = {
+        'pdfs': list_files(os.path.join(corpus_dir, 'pdfs'), {'.pdf'}),
+        'figures': list_files(os.path.join(corpus_dir, 'figures'), {'.png', '.jpg', '.jpeg'}),
+        'template_files': list_files(os.path.join(corpus_dir, 'templates'), {'.pptx'}),
+        'library_templates': [],
+    }
+    if library_templates or not corpus['template_files']:
+        available = os.path.join(TEMPLATE_LIBRARY_FOLDER, 'available')
+        names = [os.path.basename(p) for p in list_files(available, {'.pptx'})]
+        if library_templates and library_templates != ['all']:
+            names = [n for n in names if n in library_templates or os.path.splitext(n)[0] in library_templates]
+        corpus['library_templates'] = names
+    return corpus
+
+
+SAMPLE_SECTIONS = ['Abstract', 'Introduction', 'Methods', 'Results', 'Discussion', 'References']
+
+
+def write_sample_pdf(path, title, paragraphs):
+    """Write a minimal single-page PDF with extractable Helvetica text."""
+    lines = [title, ''] + [line for paragraph in paragraphs for line in (paragraph, '')]
+    text_ops = ['BT', '/F1 10 Tf', '12 TL', '50 780 Td']
+    for line in lines:
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        text_ops.append(f'({escaped}) Tj T*')
+    text_ops.append('ET')
+    stream = '\n'.join(text_ops).encode('latin-1', 'replace')
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref_offset = len(output)
+    output += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        output += f'{offset:010d} 00000 n \n'.encode()
+    output += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode()
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def write_sample_png(path, width, height):
+    """Write a noisy RGB PNG (noise keeps it above the app's 1KB minimum)."""
+    rows = b''.join(b'\x00' + bytes(random.getrandbits(8) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    png = b'\x89PNG\r\n\x1a\n'
+    png += chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    png += chunk(b'IDAT', zlib.compress(rows))
+    png += chunk(b'IEND', b'')
+    with open(path, 'wb') as f:
+        f.write(png)
+
+
+def create_sample_corpus(corpus_dir, count):
+    """Generate sample manuscripts and figures so the tool works out of the box."""
+    os.makedirs(os.path.join(corpus_dir, 'pdfs'), exist_ok=True)
+    os.makedirs(os.path.join(corpus_dir, 'figures'), exist_ok=True)
+    words = ('patients study outcome analysis data trial effect model cohort baseline '
+             'treatment results significant measure group').split()
+    for i in range(count):
+        paragraphs = []
+        for section in SAMPLE_SECTIONS:
+            paragraphs.append(section)
+            for _ in range(random.randint(4, 12)):
+                paragraphs.append(' '.join(random.choice(words) for _ in range(14)).capitalize() + '.')
+        write_sample_pdf(os.path.join(corpus_dir, 'pdfs', f'sample_{i+1}.pdf'),
+                         f'Sample manuscript {i+1}', paragraphs)
+        write_sample_png(os.path.join(corpus_dir, 'figures', f'figure_{i+1}.png'),
+                         random.randint(200, 600), random.randint(150, 450))
+    print(f"✅ Created {count} sample PDFs and figures in {corpus_dir}")
+
+
+class LoadTestResults:
+    """Thread-safe collector for per-request measurements."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = defaultdict(list)
+        self.errors = Counter()
+        self.completed = 0
+        self.failed = 0
+
+    def record_stage(self, stage, seconds):
+        with self.lock:
+            self.stages[stage].append(seconds)
+
+    def record_success(self):
+        with self.lock:
+            self.completed += 1
+
+    def record_error(self, kind):
+        with self.lock:
+            self.failed += 1
+            self.errors[kind] += 1
+
+    def summary(self, elapsed):
+        """Build a JSON-serialisable summary of the run."""
+        with self.lock:
+            stages = {}
+            for stage, values in sorted(self.stages.items()):
+                stages[stage] = {
+                    'count': len(values),
+                    'mean': round(sum(values) / len(values), 4),
+                    'p50': round(percentile(values, 50), 4),
+                    'p95': round(percentile(values, 95), 4),
+                    'p99': round(percentile(values, 99), 4),
+                    'max': round(max(values), 4),
+                }
+            total = self.completed + self.failed
+            return {
+                'elapsed_s': round(elapsed, 2),
+                'requests': total,
+                'completed': self.completed,
+                'failed': self.failed,
+                'throughput_rps': round(self.completed / elapsed, 3) if elapsed > 0 else 0.0,
+                'error_rate': round(self.failed / total, 4) if total else 0.0,
+                'stages': stages,
+                'errors': dict(self.errors.most_common()),
+            }
+
+
+def build_request(corpus, max_figures, provider):
+    """Pick a random PDF, figures and template and build the multipart payload."""
+    files = []
+    handles = []
+
+    pdf_path = random.choice(corpus['pdfs'])
+    handle = open(pdf_path, 'rb')
+    handles.append(handle)
+    files.append(('pdf_file', (os.path.basename(pdf_path), handle, 'application/pdf')))
+
+    if corpus['figures'] and max_figures > 0:
+        count = random.randint(0, min(max_figures, 4))
+        for i, fig_path in enumerate(random.sample(corpus['figures'], min(count, len(corpus['figures'])))):
+            handle = open(fig_path, 'rb')
+            handles.append(handle)
+            mimetype = 'image/png' if fig_path.lower().endswith('.png') else 'image/jpeg'
+            files.append((f'figure{i+1}_file', (os.path.basename(fig_path), handle, mimetype)))
+
+    data = {'ai_provider': provider}
+    template_choices = [('file', p) for p in corpus['template_files']] + \
+                       [('library', n) for n in corpus['library_templates']]
+    if template_choices:
+        kind, value = random.choice(template_choices)
+        if kind == 'file':
+            handle = open(value, 'rb')
+            handles.append(handle)
+            files.append(('template_file', (os.path.basename(value), handle,
+                          'application/vnd.openxmlformats-officedocument.presentationml.presentation')))
+        else:
+            data['selected_template'] = value
+    return files, data, handles
+
+
+def run_one(client, base_url, corpus, options, results, scheduled_at=None):
+    """Run a single upload (and optional download), recording stage latencies."""
+    files, data, handles = build_request(corpus, options.max_figures, options.provider)
+    start = time.perf_counter()
+    if scheduled_at is not None:
+        # Open-loop mode: time spent waiting for a free slot counts against latency
+        results.record_stage('queue', max(0.0, start - scheduled_at))
+        start = scheduled_at
+    try:
+        response = client.post(f"{base_url}/upload", files=files, data=data)
+    except httpx.HTTPError as e:
+        results.record_error(f"upload:{type(e).__name__}")
+        return
+    finally:
+        for handle in handles:
+            handle.close()
+    upload_elapsed = time.perf_counter() - start
+
+    if response.status_code != 200:
+        try:
+            message = response.json().get('error', '')
+        except ValueError:
+            message = ''
+        results.record_error(f"upload:{response.status_code}:{message[:60]}")
+        return
+
+    try:
+        payload = response.json()
+    except ValueError:
+        results.record_error("upload:200:response is not JSON")
+        return
+    results.record_stage('upload', upload_elapsed)
+    for stage, seconds in (payload.get('stage_timings') or {}).items():
+        if isinstance(seconds, (int, float)):
+            results.record_stage(f"server.{stage}", seconds)
+
+    if options.download and payload.get('filename'):
+        download_start = time.perf_counter()
+        try:
+            download = client.get(f"{base_url}/download/{payload['filename']}")
+        except httpx.HTTPError as e:
+            results.record_error(f"download:{type(e).__name__}")
+            return
+        download_elapsed = time.perf_counter() - download_start
+        if download.status_code not in (200, 206):
+            results.record_error(f"download:{download.status_code}")
+            return
+        results.record_stage('download', download_elapsed)
+        results.record_stage('end_to_end', upload_elapsed + download_elapsed)
+    results.record_success()
+
+
+def run_closed_loop(client, options, corpus, results):
+    """Keep `concurrency` requests in flight until the request count is reached."""
+    remaining = [options.requests]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + options.duration if options.duration else None
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            if deadline and time.perf_counter() > deadline:
+                return
+            try:
+                run_one(client, options.url, corpus, options, results)
+            except Exception as e:
+                results.record_error(f"exception:{type(e).__name__}")
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(options.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(client, options, corpus, results):
+    """Issue requests at a fixed arrival rate, independent of response times."""
+    def record_exception(future):
+        # An exception escaping run_one would otherwise vanish with the discarded future
+        if future.exception() is not None:
+            results.record_error(f"exception:{type(future.exception()).__name__}")
+
+    interval = 1.0 / options.rate
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+        for i in range(options.requests):
+            scheduled_at = start + i * interval
+            if options.duration and scheduled_at - start > options.duration:
+                break
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            future = executor.submit(run_one, client, options.url, corpus, options, results, scheduled_at)
+            future.add_done_callback(record_exception)
+
+
+def print_summary(summary, baseline=None):
+    """Print a human-readable report, optionally compared with a baseline run."""
+    print("\n📊 Load test results")
+    print("=" * 72)
+    print(f"Requests: {summary['requests']}  completed: {summary['completed']}  failed: {summary['failed']} "
+          f"({summary['error_rate']:.1%})")
+    print(f"Elapsed: {summary['elapsed_s']}s  throughput: {summary['throughput_rps']} req/s")
+    print(f"\n{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage, stats in summary['stages'].items():
+        line = f"{stage:<22}{stats['count']:>7}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}{stats['max']:>10.3f}"
+        base = (baseline or {}).get('stages', {}).get(stage)
+        if base and base.get('p95'):
+            change = (stats['p95'] - base['p95']) / base['p95']
+            line += f"   p95 {change:+.1%} vs baseline"
+        print(line)
+    if summary['errors']:
+        print("\n❌ Errors:")
+        for kind, count in summary['errors'].items():
+            print(f"  {count:>5}  {kind}")
+    if baseline:
+        print(f"\nBaseline throughput: {baseline.get('throughput_rps')} req/s")
+
+
+def main():
+    """Parse options, run the load test and print the report."""
+    parser = argparse.ArgumentParser(description='Load generator for the /upload pipeline.')
+    parser.add_argument('--url', default='http://localhost:5000', help='Base URL of the running app')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='Folder with pdfs/, figures/ and templates/')
+    parser.add_argument('--templates', nargs='*', default=None,
+                        help="Library templates to select ('all' for every available template)")
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight (closed loop) or worker cap (open loop)')
+    parser.add_argument('--rate', type=float, default=None, help='Target arrival rate in requests/second (open loop)')
+    parser.add_argument('--requests', type=int, default=50, help='Total number of requests to issue')
+    parser.add_argument('--duration', type=float, default=None, help='Stop issuing requests after this many seconds')
+    parser.add_argument('--max-figures', type=int, default=2, help='Upload up to this many figures per request')
+    parser.add_argument('--provider', default='openai', choices=['openai', 'anthropic'])
+    parser.add_argument('--download', action='store_true', help='Also download each generated poster')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Per-request timeout in seconds')
+    parser.add_argument('--output', default=None, help='Write the JSON summary to this file')
+    parser.add_argument('--baseline', default=None, help='Compare against a previous --output file')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--create-corpus', type=int, metavar='N', default=None,
+                        help='Generate N sample PDFs and figures in the corpus folder and exit')
+    options = parser.parse_args()
+
+    if options.seed is not None:
+        random.seed(options.seed)
+    if options.create_corpus:
+        create_sample_corpus(options.corpus, options.create_corpus)
+        return 0
+    options.url = options.url.rstrip('/')
+
+    corpus = load_corpus(options.corpus, options.templates)
+    if not corpus['pdfs']:
+        print(f"❌ No PDFs found in {os.path.join(options.corpus, 'pdfs')}")
+        return 1
+    print(f"🚀 Load testing {options.url}/upload")
+    print(f"   Corpus: {len(corpus['pdfs'])} PDFs, {len(corpus['figures'])} figures, "
+          f"{len(corpus['template_files'])} template files, {len(corpus['library_templates'])} library templates")
+    if options.rate:
+        print(f"   Open loop: {options.rate} req/s, up to {options.concurrency} in flight, {options.requests} requests")
+    else:
+        print(f"   Closed loop: {options.concurrency} concurrent, {options.requests} requests")
+
+    results = LoadTestResults()
+    limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+    with httpx.Client(timeout=options.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        if options.rate:
+            run_open_loop(client, options, corpus, results)
+        else:
+            run_closed_loop(client, options, corpus, results)
+        elapsed = time.perf_counter() - start
+
+    summary = results.summary(elapsed)
+    baseline = None
+    if options.baseline:
+        try:
+            with open(options.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load baseline {options.baseline}: {e}")
+    print_summary(summary, baseline)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n✅ Summary written to {options.output}")
+    return 0 if summary['completed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
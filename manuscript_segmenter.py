@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Manuscript Segmenter
+Splits extracted manuscript text into Abstract/Introduction/Methods/Results/
+Discussion/Conclusions/References sections in one pass and builds the prompt
+text from a per-section token budget, instead of blindly truncating the paper.
+"""
+
+import re
+
+# Rough conversion used for budgeting (the APIs average about 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+# Token budget per section. Unused budget from short sections is shared out to
+# sections that overflow, so long papers keep their Results and Discussion while
+# short papers send fewer tokens overall. 'front' is the text before the first
+# heading (title, authors, affiliations); 'other' is back matter such as
+# acknowledgements, funding and conflicts of interest, which the poster never uses.
+SECTION_TOKEN_BUDGETS = {
+    'front': 500,
+    'abstract': 500,
+    'introduction': 1200,
+    'methods': 1200,
+    'results': 1500,
+    'discussion': 1200,
+    'conclusions': 400,
+    'references': 1000,
+    'other': 0,
+}
+
+# Order sections appear in the prompt
+SECTION_ORDER = ['front', 'abstract', 'introduction', 'methods', 'results',
+                 'discussion', 'conclusions', 'references']
+
+SECTION_LABELS = {
+    'front': 'Title, authors and affiliations',
+    'abstract': 'Abstract',
+    'introduction': 'Introduction',
+    'methods': 'Methods',
+    'results': 'Results',
+    'discussion': 'Discussion',
+    'conclusions': 'Conclusions',
+    'references': 'References',
+}
+
+# Heading aliases for each section
+SECTION_HEADINGS = {
+    'abstract': ['abstract', 'summary'],
+    'introduction': ['introduction', 'background'],
+    'methods': ['methods', 'method', 'materials and methods', 'methods and materials',
+                'methodology', 'patients and methods', 'study design'],
+    'results': ['results', 'findings'],
+    'discussion': ['discussion', 'general discussion', 'results and discussion'],
+    'conclusions': ['conclusions', 'conclusion', 'concluding remarks'],
+    'references': ['references', 'bibliography', 'literature cited', 'works cited'],
+    'other': ['acknowledgements', 'acknowledgments', 'acknowledgement', 'acknowledgment',
+              'funding', 'conflicts of interest', 'conflict of interest', 'competing interests',
+              'declaration of competing interest', 'author contributions', 'data availability',
+              'supplementary material', 'supplementary materials', 'appendix', 'abbreviations',
+              'ethics statement', 'disclosures'],
+}
+
+_HEADING_TO_SECTION = {
+    heading: section
+    for section, headings in SECTION_HEADINGS.items()
+    for heading in headings
+}
+
+# One compiled pattern, longest aliases first so "materials and methods" wins over "methods".
+# A heading is a line holding only the (optionally numbered) heading, or an inline
+# heading: a colon and text on the same line (e.g. "Methods: We recruited ...").
+# Group 2 is set for inline headings.
+_HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:(?:\d+(?:\.\d+)*|[IVX]+)[.)]?[ \t]+)?'
+    r'(' + '|'.join(re.escape(h) for h in sorted(_HEADING_TO_SECTION, key=len, reverse=True)) + r')'
+    r'[ \t]*(?:(:)(?=[ \t]*\S)|[:.]?[ \t]*$)',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Sections that structured abstracts use as inline sub-headings ("Background: ...")
+_ABSTRACT_SUBHEADINGS = {'introduction', 'methods', 'results', 'discussion', 'conclusions'}
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in `text`."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def segment_manuscript(text):
+    """
+    Split manuscript text into sections in a single pass over its headings.
+    Returns a dict of section name -> text (sections that repeat are concatenated).
+    """
+    sections = {}
+    current = 'front'
+    position = 0
+
+    for match in _HEADING_PATTERN.finditer(text):
+        section = _HEADING_TO_SECTION[match.group(1).lower()]
+
+        # Structured abstracts ("Background: ... Methods: ... Results: ...") use inline
+        # sub-headings; the first heading on a line of its own starts the paper's body
+        if current == 'abstract' and match.group(2) and section in _ABSTRACT_SUBHEADINGS:
+            continue
+
+        body = text[position:match.start()].strip()
+        if body:
+            sections[current] = (sections[current] + '\n' + body) if current in sections else body
+        current = section
+        position = match.end()
+
+    body = text[position:].strip()
+    if body:
+        sections[current] = (sections[current] + '\n' + body) if current in sections else body
+    return sections
+
+
+def _truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, ending on a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 0:
+        return ''
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > max_chars // 2 else max_chars].rstrip() + ' [...]'
+
+
+def allocate_budgets(section_tokens, budgets=None):
+    """
+    Decide how many tokens each section may use.
+    Budget left over by short sections is shared out to sections that overflow,
+    in proportion to their own budgets.
+    """
+    budgets = budgets or SECTION_TOKEN_BUDGETS
+    allocation = {}
+    spare = 0
+    overflowing = {}
+    for section, tokens in section_tokens.items():
+        budget = budgets.get(section, budgets.get('other', 0))
+        if tokens <= budget:
+            allocation[section] = tokens
+            spare += budget - tokens
+        else:
+            allocation[section] = budget
+            if budget > 0:
+                overflowing[section] = budget
+
+    # Share the spare budget; sections that fill up hand their remainder on
+    while spare > 0 and overflowing:
+        weight_total = sum(overflowing.values())
+        handed_out = 0
+        for section, weight in list(overflowing.items()):
+            extra = min(spare * weight // weight_total, section_tokens[section] - allocation[section])
+            allocation[section] += extra
+            handed_out += extra
+            if allocation[section] >= section_tokens[section]:
+                del overflowing[section]
+        spare -= handed_out
+        if handed_out == 0:
+            break
+    return allocation
+
+
+def is_segmented(sections):
+    """Whether segment_manuscript found enough headings for the sections to be trusted."""
+    return len([name for name in sections if name != 'front']) >= 2
+
+
+def build_manuscript_excerpt(text, budgets=None, include=None):
+    """
+    Build the manuscript text sent to the AI from a per-section token budget.
+    `include` optionally limits the excerpt to some sections (e.g. ['methods', 'results']).
+    Returns (excerpt, report) where report maps section -> (original_tokens, kept_tokens).
+    Falls back to a plain truncation when no sections are detected, at the total budget
+    of the included sections.
+    """
+    budgets = budgets or SECTION_TOKEN_BUDGETS
+    sections = segment_manuscript(text)
+
+    if not is_segmented(sections):
+        total_budget = sum(budget for name, budget in budgets.items() if include is None or name in include)
+        excerpt = _truncate_to_tokens(text.strip(), total_budget)
+        tokens = estimate_tokens(text)
+        return excerpt, {'unsegmented': (tokens, min(tokens, total_budget))}
+
+    if include is not None:
+        sections = {name: body for name, body in sections.items() if name in include}
+    section_tokens = {name: estimate_tokens(body) for name, body in sections.items()}
+    allocation = allocate_budgets(section_tokens, budgets)
+
+    parts = []
+    report = {}
+    for name in SECTION_ORDER:
+        if name not in sections:
+            continue
+        kept = _truncate_to_tokens(sections[name], allocation[name])
+        report[name] = (section_tokens[name], estimate_tokens(kept))
+        if kept:
+            parts.append(f"### {SECTION_LABELS[name]}\n{kept}")
+    if 'other' in sections:
+        report['other'] = (section_tokens['other'], 0)
+    return '\n\n'.join(parts), report
+
+
+def format_budget_report(report):
+    """One-line summary of a build_manuscript_excerpt report for logging."""
+    original = sum(o for o, _ in report.values())
+    kept = sum(k for _, k in report.values())
+    details = ', '.join(f"{name} {k}/{o}" for name, (o, k) in report.items())
+    return f"~{kept}/{original} tokens kept ({details})"
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Stand-in LLM Server
+A local HTTP server that speaks the OpenAI chat.completions and Anthropic
+messages wire formats, so /upload can be load-tested without spending API credit.
+
+Point the app at it with:
+    OPENAI_BASE_URL=http://localhost:8001/v1
+    ANTHROPIC_BASE_URL=http://localhost:8001
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8001
+
+# Server behaviour - overridden from the command line in main()
+SERVER_CONFIG = {
+    'latency': 'lognormal',      # 'fixed', 'uniform', 'normal' or 'lognormal'
+    'latency_ms': 2000,          # Mean (or fixed) latency in milliseconds
+    'latency_jitter_ms': 800,    # Spread around the mean (the standard deviation for normal and lognormal)
+    'error_rate': 0.0,           # Fraction of requests answered with a 500
+    'rate_limit_rate': 0.0,      # Fraction of requests answered with a 429
+    'retry_after': 1,            # Retry-After header (seconds) sent with 429s
+    'wrap_rate': 0.0,            # Fraction of responses wrapped in ```json fences
+    'response_file': None,       # Canned poster JSON (falls back to generated data)
+    'require_schema': False,     # Reject requests that do not ask for schema-constrained output
+}
+
+# Request counters, reported by GET /stats
+STATS = {
+    'requests': 0,
+    'openai': 0,
+    'anthropic': 0,
+    'ok': 0,
+    'errors': 0,
+    'rate_limited': 0,
+    'structured': 0,
+    'schema_errors': 0,
+}
+_stats_lock = threading.Lock()
+
+FILLER_WORDS = (
+    "participants intervention outcomes analysis cohort significant improvement "
+    "baseline follow-up measures randomized controlled evidence clinical practice "
+    "framework implementation data findings treatment effect population approach "
+    "quality support results study design primary secondary health digital care"
+).split()
+
+
+def sample_latency():
+    """Sample a response delay in seconds from the configured distribution."""
+    mean = SERVER_CONFIG['latency_ms'] / 1000.0
+    jitter = SERVER_CONFIG['latency_jitter_ms'] / 1000.0
+    distribution = SERVER_CONFIG['latency']
+
+    if distribution == 'fixed':
+        delay = mean
+    elif distribution == 'uniform':
+        delay = random.uniform(mean - jitter, mean + jitter)
+    elif distribution == 'normal':
+        delay = random.gauss(mean, jitter)
+    else:
+        # Log-normal gives the heavy right tail real providers show
+        if mean <= 0:
+            return 0.0
+        # Choose mu and sigma so the samples' mean is `mean` and their standard deviation
+        # `jitter` (lognormvariate(0, sigma) * mean would make `mean` the median instead)
+        sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2))
+        mu = math.log(mean) - sigma ** 2 / 2
+        delay = random.lognormvariate(mu, sigma)
+    return max(0.0, delay)
+
+
+def generated_words(count):
+    """Return a sentence of roughly `count` filler words."""
+    words = [random.choice(FILLER_WORDS) for _ in range(count)]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def generate_poster():
+    """Generate a poster dictionary that respects the prompt's word counts."""
+    return {
+        "headline": "STAND-IN SERVER *BOOSTS* LOAD TESTING",
+        "title": "A stand-in language model for offline load testing of poster generation",
+        "authors": "Smith J, Doe A, Johnson B",
+        "affiliations": "Department of Testing, University of Example",
+        "subtitle": "",
+        "Introduction": generated_words(70),
+        "Objective": generated_words(20),
+        "Methods": generated_words(85),
+        "Results": generated_words(85),
+        "Discussion": generated_words(70),
+        "Conclusions": generated_words(70),
+        "References": "Smith J, Doe A. Offline testing of language model pipelines. J Test. 2024;1(1):1-10.",
+    }
+
+
+def load_canned_poster():
+    """Load canned poster JSON (the app's dummy data format is accepted too)."""
+    response_file = SERVER_CONFIG['response_file']
+    if not response_file:
+        return None
+    try:
+        with open(response_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # dummy_api_response.json wraps the poster in {'timestamp', 'data'}
+        if isinstance(data, dict) and isinstance(data.get('data'), dict):
+            return data['data']
+        return data
+    except Exception as e:
+        print(f"⚠️ Could not load canned response {response_file}: {e}")
+        return None
+
+
+def poster_fields(keys=None):
+    """Return the poster dictionary, limited to `keys` (with "" for keys it doesn't know)."""
+    poster = load_canned_poster() or generate_poster()
+    if keys is None:
+        return poster
+    return {key: str(poster.get(key, "")) for key in keys}
+
+
+def poster_content(keys=None):
+    """Return the poster JSON text the stand-in model 'writes'."""
+    content = json.dumps(poster_fields(keys), indent=2, ensure_ascii=False)
+    if random.random() < SERVER_CONFIG['wrap_rate']:
+        content = f"```json\n{content}\n```"
+    return content
+
+
+def validate_schema(schema):
+    """
+    Check a poster schema the way strict structured output requires.
+    Returns (keys, problem): the schema's property names, or a description of what is wrong.
+    """
+    if not isinstance(schema, dict) or schema.get('type') != 'object':
+        return None, "schema must be an object schema"
+    properties = schema.get('properties')
+    if not isinstance(properties, dict) or not properties:
+        return None, "schema must define properties"
+    for key, spec in properties.items():
+        if not isinstance(spec, dict) or spec.get('type') != 'string':
+            return None, f"property '{key}' must be a string"
+    if sorted(schema.get('required', [])) != sorted(properties):
+        return None, "every property must be required"
+    if schema.get('additionalProperties') is not False:
+        return None, "additionalProperties must be false"
+    return list(properties), None
+
+
+def requested_schema(api, payload):
+    """
+    Find the output schema a request asks for.
+    Returns (schema_or_None, problem) - problem is set when the request shape is wrong.
+    """
+    if api == 'openai':
+        response_format = payload.get('response_format')
+        if response_format is None:
+            return None, None
+        if response_format.get('type') != 'json_schema':
+            return None, "response_format.type must be json_schema"
+        json_schema = response_format.get('json_schema') or {}
+        if not json_schema.get('name') or json_schema.get('strict') is not True:
+            return None, "json_schema needs a name and strict: true"
+        return json_schema.get('schema'), None
+
+    tools = payload.get('tools')
+    if tools is None:
+        return None, None
+    choice = payload.get('tool_choice') or {}
+    tool = next((t for t in tools if t.get('name') == choice.get('name')), None)
+    if choice.get('type') != 'tool' or tool is None:
+        return None, "tool_choice must name one of the tools"
+    if 'input_schema' not in tool:
+        return None, "tool needs an input_schema"
+    return tool['input_schema'], None
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def count(key):
+    with _stats_lock:
+        STATS[key] += 1
+
+
+class StandInLLMHandler(BaseHTTPRequestHandler):
+    """Handle OpenAI and Anthropic style requests."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw or b'{}')
+        except json.JSONDecodeError:
+            return None
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'healthy'})
+        elif self.path == '/stats':
+            with _stats_lock:
+                self.send_json(200, dict(STATS))
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path.endswith('/chat/completions'):
+            api = 'openai'
+        elif self.path.endswith('/messages'):
+            api = 'anthropic'
+        else:
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        count('requests')
+        count(api)
+        payload = self.read_json()
+        if payload is None:
+            self.send_error_response(api, 400, 'invalid_request_error', 'Request body is not valid JSON')
+            return
+
+        schema, problem = requested_schema(api, payload)
+        keys = None
+        if schema is not None and problem is None:
+            keys, problem = validate_schema(schema)
+        if problem is None and schema is None and SERVER_CONFIG['require_schema']:
+            problem = "structured output schema is required (stand-in server started with --require-schema)"
+        if problem:
+            count('schema_errors')
+            self.send_error_response(api, 400, 'invalid_request_error', f"Invalid output schema: {problem}")
+            return
+        if schema is not None:
+            count('structured')
+
+        time.sleep(sample_latency())
+
+        roll = random.random()
+        if roll < SERVER_CONFIG['rate_limit_rate']:
+            count('rate_limited')
+            self.send_error_response(api, 429, 'rate_limit_error', 'Rate limit exceeded (stand-in server)',
+                                     {'Retry-After': str(SERVER_CONFIG['retry_after'])})
+            return
+        if roll < SERVER_CONFIG['rate_limit_rate'] + SERVER_CONFIG['error_rate']:
+            count('errors')
+            self.send_error_response(api, 500, 'api_error', 'Internal server error (stand-in server)')
+            return
+
+        count('ok')
+        if api == 'openai':
+            self.send_json(200, self.openai_response(payload, keys))
+        else:
+            self.send_json(200, self.anthropic_response(payload, keys))
+
+    def send_error_response(self, api, status, error_type, message, headers=None):
+        if api == 'openai':
+            payload = {'error': {'message': message, 'type': error_type, 'param': None, 'code': None}}
+        else:
+            payload = {'type': 'error', 'error': {'type': error_type, 'message': message}}
+        self.send_json(status, payload, headers)
+
+    def openai_response(self, payload, keys=None):
+        # Structured requests get exactly the schema's keys, unwrapped
+        content = json.dumps(poster_fields(keys), ensure_ascii=False) if keys else poster_content()
+        prompt_text = " ".join(str(m.get('content', '')) for m in payload.get('messages', []))
+        prompt_tokens = estimate_tokens(prompt_text)
+        completion_tokens = estimate_tokens(content)
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'gpt-4o'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+    def anthropic_response(self, payload, keys=None):
+        prompt_text = " ".join(str(m.get('content', '')) for m in payload.get('messages', []))
+        if keys:
+            tool_input = poster_fields(keys)
+            return {
+                'id': f"msg_{uuid.uuid4().hex[:24]}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': payload.get('model', 'claude-3-5-sonnet-20241022'),
+                'content': [{
+                    'type': 'tool_use',
+                    'id': f"toolu_{uuid.uuid4().hex[:24]}",
+                    'name': payload['tool_choice']['name'],
+                    'input': tool_input,
+                }],
+                'stop_reason': 'tool_use',
+                'stop_sequence': None,
+                'usage': {
+                    'input_tokens': estimate_tokens(prompt_text),
+                    'output_tokens': estimate_tokens(json.dumps(tool_input)),
+                },
+            }
+
+        content = poster_content()
+        return {
+            'id': f"msg_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': payload.get('model', 'claude-3-5-sonnet-20241022'),
+            'content': [{'type': 'text', 'text': content}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {
+                'input_tokens': estimate_tokens(prompt_text),
+                'output_tokens': estimate_tokens(content),
+            },
+        }
+
+
+def main():
+    """Parse options and run the stand-in server."""
+    parser = argparse.ArgumentParser(description='Stand-in OpenAI/Anthropic server for offline load testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MOCK_LLM_PORT', DEFAULT_PORT)))
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'normal', 'lognormal'], default=SERVER_CONFIG['latency'])
+    parser.add_argument('--latency-ms', type=float, default=SERVER_CONFIG['latency_ms'])
+    parser.add_argument('--latency-jitter-ms', type=float, default=SERVER_CONFIG['latency_jitter_ms'])
+    parser.add_argument('--error-rate', type=float, default=SERVER_CONFIG['error_rate'])
+    parser.add_argument('--rate-limit-rate', type=float, default=SERVER_CONFIG['rate_limit_rate'])
+    parser.add_argument('--retry-after', type=int, default=SERVER_CONFIG['retry_after'])
+    parser.add_argument('--wrap-rate', type=float, default=SERVER_CONFIG['wrap_rate'])
+    parser.add_argument('--response-file', default=None,
+                        help='Canned poster JSON to return (e.g. dummy_api_response.json)')
+    parser.add_argument('--require-schema', action='store_true',
+                        help='Reject requests that do not send a structured output schema')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    SERVER_CONFIG.update({
+        'latency': args.latency,
+        'latency_ms': args.latency_ms,
+        'latency_jitter_ms': args.latency_jitter_ms,
+        'error_rate': args.error_rate,
+        'rate_limit_rate': args.rate_limit_rate,
+        'retry_after': args.retry_after,
+        'wrap_rate': args.wrap_rate,
+        'response_file': args.response_file,
+        'require_schema': args.require_schema,
+    })
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = ThreadingHTTPServer((args.host, args.port), StandInLLMHandler)
+    server.daemon_threads = True
+    print(f"🧪 Stand-in LLM server listening on http://{args.host}:{args.port}")
+    print(f"   OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"   ANTHROPIC_BASE_URL=http://{args.host}:{args.port}")
+    print(f"   Latency: {args.latency} ~{args.latency_ms:.0f}ms ±{args.latency_jitter_ms:.0f}ms, "
+          f"errors: {args.error_rate:.0%}, 429s: {args.rate_limit_rate:.0%}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stand-in LLM server stopped")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
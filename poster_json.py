@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Poster JSON Parser
+Turns an AI response into the poster dictionary without ever evaluating it as
+Python. Valid JSON is decoded directly; anything else gets one linear repair
+pass that:
+
+- skips prose and ``` fences around the first JSON object (and anything after it)
+- replaces raw newlines/tabs inside strings with spaces
+- converts single-quoted strings to double-quoted ones
+- escapes stray double quotes inside values
+- drops trailing commas before } and ]
+- maps Python's True/False/None to JSON
+
+The result is then checked against the expected poster keys. A response that was
+cut off, or that lacks the fields a poster cannot do without (the title and at
+least one body section), is rejected so the caller can ask again.
+"""
+
+import re
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_BARE_WORD = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+# Runs of characters that are copied unchanged (inside strings / outside strings)
+_PLAIN_STRING_RUN = re.compile(r'[^"\'\\\x00-\x1f]+')
+_PLAIN_OUTSIDE_RUN = re.compile(r'[0-9.\-+eE: \t\r\n]+')
+_PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+# Characters that can follow the end of a string in JSON
+_AFTER_STRING = set(',:}]')
+
+# Fields a poster needs: every REQUIRED_KEYS field, and at least one BODY_KEYS field (of those expected)
+REQUIRED_KEYS = ('title',)
+BODY_KEYS = ('Introduction', 'Objective', 'Methods', 'Results', 'Discussion', 'Conclusions')
+
+
+def find_json_start(text):
+    """Index of the first '{' in text, or -1."""
+    return text.find('{')
+
+
+def repair_json(text, start=0):
+    """
+    Rewrite the first JSON-like object in `text` (from `start`) as valid JSON in one
+    left-to-right pass. Returns (repaired object text, truncated); a truncated object
+    is closed so it parses, but its last value may be cut short.
+    """
+    out = []
+    depth = 0
+    i = start
+    n = len(text)
+    in_string = False
+    quote = '"'
+    last_significant = -1  # Index in `out` of the last non-whitespace token outside strings
+
+    while i < n:
+        ch = text[i]
+
+        if in_string:
+            run = _PLAIN_STRING_RUN.match(text, i)
+            if run:
+                out.append(run.group())
+                i = run.end()
+                continue
+            if ch == '\\':
+                nxt = text[i + 1] if i + 1 < n else ''
+                if quote == "'" and nxt == "'":
+                    out.append("'")           # \' is not a JSON escape
+                elif nxt in '"\\/bfnrtu':
+                    out.append(ch + nxt)
+                else:
+                    out.append('\\\\' + nxt)  # Lone backslash: keep it literally
+                i += 2
+                continue
+            if ch == quote:
+                # A quote only closes the string if JSON syntax can follow it
+                after = _WHITESPACE.match(text, i + 1).end()
+                if after >= n or text[after] in _AFTER_STRING:
+                    out.append('"')
+                    in_string = False
+                    last_significant = len(out) - 1
+                else:
+                    out.append('\\"' if quote == '"' else "'")  # Quote or apostrophe inside the value
+                i += 1
+                continue
+            if ch == '"':
+                out.append('\\"')             # Double quote inside a single-quoted string
+            elif ch in '\r\n\t' or ch < ' ':
+                out.append(' ')               # Raw control characters are not allowed in JSON strings
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"' or ch == "'":
+            in_string = True
+            quote = ch
+            out.append('"')
+        elif ch == '{' or ch == '[':
+            depth += 1
+            out.append(ch)
+            last_significant = len(out) - 1
+        elif ch == '}' or ch == ']':
+            if last_significant >= 0 and out[last_significant] == ',':
+                out[last_significant] = ''    # Trailing comma
+            depth -= 1
+            out.append(ch)
+            last_significant = len(out) - 1
+            if depth == 0:
+                break
+        elif ch in '0123456789.-+: \t\r\n':
+            run = _PLAIN_OUTSIDE_RUN.match(text, i).group()
+            out.append(run)
+            if not run.isspace():
+                last_significant = len(out) - 1
+            i += len(run)
+            continue
+        elif ch.isalpha() or ch == '_':
+            word = _BARE_WORD.match(text, i).group()
+            out.append(_PYTHON_LITERALS.get(word, word))
+            last_significant = len(out) - 1
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+            if not ch.isspace():
+                last_significant = len(out) - 1
+        i += 1
+
+    # Close a truncated response so it can at least be decoded
+    truncated = in_string or depth > 0
+    if in_string:
+        out.append('"')
+    if depth > 0:
+        if last_significant >= 0 and out[last_significant] == ',':
+            out[last_significant] = ''
+        out.append('}' * depth)
+    return ''.join(out), truncated
+
+
+def parse_json_object(text):
+    """
+    Decode the first JSON object in text, repairing it if needed.
+    Returns (object, repaired) or raises ValueError (also for a truncated object).
+    """
+    start = find_json_start(text)
+    if start == -1:
+        raise ValueError("No JSON object found in response")
+    try:
+        obj, _ = _decoder.raw_decode(text, start)
+        return obj, False
+    except json.JSONDecodeError:
+        pass
+    repaired, truncated = repair_json(text, start)
+    if truncated:
+        raise ValueError("Response was cut off before the JSON object ended")
+    try:
+        return json.loads(repaired), True
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair JSON ({e})") from e
+
+
+def _as_text(value):
+    """Coerce a poster field value to a single-line string."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "; ".join(_as_text(item) for item in value if item is not None)
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {_as_text(v)}" for k, v in value.items())
+    return str(value)
+
+
+def validate_poster(obj, expected_keys):
+    """
+    Check a decoded object against the poster keys.
+    Returns (poster, problems): missing keys become "", values are coerced to
+    strings and unexpected keys are dropped. poster is None if the object is
+    unusable: not an object, or without the required fields (see missing_required).
+    """
+    if not isinstance(obj, dict):
+        return None, [f"expected a JSON object, got {type(obj).__name__}"]
+
+    problems = []
+    poster = {}
+    for key in expected_keys:
+        if key in obj:
+            if not isinstance(obj[key], str):
+                problems.append(f"'{key}' was {type(obj[key]).__name__}, converted to text")
+            poster[key] = _as_text(obj[key])
+        else:
+            problems.append(f"missing '{key}'")
+            poster[key] = ""
+    extra = [key for key in obj if key not in expected_keys]
+    if extra:
+        problems.append(f"ignored unexpected keys {extra}")
+    missing = missing_required(poster, expected_keys)
+    if missing:
+        return None, problems + [f"no content for {missing}"]
+    return poster, problems
+
+
+def missing_required(poster, expected_keys):
+    """
+    Description of the required fields `poster` lacks content for, or None. Of the expected
+    keys, every REQUIRED_KEYS field and at least one BODY_KEYS field must be filled in;
+    a subset with neither (e.g. just References) needs at least one field.
+    """
+    filled = {key for key in expected_keys if poster.get(key, '').strip()}
+    missing = [key for key in REQUIRED_KEYS if key in expected_keys and key not in filled]
+    body = [key for key in BODY_KEYS if key in expected_keys]
+    if body and not filled.intersection(body):
+        missing.append('any of ' + '/'.join(body))
+    if not missing and not filled:
+        missing.append('any of ' + '/'.join(expected_keys))
+    return ', '.join(missing) or None
+
+
+def parse_poster_json(text, expected_keys):
+    """
+    Parse an AI response into a poster dictionary with exactly `expected_keys`.
+    Returns (poster, error); problems that were fixed are printed, not returned.
+    """
+    try:
+        obj, repaired = parse_json_object(text)
+    except ValueError as e:
+        return None, str(e)
+
+    poster, problems = validate_poster(obj, expected_keys)
+    if repaired:
+        print("🔧 AI response was not valid JSON; repaired it")
+    for problem in problems:
+        print(f"⚠️ Poster JSON: {problem}")
+    if poster is None:
+        return None, f"AI response is not a usable poster ({problems[-1]})"
+    return poster, None
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+PPTX Slimmer
+Rewrites a .pptx package without the parts its slides never use. Starting from
+the package relationships it:
+
+- removes slide layouts no slide is based on, and slide masters left without a used layout
+- drops the docProps thumbnail
+- walks the relationship graph and drops every part that is no longer reachable
+  (orphaned media, the unused layouts' themes and images, ...)
+- optionally downsamples images (Pillow, if installed) to a longest side, or to the
+  resolution at which they are actually printed given their size on the slide
+- recompresses XML, fonts and other parts at a chosen deflate level; images and other
+  already-compressed media are deflated only if they deflated well in the source package
+
+Works on the zip/OPC level with lxml (a python-pptx dependency), so it can run
+on rendered posters and on library templates alike.
+"""
+
+import io
+import os
+import time
+import zipfile
+import posixpath
+import threading
+
+from lxml import etree
+
+try:
+    from PIL import Image  # Optional: used to downsample oversized images
+except ImportError:
+    Image = None
+
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+RT_OFFICE_DOCUMENT = R_NS + '/officeDocument'
+RT_SLIDE = R_NS + '/slide'
+RT_SLIDE_LAYOUT = R_NS + '/slideLayout'
+RT_SLIDE_MASTER = R_NS + '/slideMaster'
+RT_IMAGE = R_NS + '/image'
+RT_THUMBNAIL = 'http://schemas.openxmlformats.org/package/2006/relationships/metadata/thumbnail'
+
+# Deflate level for XML parts: 9 is only marginally smaller than 6 on slide XML but costs
+# noticeably more time, so 6 is the default; templates (slimmed once) use 9
+DEFAULT_COMPRESSLEVEL = 6
+
+# Already-compressed formats: deflated only if the source package shows it pays off
+COMPRESSED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.wdp', '.jfif', '.mp4', '.m4a', '.mp3')
+# ...that is, if they deflated to less than this fraction of their size
+STORE_RATIO = 0.97
+
+# Formats Pillow can rewrite without changing the part's content type
+RESAMPLE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG'}
+
+EMU_PER_INCH = 914400
+# Cropping (a:srcRect) is given in thousandths of a percent
+_CROP_WHOLE = 100000
+
+_ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)  # Fixed, so identical content gives identical bytes
+
+
+def _rels_name(part_name):
+    """Name of the relationships part belonging to part_name ('' is the package)."""
+    directory, base = posixpath.split(part_name)
+    return posixpath.join(directory, '_rels', base + '.rels')
+
+
+def _resolve(source_part, target):
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+class _Package:
+    """The parts of a zip package, with parsed relationship parts on demand."""
+
+    def __init__(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+            self.parts = {info.filename: archive.read(info) for info in infos}
+        # Parts whose deflated size was well below their raw size in the source package
+        self.compressible = {info.filename for info in infos
+                             if info.compress_type == zipfile.ZIP_DEFLATED
+                             and info.compress_size < info.file_size * STORE_RATIO}
+        self._rels = {}
+
+    def rels(self, part_name):
+        """Parsed relationships of a part (None if it has none)."""
+        name = _rels_name(part_name)
+        if name not in self._rels:
+            data = self.parts.get(name)
+            self._rels[name] = etree.fromstring(data) if data else None
+        return self._rels[name]
+
+    def targets(self, part_name, rel_type=None):
+        """[(rId, target part name, relationship element)] of internal relationships."""
+        rels = self.rels(part_name)
+        if rels is None:
+            return []
+        found = []
+        for rel in rels:
+            if rel.get('TargetMode') == 'External':
+                continue
+            if rel_type and rel.get('Type') != rel_type:
+                continue
+            found.append((rel.get('Id'), _resolve(part_name, rel.get('Target')), rel))
+        return found
+
+    def drop_rel(self, part_name, rel):
+        self.rels(part_name).remove(rel)
+
+    def xml(self, part_name):
+        return etree.fromstring(self.parts[part_name])
+
+    def save_xml(self, part_name, element):
+        self.parts[part_name] = etree.tostring(element, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+    def flush_rels(self):
+        for name, element in self._rels.items():
+            if element is not None:
+                self.save_xml(name, element)
+
+
+def _remove_id_entries(element, list_tag, r_id):
+    """Remove <list_tag>/* entries pointing at r_id."""
+    id_list = element.find(f'{{{P_NS}}}{list_tag}')
+    if id_list is None:
+        return
+    for entry in list(id_list):
+        if entry.get(f'{{{R_NS}}}id') == r_id:
+            id_list.remove(entry)
+
+
+def _prune_layouts_and_masters(package, presentation):
+    """Drop layouts no slide uses and masters with no used layout. Returns (layouts, masters) removed."""
+    used_layouts = set()
+    for _, slide, _ in package.targets(presentation, RT_SLIDE):
+        used_layouts.update(target for _, target, _ in package.targets(slide, RT_SLIDE_LAYOUT))
+
+    presentation_xml = package.xml(presentation)
+    layouts_removed = 0
+    masters_removed = 0
+    for master_rid, master, master_rel in package.targets(presentation, RT_SLIDE_MASTER):
+        layouts = package.targets(master, RT_SLIDE_LAYOUT)
+        if not any(layout in used_layouts for _, layout, _ in layouts):
+            _remove_id_entries(presentation_xml, 'sldMasterIdLst', master_rid)
+            package.drop_rel(presentation, master_rel)
+            masters_removed += 1
+            layouts_removed += len(layouts)
+            continue
+        master_xml = package.xml(master)
+        for layout_rid, layout, layout_rel in layouts:
+            if layout not in used_layouts:
+                _remove_id_entries(master_xml, 'sldLayoutIdLst', layout_rid)
+                package.drop_rel(master, layout_rel)
+                layouts_removed += 1
+        package.save_xml(master, master_xml)
+    package.save_xml(presentation, presentation_xml)
+    return layouts_removed, masters_removed
+
+
+def _reachable(package):
+    """Part names reachable from the package relationships."""
+    seen = set()
+    pending = [target for _, target, _ in package.targets('')]
+    while pending:
+        part = pending.pop()
+        if part in seen or part not in package.parts:
+            continue
+        seen.add(part)
+        pending.extend(target for _, target, _ in package.targets(part))
+    return seen
+
+
+def _int_attr(element, name, default=0):
+    return int(element.get(name, default)) if element is not None else default
+
+
+def _blip_print_size(blip, slide_size):
+    """
+    (width, height) in inches the whole image of an a:blip would print at, taking the
+    picture's extent, enclosing group scaling and cropping into account. None if unknown.
+    """
+    fill = blip.getparent()  # p:blipFill or a:blipFill
+    holder = fill.getparent()
+    if fill.find(f'{{{A_NS}}}tile') is not None:
+        return None
+    if holder.tag == f'{{{P_NS}}}bgPr':
+        width, height = slide_size
+    else:
+        properties = holder if holder.tag == f'{{{P_NS}}}spPr' else holder.find(f'{{{P_NS}}}spPr')
+        ext = properties.find(f'{{{A_NS}}}xfrm/{{{A_NS}}}ext') if properties is not None else None
+        if ext is None:
+            return None
+        width, height = _int_attr(ext, 'cx'), _int_attr(ext, 'cy')
+        # A group shows its children scaled by ext / chExt
+        for group in holder.iterancestors(f'{{{P_NS}}}grpSp'):
+            xfrm = group.find(f'{{{P_NS}}}grpSpPr/{{{A_NS}}}xfrm')
+            group_ext = xfrm.find(f'{{{A_NS}}}ext') if xfrm is not None else None
+            child_ext = xfrm.find(f'{{{A_NS}}}chExt') if xfrm is not None else None
+            if group_ext is None or child_ext is None or not _int_attr(child_ext, 'cx') or not _int_attr(child_ext, 'cy'):
+                continue
+            width = width * _int_attr(group_ext, 'cx') / _int_attr(child_ext, 'cx')
+            height = height * _int_attr(group_ext, 'cy') / _int_attr(child_ext, 'cy')
+
+    crop = fill.find(f'{{{A_NS}}}srcRect')
+    visible_width = 1 - (_int_attr(crop, 'l') + _int_attr(crop, 'r')) / _CROP_WHOLE
+    visible_height = 1 - (_int_attr(crop, 't') + _int_attr(crop, 'b')) / _CROP_WHOLE
+    if width <= 0 or height <= 0 or visible_width <= 0 or visible_height <= 0:
+        return None
+    return width / visible_width / EMU_PER_INCH, height / visible_height / EMU_PER_INCH
+
+
+def _print_sizes(package, slide_size):
+    """
+    {media part: (width, height)} in inches, the largest size each image prints at across
+    all of its uses. Images used anywhere in a way that cannot be measured are left out.
+    """
+    sizes = {}
+    unknown = set()
+    for part in list(package.parts):
+        if not part.endswith('.xml'):
+            continue
+        images = {r_id: target for r_id, target, rel in package.targets(part) if rel.get('Type') == RT_IMAGE}
+        if not images:
+            continue
+        measured = set()
+        for blip in package.xml(part).iter(f'{{{A_NS}}}blip'):
+            r_id = blip.get(f'{{{R_NS}}}embed')
+            if r_id not in images:
+                continue
+            measured.add(r_id)
+            size = _blip_print_size(blip, slide_size)
+            if size is None:
+                unknown.add(images[r_id])
+                continue
+            width, height = sizes.get(images[r_id], (0, 0))
+            sizes[images[r_id]] = (max(width, size[0]), max(height, size[1]))
+        # Referenced some other way (svg fallbacks, VML, charts, ...)
+        unknown.update(target for r_id, target in images.items() if r_id not in measured)
+    return {name: size for name, size in sizes.items() if name not in unknown}
+
+
+def _downsample(name, data, max_pixels=None, print_size=None, dpi=None):
+    """
+    Return smaller image bytes for an image with more pixels than needed, or None.
+    Needed is at most max_pixels on the longest side and, given print_size (inches)
+    and dpi, no more than printing it at that size takes.
+    """
+    fmt = RESAMPLE_FORMATS.get(posixpath.splitext(name)[1].lower())
+    if not fmt or Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            scale = 1.0
+            if max_pixels:
+                scale = min(scale, max_pixels / max(img.size))
+            if print_size and dpi:
+                scale = min(scale, max(print_size[0] * dpi / img.size[0], print_size[1] * dpi / img.size[1]))
+            if scale >= 1.0:
+                return None
+            size = (max(1, round(img.size[0] * scale)), max(1, round(img.size[1] * scale)))
+            if img.mode in ('P', '1'):
+                img = img.convert('RGBA')  # Palette images would only get nearest-neighbour resampling
+            img = img.resize(size, Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == 'JPEG':
+                img.convert('RGB').save(out, fmt, quality=90, optimize=True)
+            else:
+                img.save(out, fmt, optimize=True)
+    except Exception as e:
+        print(f"[WARNING] Could not downsample {name}: {e}")
+        return None
+    return out.getvalue() if out.tell() < len(data) else None
+
+
+def slim_pptx(source_path, output_path=None, compresslevel=DEFAULT_COMPRESSLEVEL,
+              drop_thumbnail=True, prune_layouts=True, max_image_pixels=None, media_dpi=None):
+    """
+    Write a slimmed copy of source_path to output_path (default: replace source_path).
+    `max_image_pixels` caps the longest side of every image; `media_dpi` downsamples each
+    image to that resolution at the largest size it is printed at on the slides.
+    If the result is no smaller (an already slim package), the original bytes are kept.
+    Returns a report: bytes_before, bytes_after, bytes_saved, parts_removed,
+    layouts_removed, masters_removed, images_downsampled, seconds.
+    """
+    started = time.perf_counter()
+    output_path = output_path or source_path
+    with open(source_path, 'rb') as f:
+        original = f.read()
+    package = _Package(original)
+
+    if drop_thumbnail:
+        for _, _, rel in package.targets('', RT_THUMBNAIL):
+            package.drop_rel('', rel)
+
+    layouts_removed = masters_removed = 0
+    presentations = package.targets('', RT_OFFICE_DOCUMENT)
+    if prune_layouts and presentations:
+        layouts_removed, masters_removed = _prune_layouts_and_masters(package, presentations[0][1])
+    package.flush_rels()
+
+    # Keep reachable parts, their relationship parts and the content types
+    keep = _reachable(package)
+    keep |= {_rels_name(part) for part in keep if _rels_name(part) in package.parts}
+    keep |= {'[Content_Types].xml', '_rels/.rels'}
+    removed = sorted(name for name in package.parts if name not in keep)
+    for name in removed:
+        del package.parts[name]
+
+    content_types = package.xml('[Content_Types].xml')
+    for override in content_types.findall(f'{{{CT_NS}}}Override'):
+        if override.get('PartName', '').lstrip('/') not in package.parts:
+            content_types.remove(override)
+    package.save_xml('[Content_Types].xml', content_types)
+
+    downsampled = 0
+    if max_image_pixels or media_dpi:
+        print_sizes = {}
+        if media_dpi and presentations:
+            slide_size = package.xml(presentations[0][1]).find(f'{{{P_NS}}}sldSz')
+            if slide_size is not None:
+                print_sizes = _print_sizes(package, (_int_attr(slide_size, 'cx'), _int_attr(slide_size, 'cy')))
+        for name in [n for n in package.parts if n.startswith('ppt/media/')]:
+            smaller = _downsample(name, package.parts[name], max_image_pixels, print_sizes.get(name), media_dpi)
+            if smaller:
+                package.parts[name] = smaller
+                package.compressible.discard(name)
+                downsampled += 1
+
+    # [Content_Types].xml goes first, as some readers expect
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        names = ['[Content_Types].xml'] + sorted(n for n in package.parts if n != '[Content_Types].xml')
+        for name in names:
+            info = zipfile.ZipInfo(name, date_time=_ZIP_TIMESTAMP)
+            if not name.lower().endswith(COMPRESSED_EXTENSIONS) or name in package.compressible:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, package.parts[name], compresslevel=compresslevel)
+            else:
+                info.compress_type = zipfile.ZIP_STORED
+                archive.writestr(info, package.parts[name])
+    slimmed = buffer.getvalue()
+    if len(slimmed) >= len(original):
+        # Nothing worth removing; recompressing alone only made it bigger
+        slimmed = original
+        removed = []
+        layouts_removed = masters_removed = downsampled = 0
+
+    # Write next to the destination and rename, so a reader never sees a partial file
+    if slimmed is not original or os.path.abspath(output_path) != os.path.abspath(source_path):
+        staging = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(staging, 'wb') as f:
+                f.write(slimmed)
+            os.replace(staging, output_path)
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+
+    return {
+        'bytes_before': len(original),
+        'bytes_after': len(slimmed),
+        'bytes_saved': len(original) - len(slimmed),
+        'parts_removed': removed,
+        'layouts_removed': layouts_removed,
+        'masters_removed': masters_removed,
+        'images_downsampled': downsampled,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
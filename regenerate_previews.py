@@ -1,103 +1,102 @@
 #!/usr/bin/env python3
 """
-Script to regenerate problematic preview images
+Regenerate template preview images across the whole template library, in parallel.
+
+Each template's <name>_preview.png is drawn from its first slide (template_preview)
+in a pool of worker processes. Previews already drawn from the template as it is
+now are skipped, as are hand-made previews unless --include-manual is given (they
+are backed up to .backup first). A template whose slide cannot be drawn gets a
+placeholder card (preview_compositor) instead, marked so it too is skipped until
+the template changes.
+
+Usage: python regenerate_previews.py [--library template_library] [--workers N]
 """
 
 import os
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+import glob
+import time
+import argparse
+import multiprocessing
+
+from PIL import PngImagePlugin
+
+import render_cache
+from preview_compositor import placeholder_card
+from template_preview import PreviewWorker, SOURCE_KEY, drawn_from
 
-def create_placeholder_preview(template_name, output_path, width=800, height=600):
+PLACEHOLDER_PREFIX = 'placeholder:'
+
+
+def create_placeholder_preview(template_name, output_path, width=800, height=600, source=None):
     """Create a placeholder preview image for a template."""
     try:
-        # Create a new image with a light background
-        img = Image.new('RGB', (width, height), color='#f8f9fa')
-        draw = ImageDraw.Draw(img)
-        
-        # Add a border
-        draw.rectangle([0, 0, width-1, height-1], outline='#dee2e6', width=2)
-        
-        # Add template name
-        try:
-            # Try to use a system font
-            font = ImageFont.truetype("arial.ttf", 32)
-        except:
-            # Fallback to default font
-            font = ImageFont.load_default()
-        
-        # Wrap text if it's too long
-        wrapped_text = textwrap.fill(template_name, width=20)
-        
-        # Calculate text position (center)
-        bbox = draw.textbbox((0, 0), wrapped_text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
-        
-        # Draw text with shadow
-        draw.text((x+2, y+2), wrapped_text, fill='#6c757d', font=font)
-        draw.text((x, y), wrapped_text, fill='#495057', font=font)
-        
-        # Add a subtitle
-        subtitle = "Template Preview"
-        try:
-            subtitle_font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            subtitle_font = ImageFont.load_default()
-        
-        bbox_subtitle = draw.textbbox((0, 0), subtitle, font=subtitle_font)
-        subtitle_width = bbox_subtitle[2] - bbox_subtitle[0]
-        subtitle_x = (width - subtitle_width) // 2
-        subtitle_y = y + text_height + 20
-        
-        draw.text((subtitle_x, subtitle_y), subtitle, fill='#6c757d', font=subtitle_font)
-        
-        # Save the image
-        img.save(output_path, 'PNG', optimize=True)
+        img = placeholder_card(template_name, width, height)
+        metadata = None
+        if source:
+            metadata = PngImagePlugin.PngInfo()
+            metadata.add_text(SOURCE_KEY, source)
+        img.save(output_path, 'PNG', optimize=True, pnginfo=metadata)
         print(f"✅ Created placeholder preview: {output_path}")
         return True
-        
+
     except Exception as e:
         print(f"❌ Error creating placeholder for {template_name}: {e}")
         return False
 
+
+def _regenerate(job):
+    """Bring one template's preview up to date. Runs in a pool worker; returns (template, result, error)."""
+    template_path, cache_folder, width, include_manual = job
+    preview_path = os.path.splitext(template_path)[0] + '_preview.png'
+    try:
+        digest = render_cache.file_hash(template_path)
+        source = drawn_from(preview_path) if os.path.exists(preview_path) else digest
+        if source == PLACEHOLDER_PREFIX + digest:
+            return template_path, 'current', None
+        if source is None:
+            if not include_manual:
+                return template_path, 'manual', None
+            os.replace(preview_path, preview_path + '.backup')
+            print(f"📦 Backed up original: {preview_path}.backup")
+        return template_path, PreviewWorker(cache_folder, width).draw(template_path, preview_path), None
+    except Exception as e:
+        name = os.path.splitext(os.path.basename(template_path))[0]
+        if create_placeholder_preview(name, preview_path, source=PLACEHOLDER_PREFIX + render_cache.file_hash(template_path)):
+            return template_path, 'placeholder', str(e)
+        return template_path, 'failed', str(e)
+
+
 def main():
-    """Main function to regenerate problematic previews."""
-    
-    # Define the problematic templates
-    templates_to_fix = [
-        {
-            'name': 'Personal Blue Basic',
-            'path': 'template_library/available/Personal Blue Basic_preview.png'
-        },
-        {
-            'name': 'Playground Template', 
-            'path': 'template_library/coming_soon/Playground Template_preview.png'
-        }
-    ]
-    
-    print("🔄 Regenerating problematic preview images...")
-    
-    for template in templates_to_fix:
-        if os.path.exists(template['path']):
-            # Backup the original file
-            backup_path = template['path'] + '.backup'
-            try:
-                os.rename(template['path'], backup_path)
-                print(f"📦 Backed up original: {backup_path}")
-            except Exception as e:
-                print(f"⚠️ Could not backup {template['path']}: {e}")
-        
-        # Create new placeholder
-        success = create_placeholder_preview(template['name'], template['path'])
-        if success:
-            print(f"✅ Regenerated: {template['path']}")
-        else:
-            print(f"❌ Failed to regenerate: {template['path']}")
-    
-    print("🎉 Preview regeneration complete!")
+    """Regenerate every preview in the library."""
+    parser = argparse.ArgumentParser(description="Regenerate template preview images")
+    parser.add_argument('--library', default='template_library', help="Template library folder")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--width', type=int, default=int(os.getenv('TEMPLATE_PREVIEW_WIDTH', 1200)),
+                        help="Preview width in pixels")
+    parser.add_argument('--cache', default=os.getenv('PREVIEW_CACHE_FOLDER', 'preview_cache'),
+                        help="Preview cache folder shared with the app")
+    parser.add_argument('--include-manual', action='store_true',
+                        help="Also redraw hand-made previews (backed up to .backup)")
+    args = parser.parse_args()
+
+    templates = sorted(glob.glob(os.path.join(args.library, '*', '*.pptx')))
+    jobs = [(path, args.cache, args.width, args.include_manual) for path in templates]
+    print(f"🔄 Regenerating previews for {len(jobs)} templates with {args.workers} workers...")
+
+    started = time.time()
+    counts = {}
+    with multiprocessing.Pool(max(1, min(args.workers, len(jobs) or 1))) as pool:
+        for template_path, result, error in pool.imap_unordered(_regenerate, jobs):
+            counts[result] = counts.get(result, 0) + 1
+            name = os.path.relpath(template_path, args.library)
+            if result in ('placeholder', 'failed'):
+                print(f"⚠️ {name}: {result} ({error})")
+            elif result == 'manual':
+                print(f"✋ {name}: hand-made preview kept (use --include-manual to redraw)")
+
+    summary = ', '.join(f"{count} {result}" for result, count in sorted(counts.items()))
+    print(f"🎉 Preview regeneration complete in {time.time() - started:.1f}s: {summary or 'nothing to do'}")
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
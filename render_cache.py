@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Render Cache
+Content-addressed cache of generated posters. The key is a hash of everything
+that determines the .pptx: the extracted poster data, the template's content,
+the figure files and the figure descriptions. A hit copies the stored poster
+instead of rebuilding it, which covers users re-clicking "generate" and
+re-downloads after the output was cleaned up.
+
+Entries are plain files named <key>.pptx; their modification time is the LRU
+clock, so every worker sharing the folder sees the same cache and eviction
+order without any extra bookkeeping. A poster's preview image is kept next to
+it as <key>_preview.<ext> and evicted with it.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+# Location and size limit of the cache
+RENDER_CACHE_FOLDER = os.getenv('RENDER_CACHE_FOLDER', 'render_cache')
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_MB', 500)) * 1024 * 1024
+
+# Bump when populate_powerpoint_template changes its output for the same inputs
+RENDERER_VERSION = 1
+
+_HASH_CHUNK = 1024 * 1024
+
+PREVIEW_EXTENSIONS = ('.webp', '.png')
+
+# (path, size, mtime) -> sha256, so library templates are hashed once per process
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+_counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def file_hash(path):
+    """SHA-256 of a file's content (memoised on path, size and modification time)."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        cached = _file_hashes.get(memo_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    with _file_hashes_lock:
+        _file_hashes[memo_key] = value
+    return value
+
+
+def _canonical_descriptions(figure_descriptions):
+    """Figure descriptions arrive as a JSON string from the form; compare them by content."""
+    if isinstance(figure_descriptions, str):
+        try:
+            return json.loads(figure_descriptions or '{}')
+        except json.JSONDecodeError:
+            return figure_descriptions
+    return figure_descriptions or {}
+
+
+def render_key(extracted_data, template_path, figure_paths, figure_descriptions, figure_digests=None, options=None):
+    """
+    Hash of all render inputs. `figure_digests` (one per figure path) can be given
+    when the figures' content hashes are already known, e.g. from the figure store.
+    `options` holds renderer settings that change the output (e.g. post-render slimming).
+    """
+    material = {
+        'renderer': RENDERER_VERSION,
+        'data': extracted_data,
+        'template': file_hash(template_path),
+        'template_name': os.path.basename(template_path),  # Some templates have per-name font settings
+        'figures': figure_digests if figure_digests is not None else
+                   [file_hash(path) if path else None for path in (figure_paths or [])],
+        'descriptions': _canonical_descriptions(figure_descriptions),
+        'options': options or {},
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(RENDER_CACHE_FOLDER, f"{key}.pptx")
+
+
+def _preview_path(key, extension):
+    return os.path.join(RENDER_CACHE_FOLDER, f"{key}_preview{extension}")
+
+
+def _link_or_copy(source, destination):
+    """Hard-link source to destination (same filesystem), falling back to a copy."""
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        os.remove(destination)  # Stale output with the same name
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def fetch(key, output_path):
+    """Copy a cached poster to output_path. Returns True on a hit."""
+    entry = _entry_path(key)
+    try:
+        _link_or_copy(entry, output_path)
+    except FileNotFoundError:
+        _count('misses')
+        return False
+    try:
+        os.utime(entry)  # Mark as recently used
+    except OSError:
+        pass
+    _count('hits')
+    return True
+
+
+def fetch_preview(key, output_path):
+    """Copy a cached poster's preview image (same extension as output_path). Returns True if there was one."""
+    try:
+        _link_or_copy(_preview_path(key, os.path.splitext(output_path)[1]), output_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _put(source, entry):
+    """Stage next to the entry and rename, so other workers never see a partial file."""
+    staging = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        _link_or_copy(source, staging)
+        os.replace(staging, entry)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+def store(key, rendered_path, preview_path=None):
+    """Add a freshly rendered poster (and its preview image) to the cache, then evict down to the size limit."""
+    os.makedirs(RENDER_CACHE_FOLDER, exist_ok=True)
+    if preview_path:
+        preview_entry = _preview_path(key, os.path.splitext(preview_path)[1])
+        if not os.path.exists(preview_entry):
+            _put(preview_path, preview_entry)
+    entry = _entry_path(key)
+    if os.path.exists(entry):
+        return
+    _put(rendered_path, entry)
+    _count('stores')
+    evict()
+
+
+def _entries():
+    """[(mtime, size, path)] for every cache entry."""
+    entries = []
+    try:
+        with os.scandir(RENDER_CACHE_FOLDER) as it:
+            for item in it:
+                if item.name.endswith('.pptx') and item.is_file():
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def evict(max_bytes=None):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    max_bytes = RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except FileNotFoundError:
+            pass
+        key = os.path.splitext(os.path.basename(path))[0]
+        for extension in PREVIEW_EXTENSIONS:
+            try:
+                os.remove(_preview_path(key, extension))
+            except FileNotFoundError:
+                pass
+    if removed:
+        _count('evictions', removed)
+        print(f"🧹 Render cache: evicted {removed} poster(s) to stay under {max_bytes // (1024 * 1024)}MB")
+    return removed
+
+
+def stats():
+    """Cache size and hit counters (counters are per process)."""
+    entries = _entries()
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters['hits'] + counters['misses']
+    return {
+        'entries': len(entries),
+        'size_mb': round(sum(size for _, size, _ in entries) / (1024 * 1024), 2),
+        'max_size_mb': RENDER_CACHE_MAX_BYTES // (1024 * 1024),
+        'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0,
+        **counters,
+    }
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Shared State Store
+Small key/value store backed by a local SQLite file so that settings changed in one
+gunicorn worker (API provider, dummy mode, premium/coming-soon lists) are seen by all.
+
+Each process caches values in memory and only re-reads them when the store's
+version counter has moved on, so a cached read costs one tiny indexed query.
+
+Frequently written state (the LLM rate limiter's buckets) goes in a separate
+"live" table instead: it is read straight from SQLite and writing it does not
+bump the version, so it never empties the workers' settings caches.
+
+If SQLite fails (e.g. still locked after the busy timeout) the call that failed
+falls back to this process's memory, and SQLite is tried again after a short
+pause. Settings written meanwhile are saved to SQLite once it answers again.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Location of the shared database (all workers on a host must point at the same file)
+SHARED_STATE_DB = os.getenv('SHARED_STATE_DB', 'shared_state.db')
+
+# How long a worker waits for another worker's write lock (milliseconds)
+BUSY_TIMEOUT_MS = 5000
+
+# After an SQLite error, serve from process memory for this long before trying SQLite again (seconds)
+RETRY_AFTER = 2.0
+
+
+class SharedStateStore:
+    """SQLite-backed key/value store with per-process read caching."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_version = None
+        self._cache_lock = threading.Lock()
+        self._fallback = {}  # Values written in this process while SQLite was unavailable
+        self._retry_at = None  # While SQLite is failing: monotonic time of the next attempt
+        self._pid = os.getpid()
+
+    def _connect(self):
+        """Return this thread's connection, reconnecting after a fork."""
+        if self._pid != os.getpid():
+            # Connections must not be shared across fork(); start fresh in the child
+            self._local = threading.local()
+            self._cache = {}
+            self._cache_version = None
+            self._fallback = {}
+            self._retry_at = None
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS live (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+            self._local.conn = conn
+        return conn
+
+    def _available(self):
+        """Whether to use SQLite for this call (False while pausing after an error)."""
+        return self._retry_at is None or time.monotonic() >= self._retry_at
+
+    def _failed(self, error):
+        """Note an SQLite error: drop this thread's connection and pause before the next attempt."""
+        if self._retry_at is None:
+            print(f"⚠️ Shared state store unavailable ({error}); using this process's values for now")
+        self._retry_at = time.monotonic() + RETRY_AFTER
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _recovered(self, written=None):
+        """
+        After an outage: save the settings changed meanwhile to SQLite (except `written`, just
+        written by the caller; live values are dropped). Returns True if there was an outage.
+        """
+        if self._retry_at is None:
+            return False
+        with self._cache_lock:
+            if self._retry_at is None:
+                return False
+            pending = {key: value for key, value in self._fallback.items() if isinstance(key, str) and key != written}
+            self._retry_at = None
+            self._fallback = {}
+        print(f"✅ Shared state store available again; saving {len(pending)} setting(s) changed meanwhile")
+        for key, value in pending.items():
+            self.set(key, value)
+        return True
+
+    def _current_version(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def get(self, key, default=None):
+        """Return the value for `key`, served from the process cache when still valid."""
+        if self._available():
+            try:
+                conn = self._connect()
+                version = self._current_version(conn)
+                with self._cache_lock:
+                    if version != self._cache_version:
+                        rows = conn.execute("SELECT key, value FROM state").fetchall()
+                        self._cache = {k: json.loads(v) for k, v in rows}
+                        self._cache_version = version
+                    value = self._cache.get(key, default)
+                if self._recovered():
+                    return self.get(key, default)  # Read again now the pending settings are saved
+                return value
+            except sqlite3.Error as e:
+                self._failed(e)
+        # Unavailable: a value set here meanwhile, else the last one read from SQLite
+        if key in self._fallback:
+            return self._fallback[key]
+        with self._cache_lock:
+            return self._cache.get(key, default)
+
+    def set(self, key, value):
+        """Store `value` under `key` and bump the version so other processes reload."""
+        return self.update(key, lambda _current: value)
+
+    def update(self, key, func, default=None):
+        """
+        Atomically replace the value for `key` with func(current_value).
+        Returns the new value.
+        """
+        return self._update('state', key, func, default)
+
+    def get_live(self, key, default=None):
+        """Return the live value for `key`, read from the database every time (never cached)."""
+        if self._available():
+            try:
+                row = self._connect().execute("SELECT value FROM live WHERE key = ?", (key,)).fetchone()
+                self._recovered()
+                return json.loads(row[0]) if row else default
+            except sqlite3.Error as e:
+                self._failed(e)
+        return self._fallback.get(('live', key), default)
+
+    def update_live(self, key, func, default=None):
+        """Like update(), for a live value: the version is not bumped, so settings caches stay warm."""
+        return self._update('live', key, func, default)
+
+    def _update(self, table, key, func, default):
+        fallback_key = key if table == 'state' else (table, key)
+        if self._available():
+            try:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(f"SELECT value FROM {table} WHERE key = ?", (key,)).fetchone()
+                    current = json.loads(row[0]) if row else default
+                    new_value = func(current)
+                    conn.execute(
+                        f"INSERT INTO {table} (key, value) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (key, json.dumps(new_value)),
+                    )
+                    if table == 'state':
+                        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                    conn.execute("COMMIT")
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                self._recovered(written=key if table == 'state' else None)
+                return new_value
+            except sqlite3.Error as e:
+                self._failed(e)
+        # Unavailable: apply the change to this process's copy (starting from the last value read)
+        if table == 'state':
+            print(f"⚠️ Shared setting '{key}' changed in this worker only")
+            if fallback_key not in self._fallback:
+                with self._cache_lock:
+                    self._fallback[fallback_key] = self._cache.get(key, default)
+        self._fallback[fallback_key] = func(self._fallback.get(fallback_key, default))
+        return self._fallback[fallback_key]
+
+    def version(self):
+        """Return the store's version counter (increments on every settings write)."""
+        if not self._available():
+            return 0
+        try:
+            return self._current_version(self._connect())
+        except sqlite3.Error as e:
+            self._failed(e)
+            return 0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide shared state store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedStateStore(SHARED_STATE_DB)
+    return _store
+
+
+def get_setting(key, default=None):
+    """Read a shared setting."""
+    return get_store().get(key, default)
+
+
+def set_setting(key, value):
+    """Write a shared setting visible to every worker."""
+    return get_store().set(key, value)
+
+
+def update_setting(key, func, default=None):
+    """Atomically read-modify-write a shared setting."""
+    return get_store().update(key, func, default)
+
+
+def get_live_value(key, default=None):
+    """Read frequently written shared state (not cached, see SharedStateStore.get_live)."""
+    return get_store().get_live(key, default)
+
+
+def update_live_value(key, func, default=None):
+    """Atomically read-modify-write frequently written shared state without invalidating settings caches."""
+    return get_store().update_live(key, func, default)
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""
+Slide Preview
+Draws a slide into a Pillow image from what the .pptx itself describes: the
+background, then the master's and layout's own shapes and the slide's shapes
+in z-order (groups at any depth), each with its position, size, geometry,
+fill, outline, picture and text.
+
+It is a sketch, not a renderer: gradients are drawn as the average of their
+stops, rotation and effects are ignored, and text is set in Pillow's built-in
+font with simple word wrapping. That is enough to recognise a template or to
+check a poster's layout without opening PowerPoint.
+"""
+
+import io
+import colorsys
+import threading
+from collections import OrderedDict
+
+from lxml import etree
+from PIL import Image, ImageDraw, ImageFont
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+DEFAULT_WIDTH = 1200  # Pixels across the slide
+DEFAULT_FONT_PT = 18
+EMU_PER_POINT = 12700
+_WHOLE = 100000  # Percentages (lumMod, alpha, crop, ...) are given in thousandths of a percent
+_BEZIER_STEPS = 8
+
+# Decoded pictures kept between drawings (template backgrounds recur in every poster)
+DECODED_CACHE_SIZE = 64
+_decoded_images = OrderedDict()
+_decoded_lock = threading.Lock()
+
+# Text below this many pixels high is drawn as a bar instead of glyphs
+_MIN_GLYPH_PX = 5
+
+
+def _a(tag):
+    return f'{{{A_NS}}}{tag}'
+
+
+def _p(tag):
+    return f'{{{P_NS}}}{tag}'
+
+
+def _local(element):
+    return etree.QName(element).localname
+
+
+def _int(element, name, default=0):
+    if element is None or element.get(name) is None:
+        return default
+    return int(element.get(name))
+
+
+class _Theme:
+    """Colour scheme of a slide master, with the master's colour map applied."""
+
+    def __init__(self, master):
+        self.colors = {}
+        try:
+            theme = etree.fromstring(master.part.part_related_by(RT.THEME).blob)
+            for entry in theme.find(f'.//{_a("clrScheme")}'):
+                value = entry.find(_a('srgbClr'))
+                if value is not None:
+                    self.colors[_local(entry)] = value.get('val')
+                else:
+                    value = entry.find(_a('sysClr'))
+                    if value is not None:
+                        self.colors[_local(entry)] = value.get('lastClr', '000000')
+        except (KeyError, AttributeError, TypeError, etree.XMLSyntaxError):
+            pass
+        color_map = master._element.find(_p('clrMap'))
+        aliases = dict(color_map.attrib) if color_map is not None else {'bg1': 'lt1', 'tx1': 'dk1', 'bg2': 'lt2', 'tx2': 'dk2'}
+        for alias, slot in aliases.items():
+            if slot in self.colors:
+                self.colors[alias] = self.colors[slot]
+
+    def color(self, parent):
+        """(r, g, b, a) of the colour element inside parent (solidFill, gs, fillRef, ...), or None."""
+        if parent is None:
+            return None
+        for element in parent:
+            kind = _local(element)
+            if kind == 'srgbClr':
+                value = element.get('val')
+            elif kind == 'schemeClr':
+                value = self.colors.get(element.get('val'), '000000')
+            elif kind == 'sysClr':
+                value = element.get('lastClr', '000000')
+            elif kind == 'prstClr':
+                value = {'white': 'FFFFFF', 'black': '000000'}.get(element.get('val'), '808080')
+            else:
+                continue
+            return _apply_modifiers(value, element)
+        return None
+
+    def scheme(self, name):
+        """(r, g, b, a) of a scheme colour such as 'tx1'."""
+        return _apply_modifiers(self.colors.get(name, '000000'), ())
+
+
+def _apply_modifiers(hex_value, element):
+    try:
+        r, g, b = (int(hex_value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except (TypeError, ValueError):
+        r = g = b = 0.0
+    alpha = 1.0
+    for modifier in element:
+        kind = _local(modifier)
+        value = _int(modifier, 'val', _WHOLE) / _WHOLE
+        if kind in ('lumMod', 'lumOff'):
+            hue, lightness, saturation = colorsys.rgb_to_hls(r, g, b)
+            lightness = lightness * value if kind == 'lumMod' else lightness + value
+            r, g, b = colorsys.hls_to_rgb(hue, min(1.0, max(0.0, lightness)), saturation)
+        elif kind == 'tint':
+            r, g, b = (c + (1 - c) * (1 - value) for c in (r, g, b))
+        elif kind == 'shade':
+            r, g, b = (c * value for c in (r, g, b))
+        elif kind == 'alpha':
+            alpha = value
+    return tuple(int(round(c * 255)) for c in (r, g, b)) + (int(round(alpha * 255)),)
+
+
+def _average(colors):
+    colors = [c for c in colors if c]
+    if not colors:
+        return None
+    return tuple(sum(c[i] for c in colors) // len(colors) for i in range(4))
+
+
+def _font(size_px, _fonts={}):
+    size_px = max(1, int(size_px))
+    if size_px not in _fonts:
+        try:
+            _fonts[size_px] = ImageFont.load_default(size=size_px)
+        except TypeError:  # Pillow < 10.1 has only the fixed-size bitmap font
+            _fonts[size_px] = ImageFont.load_default()
+    return _fonts[size_px]
+
+
+def _text_length(font, text, _advances={}):
+    """Width of text in pixels from cached per-character advances (no kerning; far faster than measuring each line)."""
+    advances = _advances.setdefault(id(font), {})
+    width = 0.0
+    for char in text:
+        if char not in advances:
+            advances[char] = font.getlength(char)
+        width += advances[char]
+    return width
+
+
+class _Canvas:
+    """The image being drawn plus the EMU -> pixel scale."""
+
+    def __init__(self, slide_width, slide_height, width):
+        self.scale = width / slide_width
+        self.image = Image.new('RGB', (width, max(1, round(slide_height * self.scale))), 'white')
+        self.draw = ImageDraw.Draw(self.image, 'RGBA')
+
+    def box(self, transform, x, y, cx, cy):
+        """Pixel box (left, top, right, bottom) of a shape's EMU rectangle under a group transform."""
+        sx, sy, tx, ty = transform
+        left, top = (tx + sx * x) * self.scale, (ty + sy * y) * self.scale
+        return (round(left), round(top), round(left + sx * cx * self.scale), round(top + sy * cy * self.scale))
+
+    def picture(self, part, r_id):
+        """Decoded image of a picture relationship, no larger than the canvas."""
+        try:
+            image_part = part.related_part(r_id)
+        except KeyError:
+            return None
+        return _decoded(image_part.sha1, image_part.blob, self.image.size)
+
+
+def _decoded(digest, blob, size):
+    """
+    RGBA image of an image blob, shrunk to fit `size`. Kept in a small LRU keyed by content,
+    so the pictures a template shares with every poster made from it are decoded once.
+    """
+    key = (digest, size)
+    with _decoded_lock:
+        if key in _decoded_images:
+            _decoded_images.move_to_end(key)
+            return _decoded_images[key]
+    try:
+        image = Image.open(io.BytesIO(blob))
+        image.draft('RGB', size)  # JPEG: decode at reduced size
+        image.thumbnail(size, Image.BILINEAR, reducing_gap=2.0)
+        image = image.convert('RGBA')
+    except Exception:
+        image = None  # e.g. an SVG or EMF without a raster fallback
+    with _decoded_lock:
+        _decoded_images[key] = image
+        while len(_decoded_images) > DECODED_CACHE_SIZE:
+            _decoded_images.popitem(last=False)
+    return image
+
+
+def _geometry(properties, box):
+    """('rect'|'ellipse'|'roundrect'|'line'|'polygons', data) for the shape's geometry in pixels."""
+    left, top, right, bottom = box
+    preset = properties.find(_a('prstGeom')) if properties is not None else None
+    custom = properties.find(_a('custGeom')) if properties is not None else None
+    if preset is not None:
+        name = preset.get('prst')
+        if name == 'ellipse':
+            return 'ellipse', box
+        if name in ('roundRect', 'round2SameRect'):
+            adjust = preset.find(f'{_a("avLst")}/{_a("gd")}')
+            ratio = int(adjust.get('fmla', 'val 16667').split()[-1]) / _WHOLE if adjust is not None else 0.16667
+            return 'roundrect', (box, ratio * min(right - left, bottom - top))
+        if name in ('line', 'straightConnector1'):
+            xfrm = properties.find(_a('xfrm'))
+            if xfrm is not None and xfrm.get('flipV') == '1':
+                return 'line', ((left, bottom), (right, top))
+            return 'line', ((left, top), (right, bottom))
+        if name == 'triangle':
+            return 'polygons', [[((left + right) / 2, top), (right, bottom), (left, bottom)]]
+        if name == 'rtTriangle':
+            return 'polygons', [[(left, top), (right, bottom), (left, bottom)]]
+        return 'rect', box
+    if custom is not None:
+        polygons = []
+        for path in custom.iterfind(f'{_a("pathLst")}/{_a("path")}'):
+            width = _int(path, 'w') or 1
+            height = _int(path, 'h') or 1
+
+            def point(pt, width=width, height=height):
+                return (left + _int(pt, 'x') / width * (right - left), top + _int(pt, 'y') / height * (bottom - top))
+
+            current = []
+            for step in path:
+                kind = _local(step)
+                points = [point(pt) for pt in step.iterfind(_a('pt'))]
+                if kind == 'moveTo':
+                    if len(current) > 2:
+                        polygons.append(current)
+                    current = points
+                elif kind == 'lnTo':
+                    current.extend(points)
+                elif kind in ('cubicBezTo', 'quadBezTo') and current:
+                    start = current[-1]
+                    controls = [start] + points
+                    for i in range(1, _BEZIER_STEPS + 1):
+                        current.append(_bezier(controls, i / _BEZIER_STEPS))
+                elif kind == 'close' and len(current) > 2:
+                    polygons.append(current)
+                    current = []
+            if len(current) > 2:
+                polygons.append(current)
+        if polygons:
+            return 'polygons', polygons
+    return 'rect', box
+
+
+def _bezier(points, t):
+    while len(points) > 1:
+        points = [(a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t) for a, b in zip(points, points[1:])]
+    return points[0]
+
+
+def _draw_geometry(draw, geometry, fill=None, outline=None, width=1):
+    kind, data = geometry
+    if kind == 'ellipse':
+        draw.ellipse(_ordered(data), fill=fill, outline=outline, width=width)
+    elif kind == 'roundrect':
+        box, radius = data
+        draw.rounded_rectangle(_ordered(box), radius=max(0, int(radius)), fill=fill, outline=outline, width=width)
+    elif kind == 'line':
+        if outline:
+            draw.line(data, fill=outline, width=width)
+    elif kind == 'polygons':
+        for polygon in data:
+            draw.polygon(polygon, fill=fill, outline=outline, width=width)
+    else:
+        draw.rectangle(_ordered(data), fill=fill, outline=outline, width=width)
+
+
+def _ordered(box):
+    left, top, right, bottom = box
+    return (min(left, right), min(top, bottom), max(left, right), max(top, bottom))
+
+
+def _fill(properties, style, theme):
+    """('none'|'color'|'picture', value) of a shape's fill."""
+    if properties is not None:
+        for element in properties:
+            kind = _local(element)
+            if kind == 'noFill':
+                return 'none', None
+            if kind == 'solidFill':
+                return 'color', theme.color(element)
+            if kind == 'gradFill':
+                return 'color', _average(theme.color(stop) for stop in element.iter(_a('gs')))
+            if kind == 'pattFill':
+                return 'color', theme.color(element.find(_a('fgClr')))
+            if kind == 'blipFill':
+                return 'picture', element
+    reference = style.find(_a('fillRef')) if style is not None else None
+    if reference is not None and _int(reference, 'idx') > 0:
+        return 'color', theme.color(reference)
+    return 'none', None
+
+
+def _outline(properties, style, theme, scale):
+    """(color, width px) of a shape's outline, or (None, 0)."""
+    line = properties.find(_a('ln')) if properties is not None else None
+    width = max(1, round(_int(line, 'w', EMU_PER_POINT) * scale))
+    if line is not None:
+        if line.find(_a('noFill')) is not None:
+            return None, 0
+        solid = line.find(_a('solidFill'))
+        if solid is not None:
+            return theme.color(solid), width
+        gradient = line.find(_a('gradFill'))
+        if gradient is not None:
+            return _average(theme.color(stop) for stop in gradient.iter(_a('gs'))), width
+    reference = style.find(_a('lnRef')) if style is not None else None
+    if reference is not None and _int(reference, 'idx') > 0:
+        return theme.color(reference), width
+    return None, 0
+
+
+def _paste_picture(canvas, part, blip_fill, geometry, box):
+    blip = blip_fill.find(_a('blip'))
+    image = canvas.picture(part, blip.get(f'{{{R_NS}}}embed')) if blip is not None else None
+    left, top, right, bottom = _ordered(box)
+    if image is None or right - left < 1 or bottom - top < 1:
+        return
+    crop = blip_fill.find(_a('srcRect'))
+    if crop is not None:
+        w, h = image.size
+        crop_box = (round(w * _int(crop, 'l') / _WHOLE), round(h * _int(crop, 't') / _WHOLE),
+                    round(w * (1 - _int(crop, 'r') / _WHOLE)), round(h * (1 - _int(crop, 'b') / _WHOLE)))
+        if crop_box[2] > crop_box[0] and crop_box[3] > crop_box[1]:
+            image = image.crop(crop_box)
+    image = image.resize((right - left, bottom - top), Image.BILINEAR, reducing_gap=2.0)
+    mask = image.getchannel('A')
+    kind, data = geometry
+    if kind not in ('rect', 'line'):
+        # Clip to the shape, e.g. a photo inside a circle
+        shape_mask = Image.new('L', image.size, 0)
+        shifted = _shift(geometry, -left, -top)
+        _draw_geometry(ImageDraw.Draw(shape_mask), shifted, fill=255)
+        mask = Image.composite(mask, shape_mask, shape_mask)
+    canvas.image.paste(image.convert('RGB'), (left, top), mask)
+
+
+def _shift(geometry, dx, dy):
+    kind, data = geometry
+    move = lambda point: (point[0] + dx, point[1] + dy)
+    if kind in ('rect', 'ellipse'):
+        return kind, (data[0] + dx, data[1] + dy, data[2] + dx, data[3] + dy)
+    if kind == 'roundrect':
+        box, radius = data
+        return kind, ((box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy), radius)
+    if kind == 'line':
+        return kind, tuple(move(p) for p in data)
+    return kind, [[move(p) for p in polygon] for polygon in data]
+
+
+def _run_size(run_properties, fallback):
+    return _int(run_properties, 'sz', fallback * 100) / 100 if run_properties is not None else fallback
+
+
+def _text_lines(paragraph_text, font, max_width, wrap):
+    if not wrap or max_width <= 0:
+        return [paragraph_text]
+    lines = []
+    for chunk in paragraph_text.split('\n'):
+        line = ''
+        for word in chunk.split(' '):
+            candidate = f"{line} {word}" if line else word
+            if line and _text_length(font, candidate) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _draw_text(canvas, element, style, theme, box):
+    body = element.find(_p('txBody'))
+    if body is None:
+        return
+    paragraphs = body.findall(_a('p'))
+    if not any(t.text for t in body.iter(_a('t'))):
+        return
+    body_properties = body.find(_a('bodyPr'))
+    scale = canvas.scale
+    left, top, right, bottom = _ordered(box)
+    left += _int(body_properties, 'lIns', 91440) * scale
+    right -= _int(body_properties, 'rIns', 91440) * scale
+    top += _int(body_properties, 'tIns', 45720) * scale
+    bottom -= _int(body_properties, 'bIns', 45720) * scale
+    wrap = body_properties is None or body_properties.get('wrap') != 'none'
+    autofit = body_properties.find(_a('normAutofit')) if body_properties is not None else None
+    font_scale = _int(autofit, 'fontScale', _WHOLE) / _WHOLE if autofit is not None else 1.0
+
+    list_style = body.find(f'{_a("lstStyle")}/{_a("lvl1pPr")}/{_a("defRPr")}')
+    default_size = _run_size(list_style, DEFAULT_FONT_PT)
+    font_reference = style.find(_a('fontRef')) if style is not None else None
+    default_color = (theme.color(list_style.find(_a('solidFill'))) if list_style is not None else None) \
+        or theme.color(font_reference) or theme.scheme('tx1')
+
+    # Lay out the paragraphs first so the block can be anchored top, middle or bottom
+    laid_out = []
+    for paragraph in paragraphs:
+        runs = paragraph.findall(_a('r')) + paragraph.findall(_a('fld'))
+        text = ''.join('\n' if _local(run) == 'br' else (run.findtext(_a('t')) or '')
+                       for run in paragraph if _local(run) in ('r', 'fld', 'br'))
+        first = runs[0].find(_a('rPr')) if runs else paragraph.find(_a('endParaRPr'))
+        paragraph_default = paragraph.find(f'{_a("pPr")}/{_a("defRPr")}')
+        size_pt = _run_size(first, _run_size(paragraph_default, default_size)) * font_scale
+        color = theme.color(first.find(_a('solidFill'))) if first is not None else None
+        size_px = size_pt * EMU_PER_POINT * scale
+        font = _font(size_px)
+        lines = _text_lines(text, font, right - left, wrap) if text else ['']
+        align = paragraph.find(_a('pPr')).get('algn', 'l') if paragraph.find(_a('pPr')) is not None else 'l'
+        laid_out.append((lines, font, size_px, color or default_color, align))
+
+    height = sum(len(lines) * size_px * 1.2 for lines, _, size_px, _, _ in laid_out)
+    anchor = body_properties.get('anchor', 't') if body_properties is not None else 't'
+    y = top if anchor == 't' else (top + bottom - height) / 2 if anchor == 'ctr' else bottom - height
+    for lines, font, size_px, color, align in laid_out:
+        for line in lines:
+            if line.strip():
+                line_font = font
+                width = _text_length(font, line) if size_px >= _MIN_GLYPH_PX else len(line) * size_px * 0.5
+                if width > right - left > 0 and size_px >= _MIN_GLYPH_PX:
+                    # Pillow's font runs wider than most template fonts; shrink rather than spill out of the box
+                    line_font = _font(size_px * (right - left) / width)
+                    width = _text_length(line_font, line)
+                x = left if align not in ('ctr', 'r') else (left + right - width) / 2 if align == 'ctr' else right - width
+                if size_px >= _MIN_GLYPH_PX:
+                    canvas.draw.text((x, y), line, font=line_font, fill=color)
+                else:
+                    # Too small to read; a bar shows where the text sits
+                    bar = max(1, size_px * 0.6)
+                    canvas.draw.rectangle((x, y + size_px * 0.2, x + width, y + size_px * 0.2 + bar), fill=color[:3] + (110,))
+            y += size_px * 1.2
+
+
+def _draw_shape(canvas, part, element, theme, transform):
+    kind = _local(element)
+    properties = element.find(_p('spPr')) if kind != 'grpSp' else element.find(_p('grpSpPr'))
+    xfrm = properties.find(_a('xfrm')) if properties is not None else None
+    if kind == 'graphicFrame':
+        xfrm = element.find(_p('xfrm'))
+    if xfrm is None:
+        return  # Placeholder positioned by its layout, or a shape without geometry
+    offset, extent = xfrm.find(_a('off')), xfrm.find(_a('ext'))
+    if offset is None or extent is None:
+        return
+    x, y, cx, cy = _int(offset, 'x'), _int(offset, 'y'), _int(extent, 'cx'), _int(extent, 'cy')
+
+    if kind == 'grpSp':
+        child_offset, child_extent = xfrm.find(_a('chOff')), xfrm.find(_a('chExt'))
+        sx = cx / _int(child_extent, 'cx') if _int(child_extent, 'cx') else 1.0
+        sy = cy / _int(child_extent, 'cy') if _int(child_extent, 'cy') else 1.0
+        group = (sx, sy, x - _int(child_offset, 'x') * sx, y - _int(child_offset, 'y') * sy)
+        psx, psy, ptx, pty = transform
+        combined = (psx * group[0], psy * group[1], ptx + psx * group[2], pty + psy * group[3])
+        for child in element:
+            _draw_element(canvas, part, child, theme, combined)
+        return
+
+    box = canvas.box(transform, x, y, cx, cy)
+    style = element.find(_p('style'))
+    if kind == 'graphicFrame':
+        # Tables and charts: a light frame where they sit
+        canvas.draw.rectangle(_ordered(box), outline=(160, 160, 160, 255), width=1)
+        return
+    geometry = _geometry(properties, box)
+    if kind == 'pic':
+        _paste_picture(canvas, part, element.find(_p('blipFill')), geometry, box)
+    else:
+        fill_kind, fill = _fill(properties, style, theme)
+        if fill_kind == 'picture':
+            _paste_picture(canvas, part, fill, geometry, box)
+        elif fill_kind == 'color' and fill:
+            _draw_geometry(canvas.draw, geometry, fill=fill)
+    outline, width = _outline(properties, style, theme, canvas.scale)
+    if outline:
+        _draw_geometry(canvas.draw, geometry, outline=outline, width=width)
+    _draw_text(canvas, element, style, theme, box)
+
+
+def _draw_element(canvas, part, element, theme, transform, skip_placeholders=False):
+    kind = _local(element) if isinstance(element.tag, str) else None
+    if kind not in ('sp', 'pic', 'grpSp', 'cxnSp', 'graphicFrame'):
+        return
+    if skip_placeholders and element.find(f'.//{_p("nvPr")}/{_p("ph")}') is not None:
+        return
+    _draw_shape(canvas, part, element, theme, transform)
+
+
+def _draw_background(canvas, sources, theme):
+    """First background found on the slide, its layout or its master."""
+    for owner in sources:
+        background = owner._element.find(f'{_p("cSld")}/{_p("bg")}')
+        if background is None:
+            continue
+        box = (0, 0, canvas.image.width, canvas.image.height)
+        properties = background.find(_p('bgPr'))
+        if properties is not None:
+            fill_kind, fill = _fill(properties, None, theme)
+            if fill_kind == 'picture':
+                _paste_picture(canvas, owner.part, fill, ('rect', box), box)
+            elif fill_kind == 'color' and fill:
+                canvas.draw.rectangle(box, fill=fill)
+        else:
+            color = theme.color(background.find(_p('bgRef')))
+            if color:
+                canvas.draw.rectangle(box, fill=color)
+        return
+
+
+def render_slide(slide, width=DEFAULT_WIDTH):
+    """Draw a python-pptx slide into an RGB Pillow image `width` pixels wide."""
+    presentation = slide.part.package.presentation_part.presentation
+    canvas = _Canvas(presentation.slide_width, presentation.slide_height, width)
+    layout = slide.slide_layout
+    master = layout.slide_master
+    theme = _Theme(master)
+    identity = (1.0, 1.0, 0.0, 0.0)
+
+    _draw_background(canvas, (slide, layout, master), theme)
+    layers = []
+    if slide._element.get('showMasterSp') != '0' and layout._element.get('showMasterSp') != '0':
+        layers.append(master)
+    layers.append(layout)
+    for owner in layers:
+        for element in owner._element.find(f'{_p("cSld")}/{_p("spTree")}'):
+            _draw_element(canvas, owner.part, element, theme, identity, skip_placeholders=True)
+    for element in slide._element.find(f'{_p("cSld")}/{_p("spTree")}'):
+        _draw_element(canvas, slide.part, element, theme, identity)
+    return canvas.image
+
+
+def render_presentation(presentation, width=DEFAULT_WIDTH):
+    """Image of a presentation's first slide, or None if it has no slides."""
+    if not len(presentation.slides):
+        return None
+    return render_slide(presentation.slides[0], width)
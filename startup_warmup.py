@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup Warm-up
+Work a worker would otherwise do on its first requests, done once per process in
+a background thread after the worker is serving: importing the configured AI
+provider's SDK, building library template working copies and manifests, and so
+on. Importing the app stays cheap, so gunicorn workers boot (and autoscaled
+instances start answering health checks) quickly, and requests that arrive
+before the warm-up has finished simply do the work themselves.
+
+Under gunicorn with preload_app, the same kind of task list is run synchronously
+in the master before it forks (gunicorn.conf.py), and the workers share what it
+loaded copy-on-write; process_memory() shows how much of a worker is shared.
+"""
+
+import os
+import sys
+import time
+import threading
+
+
+def process_memory():
+    """
+    This process's memory in MB: resident (rss), proportional share (pss), pages shared with
+    other processes such as the preloading master and its other workers (shared), and its own
+    (private). From /proc/self/smaps_rollup on Linux; elsewhere only the peak RSS is known.
+    """
+    try:
+        fields = {}
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+        to_mb = lambda kb: round(kb / 1024, 1)
+        return {
+            'rss_mb': to_mb(fields['Rss']),
+            'pss_mb': to_mb(fields['Pss']),
+            'shared_mb': to_mb(fields['Shared_Clean'] + fields['Shared_Dirty']),
+            'private_mb': to_mb(fields['Private_Clean'] + fields['Private_Dirty']),
+        }
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource  # Not on Windows
+    except ImportError:
+        return {}
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'peak_rss_mb': round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)}
+
+
+class StartupWarmup:
+    """Named tasks run once per process in a daemon thread, after an optional delay."""
+
+    def __init__(self, tasks, delay_seconds=0):
+        # [(name, callable)]; each task's result (or error) and duration are shown in status()
+        self.tasks = tasks
+        self.delay_seconds = delay_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._results = {}
+        self._started = None
+        self._finished = None
+
+    def ensure_running(self):
+        """Start the warm-up in this process if it has not been started (threads do not survive fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._results = {}
+            self._started = self._finished = None
+            self._thread = threading.Thread(target=self._run, name='startup-warmup', daemon=True)
+            self._thread.start()
+
+    def run(self):
+        """Run every task now, in this thread. Returns {name: {'seconds', 'result' or 'error'}}."""
+        self._started = time.time()
+        for name, task in self.tasks:
+            start = time.perf_counter()
+            try:
+                outcome = {'result': task()}
+            except Exception as e:
+                print(f"⚠️ Warm-up task {name} failed: {e}")
+                outcome = {'error': str(e)}
+            outcome['seconds'] = round(time.perf_counter() - start, 3)
+            with self._lock:
+                self._results[name] = outcome
+        self._finished = time.time()
+        print(f"🔥 Warm-up finished in {self._finished - self._started:.2f}s (pid {os.getpid()})")
+        return self.status()['tasks']
+
+    def _run(self):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        self.run()
+
+    def status(self):
+        with self._lock:
+            return {
+                'worker_pid': os.getpid(),
+                'started': self._started is not None,
+                'finished': self._finished is not None,
+                'seconds': round(self._finished - self._started, 3) if self._finished else None,
+                'tasks': {name: dict(outcome) for name, outcome in self._results.items()},
+            }
@@ -5,8 +5,11 @@ Defines font sizes and colors for specific templates.
 """
 
 from pptx.enum.text import PP_ALIGN
+import shared_state
 
 # Premium template categorization
+# (defaults only - templates added or removed from the admin page are kept in shared_state
+# as changes to these lists, so every worker sees them and edits here still take effect)
 PREMIUM_TEMPLATES = [
     "Playground Template"  # Currently the only premium template
 ]
@@ -762,33 +765,81 @@ def is_premium_template(template_name):
     Check if a template is premium.
     Returns True if the template is in the premium list.
     """
-    return template_name in PREMIUM_TEMPLATES
+    return template_name in _shared_list('premium_templates', PREMIUM_TEMPLATES)
 
 def get_premium_templates():
     """
     Get list of all premium template names.
     """
-    return PREMIUM_TEMPLATES.copy()
+    return _shared_list('premium_templates', PREMIUM_TEMPLATES)
+
+def _list_changes(stored, default):
+    """
+    The {'added': [...], 'removed': [...]} changes to a default template list kept in shared_state.
+    """
+    if stored is None:
+        return {'added': [], 'removed': []}
+    return {'added': list(stored.get('added', [])), 'removed': list(stored.get('removed', []))}
+
+def _apply_changes(default, changes):
+    return ([name for name in default if name not in changes['removed']]
+            + [name for name in changes['added'] if name not in default])
+
+def _shared_list(key, default):
+    """
+    A template list: the default from this file with the shared admin changes applied.
+    """
+    return _apply_changes(default, _list_changes(shared_state.get_setting(key), default))
+
+def _add_to_shared_list(key, default, template_name):
+    """
+    Atomically add a name to a shared template list.
+    Returns True if added, False if already present.
+    """
+    added = []
+    def add(stored):
+        changes = _list_changes(stored, default)
+        if template_name not in _apply_changes(default, changes):
+            if template_name in changes['removed']:
+                changes['removed'].remove(template_name)
+            else:
+                changes['added'].append(template_name)
+            added.append(True)
+        return changes
+    shared_state.update_setting(key, add)
+    return bool(added)
+
+def _remove_from_shared_list(key, default, template_name):
+    """
+    Atomically remove a name from a shared template list.
+    Returns True if removed, False if not found.
+    """
+    removed = []
+    def remove(stored):
+        changes = _list_changes(stored, default)
+        if template_name in _apply_changes(default, changes):
+            if template_name in changes['added']:
+                changes['added'].remove(template_name)
+            else:
+                changes['removed'].append(template_name)
+            removed.append(True)
+        return changes
+    shared_state.update_setting(key, remove)
+    return bool(removed)
 
 def add_premium_template(template_name):
     """
     Add a template to the premium list.
     Returns True if added, False if already exists.
     """
-    if template_name not in PREMIUM_TEMPLATES:
-        PREMIUM_TEMPLATES.append(template_name)
-        return True
-    return False
+    return _add_to_shared_list('premium_templates', PREMIUM_TEMPLATES, template_name)
 
 def remove_premium_template(template_name):
     """
     Remove a template from the premium list.
     Returns True if removed, False if not found.
     """
-    if template_name in PREMIUM_TEMPLATES:
-        PREMIUM_TEMPLATES.remove(template_name)
-        return True
-    return False
+    return _remove_from_shared_list('premium_templates', PREMIUM_TEMPLATES, template_name)
 
 def is_new_template(template_name):
     """
@@ -827,33 +878,27 @@ def is_coming_soon_template(template_name):
     Check if a template is in the coming soon list.
     Returns True if the template is in the coming soon list.
     """
-    return template_name in COMING_SOON_TEMPLATES
+    return template_name in _shared_list('coming_soon_templates', COMING_SOON_TEMPLATES)
 
 def get_coming_soon_templates():
     """
     Get list of all coming soon template names.
     """
-    return COMING_SOON_TEMPLATES.copy()
+    return _shared_list('coming_soon_templates', COMING_SOON_TEMPLATES)
 
 def add_coming_soon_template(template_name):
     """
     Add a template to the coming soon list.
     Returns True if added, False if already exists.
     """
-    if template_name not in COMING_SOON_TEMPLATES:
-        COMING_SOON_TEMPLATES.append(template_name)
-        return True
-    return False
+    return _add_to_shared_list('coming_soon_templates', COMING_SOON_TEMPLATES, template_name)
 
 def remove_coming_soon_template(template_name):
     """
     Remove a template from the coming soon list.
     Returns True if removed, False if not found.
     """
-    if template_name in COMING_SOON_TEMPLATES:
-        COMING_SOON_TEMPLATES.remove(template_name)
-        return True
-    return False
+    return _remove_from_shared_list('coming_soon_templates', COMING_SOON_TEMPLATES, template_name)
 
 def get_template_config(template_name):
     """
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Template Manifest
+Compiles a poster template once into a JSON sidecar (<template>_manifest.json)
+describing its first slide: every shape's name, nesting path, geometry and the
+fonts already set in it, the figure slots (FigNPlaceholder / FigureDescN) and
+which of the shapes the renderer fills are missing.
+
+Renders look shapes up through the manifest's paths instead of scanning the
+slide, and a template missing e.g. its ResultsBox is reported when it is
+uploaded rather than silently skipped in a user's poster. The sidecar records
+the template's size and modification time and is recompiled when they change.
+
+The template itself is parsed once per process too (load_presentation): each
+render edits a deep copy of that parse instead of reading the .pptx again.
+"""
+
+import os
+import re
+import copy
+import json
+import time
+import threading
+
+from pptx import Presentation
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '_manifest.json'
+
+# Same name variants the renderer accepts (Fig1Placeholder, Fig1PlaceholderLarge, FigDesc1, Figure1Desc, ...)
+_FIGURE_PLACEHOLDER = re.compile(r'^fig(?:ure)?(\d+)placeholder(?:large|small)?$', re.IGNORECASE)
+_FIGURE_DESCRIPTION = re.compile(r'^fig(?:ure)?(?:desc(\d+)|(\d+)desc)$', re.IGNORECASE)
+
+# template path -> manifest, so a warm worker never re-reads the sidecar
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+# template path -> (size, mtime_ns, parsed presentation), the pristine copy renders are copied from
+_presentations = {}
+_presentations_lock = threading.Lock()
+
+
+def manifest_path(template_path):
+    """Sidecar path for a template (next to it, like the _preview.png)."""
+    return os.path.splitext(template_path)[0] + MANIFEST_SUFFIX
+
+
+def _emu(value):
+    return int(value) if value is not None else None
+
+
+def _fonts(shape):
+    """Distinct fonts set on the runs of a shape's text."""
+    if not getattr(shape, 'has_text_frame', False):
+        return []
+    fonts = []
+    for paragraph in shape.text_frame.paragraphs:
+        for run in paragraph.runs:
+            font = {'name': run.font.name,
+                    'size_pt': run.font.size.pt if run.font.size is not None else None,
+                    'bold': run.font.bold}
+            if font not in fonts:
+                fonts.append(font)
+    return fonts
+
+
+def _describe(shape, path):
+    has_text = getattr(shape, 'has_text_frame', False)
+    entry = {
+        'name': shape.name,
+        'path': path,
+        'type': str(shape.shape_type) if shape.shape_type is not None else type(shape).__name__,
+        'left': _emu(shape.left),
+        'top': _emu(shape.top),
+        'width': _emu(shape.width),
+        'height': _emu(shape.height),
+        'has_text_frame': has_text,
+    }
+    if has_text:
+        entry['text_length'] = len(shape.text_frame.text)
+        entry['word_wrap'] = shape.text_frame.word_wrap
+        entry['auto_size'] = str(shape.text_frame.auto_size) if shape.text_frame.auto_size is not None else None
+        entry['fonts'] = _fonts(shape)
+    return entry
+
+
+def _walk(shapes, prefix, out):
+    """Depth-first list of every shape, including shapes nested in groups at any depth."""
+    for i, shape in enumerate(shapes):
+        path = prefix + [i]
+        out.append(_describe(shape, path))
+        if hasattr(shape, 'shapes'):
+            _walk(shape.shapes, path, out)
+
+
+def _figure_slots(shapes):
+    """[{'slot', 'placeholder', 'description'}] per figure number; values are shape names (first match) or None."""
+    slots = {}
+    for entry in shapes:
+        for pattern, key in ((_FIGURE_PLACEHOLDER, 'placeholder'), (_FIGURE_DESCRIPTION, 'description')):
+            match = pattern.match(entry['name'])
+            if match:
+                number = int(next(group for group in match.groups() if group))
+                slot = slots.setdefault(number, {'slot': number, 'placeholder': None, 'description': None})
+                if slot[key] is None:
+                    slot[key] = entry['name']
+    return [slots[number] for number in sorted(slots)]
+
+
+def compile_template(template_path, required_shapes, presentation=None, write=True):
+    """
+    Parse a template (or use an already loaded presentation) and build its manifest.
+    `required_shapes` are the shape names the renderer fills. The sidecar is written
+    next to the template, and the manifest kept in memory, only when `write` is true
+    (not for one-off templates such as a user's upload).
+    """
+    start = time.perf_counter()
+    stat = os.stat(template_path)
+    prs = presentation if presentation is not None else Presentation(template_path)
+    shapes = []
+    if len(prs.slides):
+        _walk(prs.slides[0].shapes, [], shapes)
+
+    names = {entry['name'].lower() for entry in shapes}
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'template': os.path.basename(template_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'slide_count': len(prs.slides),
+        'slide_width': _emu(prs.slide_width),
+        'slide_height': _emu(prs.slide_height),
+        'required_shapes': list(required_shapes),
+        'missing_shapes': [name for name in required_shapes if name.lower() not in names],
+        'figure_slots': _figure_slots(shapes),
+        'shapes': shapes,
+        'compile_seconds': round(time.perf_counter() - start, 4),
+    }
+    if write:
+        sidecar = manifest_path(template_path)
+        staging = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(staging, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1, ensure_ascii=False)
+            os.replace(staging, sidecar)
+        except OSError as e:
+            print(f"⚠️ Could not write template manifest for {manifest['template']}: {e}")
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
+        with _manifests_lock:
+            _manifests[os.path.abspath(template_path)] = manifest
+    return manifest
+
+
+def _is_current(manifest, stat, required_shapes):
+    return (manifest.get('version') == MANIFEST_VERSION
+            and manifest.get('size') == stat.st_size
+            and manifest.get('mtime_ns') == stat.st_mtime_ns
+            and manifest.get('required_shapes') == list(required_shapes))
+
+
+def get_manifest(template_path, required_shapes, presentation=None, write=True):
+    """
+    Manifest for a template: from memory, else from its sidecar, else compiled now
+    (from `presentation` if the caller already loaded it).
+    """
+    stat = os.stat(template_path)
+    key = os.path.abspath(template_path)
+    with _manifests_lock:
+        cached = _manifests.get(key)
+    if cached and _is_current(cached, stat, required_shapes):
+        return cached
+
+    try:
+        with open(manifest_path(template_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if _is_current(manifest, stat, required_shapes):
+            with _manifests_lock:
+                _manifests[key] = manifest
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return compile_template(template_path, required_shapes, presentation=presentation, write=write)
+
+
+def resolve_shape(slide, path, _children=None):
+    """The shape at a manifest path (indexes into slide.shapes, then group.shapes)."""
+    # Shape collections build their proxies on every access, so list each container once
+    children = _children if _children is not None else {}
+    shape = None
+    for depth, i in enumerate(path):
+        prefix = tuple(path[:depth])
+        if prefix not in children:
+            children[prefix] = list(shape.shapes if shape is not None else slide.shapes)
+        shape = children[prefix][i]
+    return shape
+
+
+def index_shapes(slide, manifest, names):
+    """
+    {lower-case name: shape} for the given shape names, resolved through the manifest's
+    paths (first match in document order). Returns None if the slide does not match the
+    manifest, so the caller can fall back to scanning.
+    """
+    wanted = {name.lower() for name in names}
+    index = {}
+    children = {}
+    for entry in manifest['shapes']:
+        name = entry['name'].lower()
+        if name not in wanted or name in index:
+            continue
+        try:
+            shape = resolve_shape(slide, entry['path'], children)
+        except (IndexError, AttributeError):
+            return None
+        if shape.name.lower() != name:
+            return None
+        index[name] = shape
+    return index
+
+
+def load_presentation(template_path, keep=True):
+    """
+    An editable Presentation of a template. With `keep` the template is parsed once (per
+    process, or in the preloading master) and every call returns a deep copy of that
+    parse, a fraction of the cost of reading the .pptx; it is parsed again when the
+    file changes. One-off templates (keep=False) are simply read.
+    """
+    if not keep:
+        return Presentation(template_path)
+    stat = os.stat(template_path)
+    key = os.path.abspath(template_path)
+    with _presentations_lock:
+        cached = _presentations.get(key)
+        if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+            cached = (stat.st_size, stat.st_mtime_ns, Presentation(template_path))
+            _presentations[key] = cached
+        return copy.deepcopy(cached[2])
+
+
+def forget(template_path):
+    """Drop a template's manifest (memory and sidecar) and parse, e.g. when the template is deleted."""
+    key = os.path.abspath(template_path)
+    with _manifests_lock:
+        _manifests.pop(key, None)
+    with _presentations_lock:
+        _presentations.pop(key, None)
+    try:
+        os.remove(manifest_path(template_path))
+    except FileNotFoundError:
+        pass
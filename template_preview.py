@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Template Preview
+Background worker that draws library template previews (slide_preview) into
+<template>_preview.png next to each template. Requests only queue work: a
+template without a preview is listed without one until the worker has drawn it.
+
+Drawn previews are cached under the SHA-256 of the template file, so a template
+re-uploaded unchanged (or under another name) reuses its preview, and one
+replaced under the same name is redrawn. Each drawn PNG records the hash it was
+drawn from; previews without that marker were made by hand and are never
+overwritten.
+"""
+
+import os
+import queue
+import shutil
+import threading
+
+from pptx import Presentation
+
+import render_cache
+
+try:
+    from PIL import PngImagePlugin, Image
+    import slide_preview  # Needs Pillow
+except ImportError:
+    slide_preview = None
+
+SOURCE_KEY = 'template-sha256'  # PNG text chunk naming the template a preview was drawn from
+
+
+def drawn_from(preview_path):
+    """Template hash a preview was drawn from, or None (missing, or made by hand)."""
+    if slide_preview is None:
+        return None
+    try:
+        with Image.open(preview_path) as image:
+            return image.info.get(SOURCE_KEY)
+    except (OSError, ValueError):
+        return None
+
+
+def _replace(source, destination):
+    staging = f"{destination}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(source, staging)
+        os.replace(staging, destination)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+class PreviewWorker:
+    """Queue plus daemon thread drawing template previews one at a time."""
+
+    def __init__(self, cache_folder, width=None):
+        self.cache_folder = cache_folder
+        self.width = width or (slide_preview.DEFAULT_WIDTH if slide_preview else 0)
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._counters = {'drawn': 0, 'cache_hits': 0, 'current': 0, 'failed': 0}
+        self._last_error = None
+
+    def enqueue(self, template_path, preview_path):
+        """Queue a preview to be drawn. Returns (queued, error)."""
+        if slide_preview is None:
+            return False, "Pillow is not installed"
+        self.ensure_running()
+        key = os.path.abspath(preview_path)
+        with self._lock:
+            if key in self._pending:
+                return True, None
+            self._pending.add(key)
+        self._queue.put((template_path, preview_path))
+        return True, None
+
+    def ensure_running(self):
+        """Start the worker thread in this process if it is not running (threads do not survive fork)."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._pending.clear()  # Inherited from the parent, whose queue this process never sees
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='template-preview', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            template_path, preview_path = self._queue.get()
+            try:
+                result = self.draw(template_path, preview_path)
+                with self._lock:
+                    self._counters[result] += 1
+            except Exception as e:
+                print(f"⚠️ Could not draw preview for {os.path.basename(template_path)}: {e}")
+                with self._lock:
+                    self._counters['failed'] += 1
+                    self._last_error = str(e)
+            finally:
+                with self._lock:
+                    self._pending.discard(os.path.abspath(preview_path))
+
+    def draw(self, template_path, preview_path):
+        """
+        Bring one preview up to date (synchronously). Returns 'current' (nothing to do, or
+        a hand-made preview), 'cache_hits' (copied from the cache) or 'drawn'.
+        """
+        digest = render_cache.file_hash(template_path)
+        if os.path.exists(preview_path):
+            source = drawn_from(preview_path)
+            if source is None or source == digest:
+                return 'current'
+
+        cached = os.path.join(self.cache_folder, f"{digest}_{self.width}.png")
+        result = 'cache_hits'
+        if not os.path.exists(cached):
+            image = slide_preview.render_presentation(Presentation(template_path), self.width)
+            if image is None:
+                raise ValueError("No slides found in template")
+            metadata = PngImagePlugin.PngInfo()
+            metadata.add_text(SOURCE_KEY, digest)
+            os.makedirs(self.cache_folder, exist_ok=True)
+            staging = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                image.save(staging, 'PNG', optimize=True, pnginfo=metadata)
+                os.replace(staging, cached)
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
+            result = 'drawn'
+        _replace(cached, preview_path)
+        print(f"🖼️ Preview {'drawn' if result == 'drawn' else 'reused'} for {os.path.basename(template_path)}")
+        return result
+
+    def status(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'last_error': self._last_error, **self._counters}
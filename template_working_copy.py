@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Template Working Copy
+Library templates are kept as uploaded, for reference and re-download, but
+renders load an optimized working copy instead: unused slide layouts and
+masters and the docProps thumbnail removed, and every image downsampled to the
+resolution it prints at on the A0 slide (pptx_slimmer). The copy lives in a
+hidden .slim/ folder next to the template under the same file name, so
+per-template settings keyed by file name still apply.
+
+A small JSON report next to the copy records the original's size and
+modification time; the copy is rebuilt when the original changes or the print
+resolution setting does. Copies are built when a template is added to the
+library and, for templates that predate this, by a background builder queued on
+first use (WorkingCopyBuilder); renders use the original until the copy exists.
+"""
+
+import os
+import json
+import queue
+import threading
+
+import pptx_slimmer
+import template_manifest
+
+WORKING_COPY_VERSION = 1
+WORKING_FOLDER = '.slim'
+REPORT_SUFFIX = '_slim.json'
+
+# Print resolution for template media; 150 dpi is plenty for a poster viewed from a metre away
+DEFAULT_MEDIA_DPI = 150
+# Built once per template, so spend the extra time on the smallest deflate output
+TEMPLATE_COMPRESSLEVEL = 9
+
+# Builds are rare; one at a time per process keeps two requests from slimming the same template
+_build_lock = threading.Lock()
+
+
+def working_copy_path(template_path):
+    """Path of a template's working copy (.slim/<same name> next to it)."""
+    directory, name = os.path.split(template_path)
+    return os.path.join(directory, WORKING_FOLDER, name)
+
+
+def is_working_copy(path):
+    """Whether a path is a working copy (in a .slim/ folder), i.e. already slimmed."""
+    return os.path.basename(os.path.dirname(os.path.abspath(path))) == WORKING_FOLDER
+
+
+def _report_path(template_path):
+    return os.path.splitext(working_copy_path(template_path))[0] + REPORT_SUFFIX
+
+
+def _read_report(template_path):
+    try:
+        with open(_report_path(template_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_current(report, stat, media_dpi):
+    return (report is not None
+            and report.get('version') == WORKING_COPY_VERSION
+            and report.get('source_size') == stat.st_size
+            and report.get('source_mtime_ns') == stat.st_mtime_ns
+            and report.get('media_dpi') == media_dpi)
+
+
+def build(template_path, media_dpi=DEFAULT_MEDIA_DPI):
+    """Slim a template into its working copy and write the report next to it. Returns the report."""
+    stat = os.stat(template_path)
+    destination = working_copy_path(template_path)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    result = pptx_slimmer.slim_pptx(template_path, destination, compresslevel=TEMPLATE_COMPRESSLEVEL,
+                                    media_dpi=media_dpi)
+    report = {
+        'version': WORKING_COPY_VERSION,
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'media_dpi': media_dpi,
+        **{key: result[key] for key in ('bytes_before', 'bytes_after', 'bytes_saved', 'layouts_removed',
+                                        'masters_removed', 'images_downsampled', 'seconds')},
+        'parts_removed': len(result['parts_removed']),
+    }
+    sidecar = _report_path(template_path)
+    staging = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        os.replace(staging, sidecar)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    return report
+
+
+def current_working_copy(template_path, media_dpi=DEFAULT_MEDIA_DPI):
+    """Path of the template's working copy if it is built and up to date, else None (never builds)."""
+    try:
+        stat = os.stat(template_path)
+    except OSError:
+        return None
+    if _is_current(_read_report(template_path), stat, media_dpi) and os.path.exists(working_copy_path(template_path)):
+        return working_copy_path(template_path)
+    return None
+
+
+def get_working_copy(template_path, media_dpi=DEFAULT_MEDIA_DPI):
+    """
+    (path to render from, report) for a library template, building the working copy
+    if it is missing or out of date. Falls back to (template_path, None) if it cannot be built.
+    """
+    try:
+        stat = os.stat(template_path)
+        report = _read_report(template_path)
+        if _is_current(report, stat, media_dpi) and os.path.exists(working_copy_path(template_path)):
+            return working_copy_path(template_path), report
+        with _build_lock:
+            report = _read_report(template_path)  # Another thread may have built it meanwhile
+            if not (_is_current(report, stat, media_dpi) and os.path.exists(working_copy_path(template_path))):
+                report = build(template_path, media_dpi)
+                print(f"🪶 Built working copy of {os.path.basename(template_path)}: "
+                      f"{report['bytes_before'] // 1024}KB -> {report['bytes_after'] // 1024}KB in {report['seconds']}s")
+        return working_copy_path(template_path), report
+    except Exception as e:
+        print(f"⚠️ Could not build working copy of {os.path.basename(template_path)}: {e}")
+        return template_path, None
+
+
+class WorkingCopyBuilder:
+    """Queue plus daemon thread building working copies one at a time, so no request waits for one."""
+
+    def __init__(self, media_dpi=DEFAULT_MEDIA_DPI):
+        self.media_dpi = media_dpi
+        self._queue = queue.Queue()
+        self._pending = set()
+        # template path -> (size, mtime_ns) of a version that could not be built; not retried until it changes
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._counters = {'built': 0, 'failed': 0}
+
+    def enqueue(self, template_path):
+        """Queue a template's working copy to be built (once; a version that failed to build is skipped)."""
+        key = os.path.abspath(template_path)
+        try:
+            stat = os.stat(template_path)
+        except OSError:
+            return
+        self.ensure_running()
+        with self._lock:
+            if key in self._pending or self._failed.get(key) == (stat.st_size, stat.st_mtime_ns):
+                return
+            self._pending.add(key)
+        self._queue.put(template_path)
+
+    def ensure_running(self):
+        """Start the worker thread in this process if it is not running (threads do not survive fork)."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._pending.clear()  # Inherited from the parent, whose queue this process never sees
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='working-copy', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            template_path = self._queue.get()
+            key = os.path.abspath(template_path)
+            try:
+                stat = os.stat(template_path)
+                _, report = get_working_copy(template_path, self.media_dpi)
+                with self._lock:
+                    if report is None:
+                        self._failed[key] = (stat.st_size, stat.st_mtime_ns)
+                    self._counters['failed' if report is None else 'built'] += 1
+            except OSError:
+                pass  # Deleted while queued
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def status(self):
+        with self._lock:
+            return {'pending': len(self._pending), **self._counters}
+
+
+def forget(template_path):
+    """Remove a template's working copy, its report and its manifest (e.g. when the template is deleted)."""
+    copy = working_copy_path(template_path)
+    template_manifest.forget(copy)
+    for path in (copy, _report_path(template_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == '__main__':
+    # Build (or refresh) the working copies of every library template
+    import glob
+    import sys
+
+    library = sys.argv[1] if len(sys.argv) > 1 else 'template_library'
+    for path in sorted(glob.glob(os.path.join(library, '*', '*.pptx'))):
+        working_path, report = get_working_copy(path)
+        if report:
+            print(f"{os.path.relpath(path, library)}: {report['bytes_before'] // 1024}KB -> "
+                  f"{report['bytes_after'] // 1024}KB ({report['layouts_removed']} layouts, "
+                  f"{report['images_downsampled']} images downsampled)")
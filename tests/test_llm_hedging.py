@@ -0,0 +1,100 @@
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from llm_hedging import CancellableTransport
+
+RESPONSE_DELAY = 5.0
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(RESPONSE_DELAY)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(server):
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    serve(server)
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def tls_server(tmp_path):
+    """A slow HTTPS server on localhost with a throwaway self-signed certificate."""
+    if shutil.which('openssl') is None:
+        pytest.skip('openssl is needed to create a test certificate')
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-keyout', str(key), '-out', str(cert)],
+                   check=True, capture_output=True)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    serve(server)
+    yield f'https://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def cancel_during_request(url):
+    """Cancel a request to `url` half a second in; returns its outcome."""
+    transport = CancellableTransport(verify=False)
+    outcome = {}
+
+    def request():
+        start = time.perf_counter()
+        try:
+            with httpx.Client(transport=transport, timeout=30) as client:
+                outcome['status'] = client.get(url).status_code
+        except httpx.HTTPError as e:
+            outcome['error'] = e
+        outcome['seconds'] = time.perf_counter() - start
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    time.sleep(0.5)
+    transport.cancel()
+    thread.join(RESPONSE_DELAY + 5)
+    return outcome
+
+
+def test_cancel_interrupts_http_request(http_server):
+    outcome = cancel_during_request(http_server)
+    assert 'error' in outcome, outcome
+    assert outcome['seconds'] < RESPONSE_DELAY / 2
+
+
+def test_cancel_interrupts_https_request(tls_server):
+    outcome = cancel_during_request(tls_server)
+    assert 'error' in outcome, outcome
+    assert outcome['seconds'] < RESPONSE_DELAY / 2
+
+
+def test_requests_after_cancel_fail_straight_away(tls_server):
+    transport = CancellableTransport(verify=False)
+    transport.cancel()
+    with httpx.Client(transport=transport, timeout=30) as client:
+        with pytest.raises(httpx.ConnectError):
+            client.get(tls_server)
@@ -0,0 +1,114 @@
+from manuscript_segmenter import (
+    SECTION_TOKEN_BUDGETS, build_manuscript_excerpt, estimate_tokens, is_segmented, segment_manuscript,
+)
+
+
+def paragraph(word, sentences=40):
+    return ' '.join(f"The {word} sentence number {i} carries detail." for i in range(sentences))
+
+
+STRUCTURED_ABSTRACT_PAPER = f"""Digital Interventions for Chronic Pain
+A. Author, B. Author
+
+Abstract
+Background: Chronic pain is common. Methods: We searched four databases. Results: Twelve trials
+were included. Conclusions: Digital interventions help.
+
+Introduction
+{paragraph('introduction')}
+
+Methods
+{paragraph('methods')}
+
+Results
+{paragraph('results')}
+
+Discussion
+{paragraph('discussion')}
+
+Conclusions
+{paragraph('conclusions', 5)}
+
+References
+1. Smith J. Pain. 2020.
+"""
+
+# BMC/medical layout: Background opens the body, there is no Introduction heading
+BACKGROUND_FIRST_PAPER = f"""Outcomes of Early Mobilisation
+C. Author
+
+Abstract
+Background: Early mobilisation may help. Methods: A cohort study. Results: Stays were shorter.
+Conclusions: Mobilise early.
+Keywords: mobilisation, surgery
+
+Background
+{paragraph('background', 150)}
+
+Methods
+{paragraph('methods', 150)}
+
+Results
+{paragraph('results', 150)}
+
+Discussion
+{paragraph('discussion', 150)}
+
+Conclusions
+{paragraph('conclusions', 20)}
+"""
+
+
+def test_structured_abstract_keeps_its_inline_subheadings():
+    sections = segment_manuscript(STRUCTURED_ABSTRACT_PAPER)
+    assert 'Twelve trials' in sections['abstract']
+    assert 'Digital interventions help' in sections['abstract']
+    assert sections['introduction'].startswith('The introduction sentence')
+    assert sections['results'].startswith('The results sentence')
+    assert 'Twelve trials' not in sections['results']
+
+
+def test_background_heading_on_its_own_line_ends_the_abstract():
+    sections = segment_manuscript(BACKGROUND_FIRST_PAPER)
+    assert sections['abstract'].startswith('Background: Early mobilisation')
+    assert 'background sentence' not in sections['abstract']
+    assert sections['introduction'].startswith('The background sentence')
+    for name in ('methods', 'results', 'discussion', 'conclusions'):
+        assert f'The {name} sentence' in sections[name]
+
+
+def test_background_first_paper_keeps_results_and_discussion_in_the_excerpt():
+    excerpt, report = build_manuscript_excerpt(BACKGROUND_FIRST_PAPER)
+    for label in ('### Results', '### Discussion', '### Conclusions'):
+        assert label in excerpt
+    assert report['abstract'][0] < 100
+    assert report['results'][1] > 1000
+
+
+def test_inline_heading_in_the_body_still_starts_a_section():
+    text = "Abstract\nWe studied pain.\n\nIntroduction\nPain is common.\nMethods: We recruited 40 adults.\n"
+    sections = segment_manuscript(text)
+    assert sections['methods'] == 'We recruited 40 adults.'
+
+
+def test_paper_without_headings_is_truncated_to_the_total_budget():
+    text = paragraph('plain', 2000)
+    sections = segment_manuscript(text)
+    assert not is_segmented(sections)
+    excerpt, report = build_manuscript_excerpt(text)
+    assert list(report) == ['unsegmented']
+    assert estimate_tokens(excerpt) <= sum(SECTION_TOKEN_BUDGETS.values()) + 2
+
+
+def test_paper_without_headings_honours_include():
+    text = paragraph('plain', 2000)
+    excerpt, report = build_manuscript_excerpt(text, include=['methods', 'results'])
+    budget = SECTION_TOKEN_BUDGETS['methods'] + SECTION_TOKEN_BUDGETS['results']
+    assert report['unsegmented'][1] == budget
+    assert estimate_tokens(excerpt) <= budget + 2
+
+
+def test_include_limits_a_segmented_excerpt():
+    excerpt, report = build_manuscript_excerpt(STRUCTURED_ABSTRACT_PAPER, include=['methods'])
+    assert list(report) == ['methods']
+    assert excerpt.startswith('### Methods')
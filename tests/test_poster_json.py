@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from poster_json import parse_poster_json, repair_json
+
+POSTER_KEYS = ['headline', 'title', 'authors', 'affiliations', 'subtitle', 'Introduction', 'Objective',
+               'Methods', 'Results', 'Discussion', 'Conclusions', 'References']
+
+POSTER = {
+    'title': 'Sleep and memory consolidation in adolescents',
+    'authors': 'A. Author, B. Author',
+    'Introduction': 'Sleep supports memory.',
+    'Results': 'Recall improved by 12% after "deep" sleep.',
+    'Conclusions': 'Protect adolescent sleep.',
+}
+
+
+def test_clean_json():
+    poster, error = parse_poster_json(json.dumps(POSTER), POSTER_KEYS)
+    assert error is None
+    assert poster['title'] == POSTER['title']
+    assert poster['Methods'] == ''
+    assert set(poster) == set(POSTER_KEYS)
+
+
+@pytest.mark.parametrize('wrapped', [
+    'Here is the extracted poster content:\n\n{}\n\nLet me know if you need changes.',
+    '```json\n{}\n```',
+    'Sure!\n```\n{}\n```',
+])
+def test_prose_and_code_fences(wrapped):
+    poster, error = parse_poster_json(wrapped.replace('{}', json.dumps(POSTER, indent=2)), POSTER_KEYS)
+    assert error is None
+    assert poster['Results'] == POSTER['Results']
+
+
+def test_single_quotes():
+    text = "{'title': 'Sleep and memory', 'Introduction': 'It\\'s about sleep, \"mostly\".'}"
+    poster, error = parse_poster_json(text, POSTER_KEYS)
+    assert error is None
+    assert poster['title'] == 'Sleep and memory'
+    assert poster['Introduction'] == 'It\'s about sleep, "mostly".'
+
+
+def test_trailing_commas_and_raw_newlines():
+    text = '{"title": "Sleep", "Results": "Line one\nLine two", "References": ["Ref 1", "Ref 2",],}'
+    poster, error = parse_poster_json(text, POSTER_KEYS)
+    assert error is None
+    assert poster['Results'].split() == ['Line', 'one', 'Line', 'two']
+    assert 'Ref 1' in poster['References'] and 'Ref 2' in poster['References']
+
+
+def test_truncated_output_is_rejected():
+    text = json.dumps(POSTER)
+    poster, error = parse_poster_json(text[:len(text) * 3 // 4], POSTER_KEYS)
+    assert poster is None
+    assert 'cut off' in error
+
+
+def test_repair_reports_truncation():
+    assert repair_json('{"title": "Sleep"}') == ('{"title": "Sleep"}', False)
+    repaired, truncated = repair_json('{"title": "Sle')
+    assert truncated
+    assert json.loads(repaired) == {'title': 'Sle'}
+
+
+def test_missing_title_is_rejected():
+    poster, error = parse_poster_json(json.dumps({'Introduction': 'Sleep supports memory.'}), POSTER_KEYS)
+    assert poster is None
+    assert 'title' in error
+
+
+def test_title_without_body_is_rejected():
+    poster, error = parse_poster_json(json.dumps({'title': 'Sleep', 'Introduction': '  '}), POSTER_KEYS)
+    assert poster is None
+    assert 'Introduction' in error
+
+
+def test_section_group_subset():
+    poster, error = parse_poster_json('{"References": "1. Walker M. (2017)"}', ['References'])
+    assert error is None
+    assert poster == {'References': '1. Walker M. (2017)'}
+
+    poster, error = parse_poster_json('{"References": ""}', ['References'])
+    assert poster is None
+
+
+def test_no_json():
+    poster, error = parse_poster_json('I could not read this paper.', POSTER_KEYS)
+    assert poster is None
+    assert error
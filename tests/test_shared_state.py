@@ -0,0 +1,62 @@
+import sqlite3
+
+import shared_state
+
+
+def make_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_state, 'BUSY_TIMEOUT_MS', 50)
+    monkeypatch.setattr(shared_state, 'RETRY_AFTER', 0.0)
+    return shared_state.SharedStateStore(str(tmp_path / 'state.db'))
+
+
+def lock(store):
+    """Hold the database's write lock from another connection."""
+    conn = sqlite3.connect(store.db_path, isolation_level=None)
+    conn.execute("BEGIN EXCLUSIVE")
+    return conn
+
+
+def test_settings_shared_between_stores(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    other = shared_state.SharedStateStore(store.db_path)
+    store.set('api_provider', 'anthropic')
+    assert other.get('api_provider', 'openai') == 'anthropic'
+
+
+def test_locked_database_falls_back_for_that_call_only(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    other = shared_state.SharedStateStore(store.db_path)
+    store.set('api_provider', 'anthropic')
+    assert store.get('api_provider') == 'anthropic'
+
+    blocker = lock(store)
+    assert store.set('dummy_mode', True) is True  # Kept in this process while locked
+    assert store.get('dummy_mode') is True
+    assert store.get('api_provider') == 'anthropic'  # Last value read from SQLite
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    # SQLite is used again on the next call, and the setting changed meanwhile is saved to it
+    store.set('api_provider', 'openai')
+    assert other.get('api_provider') == 'openai'
+    assert other.get('dummy_mode') is True
+
+
+def test_live_values_do_not_bump_the_version(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.set('api_provider', 'openai')
+    version = store.version()
+    store.update_live('rate_limit:openai', lambda current: current + 1, 0)
+    assert store.get_live('rate_limit:openai') == 1
+    assert store.version() == version
+
+
+def test_read_after_outage_sees_the_pending_setting(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.set('dummy_mode', False)
+    blocker = lock(store)
+    store.set('dummy_mode', True)
+    blocker.execute("ROLLBACK")
+    blocker.close()
+    assert store.get('dummy_mode') is True
+    assert shared_state.SharedStateStore(store.db_path).get('dummy_mode') is True
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Upload Janitor
+Background thread that keeps the outputs folder within bounds. It holds a
+running inventory of the finished posters (name -> size, last use), expires
+posters not used within the TTL and, if the folder is still over its disk
+quota, removes the least recently used ones. A file's last use is the later of
+its modification and access times; downloads bump only the access time, so
+the modification time (and with it the download ETag) never changes.
+
+The inventory is updated as posters are published, downloaded and deleted, and
+reconciled with a single os.scandir pass on every sweep (other workers publish
+into the same folder). Status requests are answered from the inventory and the
+sweep counters without touching the disk.
+"""
+
+import os
+import time
+import threading
+
+
+def _last_used(stat):
+    return max(stat.st_mtime, stat.st_atime)
+
+
+class UploadJanitor:
+    """Inventory plus TTL/LRU eviction for one folder of output files."""
+
+    def __init__(self, folder, ttl_seconds, max_bytes, interval_seconds, tasks=None):
+        self.folder = folder
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.interval_seconds = interval_seconds
+        # [(name, callable)] run after every sweep; the latest result is shown in status()
+        self.tasks = tasks or []
+        self._files = {}  # name -> [size, last used]
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._counters = {'sweeps': 0, 'expired': 0, 'evicted': 0, 'bytes_freed': 0}
+        self._last_sweep = None
+        self._task_results = {}
+
+    # Inventory updates from the request path
+
+    def record(self, path):
+        """Add a newly published file."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._set(os.path.basename(path), stat.st_size, _last_used(stat))
+
+    def touch(self, path):
+        """Mark a file as used (e.g. downloaded) so LRU eviction keeps it longer."""
+        now = time.time()
+        try:
+            # Shared with the other workers through the file itself; mtime stays put
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            return
+        with self._lock:
+            entry = self._files.get(os.path.basename(path))
+            if entry:
+                entry[1] = now
+
+    def forget(self, path):
+        """Drop a file that was deleted outside the janitor."""
+        with self._lock:
+            self._drop(os.path.basename(path))
+
+    def _set(self, name, size, last_used):
+        self._drop(name)
+        self._files[name] = [size, last_used]
+        self._total_bytes += size
+
+    def _drop(self, name):
+        entry = self._files.pop(name, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    # Sweeping
+
+    def refresh(self):
+        """Rebuild the inventory with one scandir pass."""
+        files = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.name] = [stat.st_size, _last_used(stat)]
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._files = files
+            self._total_bytes = sum(size for size, _ in files.values())
+
+    def _remove(self, name, counter):
+        try:
+            os.remove(os.path.join(self.folder, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Janitor could not delete {name}: {e}")
+            return 0
+        with self._lock:
+            size = self._files.get(name, [0])[0]
+            self._drop(name)
+            self._counters[counter] += 1
+            self._counters['bytes_freed'] += size
+        return 1
+
+    def sweep(self, ttl_seconds=None):
+        """
+        Expire files unused for ttl_seconds, then evict least recently used files until
+        the folder fits the quota. Returns {'files_before', 'files_after', 'expired', 'evicted'}.
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._sweep_lock:
+            started = time.perf_counter()
+            self.refresh()
+            with self._lock:
+                files_before = len(self._files)
+                by_age = sorted((last_used, name) for name, (_, last_used) in self._files.items())
+
+            cutoff = time.time() - ttl_seconds
+            expired = sum(self._remove(name, 'expired') for last_used, name in by_age if last_used < cutoff)
+
+            evicted = 0
+            for last_used, name in by_age:
+                if last_used < cutoff:
+                    continue
+                with self._lock:
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                evicted += self._remove(name, 'evicted')
+
+            for task_name, task in self.tasks:
+                try:
+                    self._task_results[task_name] = task()
+                except Exception as e:
+                    print(f"⚠️ Janitor task {task_name} failed: {e}")
+
+            with self._lock:
+                files_after = len(self._files)
+                self._counters['sweeps'] += 1
+                self._last_sweep = {'at': time.time(), 'seconds': round(time.perf_counter() - started, 4),
+                                    'expired': expired, 'evicted': evicted}
+        if expired or evicted:
+            print(f"🧹 Janitor: expired {expired} and evicted {evicted} file(s) from {self.folder}")
+        return {'files_before': files_before, 'files_after': files_after, 'expired': expired, 'evicted': evicted}
+
+    # Background thread
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Janitor sweep failed: {e}")
+            time.sleep(self.interval_seconds)
+
+    def ensure_running(self):
+        """Start the janitor thread in this process if it is not running (threads do not survive fork)."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='upload-janitor', daemon=True)
+            self._thread.start()
+
+    def status(self, recent=10):
+        """Inventory and counters, without touching the disk."""
+        with self._lock:
+            newest = sorted(self._files.items(), key=lambda item: item[1][1], reverse=True)[:recent]
+            return {
+                'files_count': len(self._files),
+                'total_size_mb': round(self._total_bytes / (1024 * 1024), 2),
+                'quota_mb': round(self.max_bytes / (1024 * 1024)),
+                'ttl_hours': round(self.ttl_seconds / 3600, 2),
+                'files': [name for name, _ in newest],
+                'last_sweep': dict(self._last_sweep) if self._last_sweep else None,
+                **self._counters,
+                **self._task_results,
+            }